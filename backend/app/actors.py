@@ -0,0 +1,168 @@
+"""Registry of local signing keys (edges, vehicles, cloud, admin).
+
+Loaded with one `tbthreed keys list --output json` call and persisted to
+data/actors.json. The cache is tagged with a fingerprint of the keyring
+directory (its path and mtime). Adding or deleting a key changes the
+directory mtime, so a stale cache is detected with a single stat() and
+reloaded. Lookups in both directions are dict hits.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from .chain_cli import ChainCLI
+
+
+def default_cache_path() -> Path:
+    # backend/app -> backend
+    return Path(os.getenv("ACTOR_CACHE_PATH") or Path(__file__).resolve().parents[1] / "data" / "actors.json")
+
+
+def keyring_dir(home: str, keyring_backend: str) -> Path:
+    return Path(home) / f"keyring-{keyring_backend}"
+
+
+def keyring_fingerprint(home: str, keyring_backend: str) -> str:
+    d = keyring_dir(home, keyring_backend)
+    try:
+        return f"{d.resolve()}:{d.stat().st_mtime_ns}"
+    except OSError:
+        return f"{d}:missing"
+
+
+def kind_of(name: str) -> str:
+    for k in ("vehicle", "edge", "cloud"):
+        if name.startswith(k):
+            return k
+    return "other"
+
+
+@dataclass(frozen=True)
+class Actor:
+    name: str
+    addr: str
+    kind: str
+
+
+class ActorRegistry:
+    """address <-> key name, refreshed when the keyring directory changes."""
+
+    # Minimum seconds between keyring stat() checks on the lookup path.
+    CHECK_INTERVAL = 2.0
+
+    def __init__(self, chain: ChainCLI, *, pinned: list[Actor] | None = None, cache_path: Path | None = None) -> None:
+        self.chain = chain
+        self.cache_path = cache_path or default_cache_path()
+        # Actors from Settings (names and env-provided addresses) win over keyring entries.
+        self.pinned = [a for a in (pinned or []) if a.name]
+        self.fingerprint = ""
+        self.complete = False  # True once the index holds a full keyring listing
+        self._by_name: dict[str, Actor] = {}
+        self._by_addr: dict[str, Actor] = {}
+        self._local: dict[str, str] = {}  # keyring name -> address
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---- loading ----
+
+    def _fingerprint(self) -> str:
+        return keyring_fingerprint(self.chain.home, self.chain.keyring_backend)
+
+    def _index(self, keys: list[Actor]) -> None:
+        self._local = {a.name: a.addr for a in keys if a.addr}
+        by_name = {a.name: a for a in keys}
+        for p in self.pinned:
+            cur = by_name.get(p.name)
+            by_name[p.name] = Actor(p.name, p.addr or (cur.addr if cur else ""), p.kind)
+        self._by_name = by_name
+        self._by_addr = {a.addr: a for a in by_name.values() if a.addr}
+
+    def _read_cache(self, fingerprint: str) -> list[Actor] | None:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if data.get("fingerprint") != fingerprint:
+            return None
+        return [Actor(**a) for a in data.get("actors", [])]
+
+    def _write_cache(self, fingerprint: str, keys: list[Actor]) -> None:
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"fingerprint": fingerprint, "actors": [asdict(a) for a in keys]}), encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"[actors] could not write cache {self.cache_path}: {e}")
+
+    def load(self, *, force: bool = False) -> int:
+        """Load from the disk cache, or from the keyring if it changed. Returns the number of actors."""
+        fingerprint = self._fingerprint()
+        with self._lock:
+            keys = None if force else self._read_cache(fingerprint)
+            if keys is None:
+                try:
+                    raw = self.chain.keys_list()
+                except Exception as e:
+                    print(f"[actors] keys list failed: {e}")
+                    raw = None
+                if raw is not None:
+                    keys = [Actor(k["name"], k.get("address", ""), kind_of(k["name"])) for k in raw if k.get("name")]
+                    self._write_cache(fingerprint, keys)
+            if keys is not None:
+                self._index(keys)
+                self.complete = True
+            elif not self._by_name:
+                self._index([])
+            # Also on failure: retry only once the keyring changes, not on every lookup.
+            self.fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+            return len(self._by_name)
+
+    def remember(self, resolved: dict[str, str]) -> None:
+        """Merge addresses resolved key-by-key into the index and the disk cache."""
+        with self._lock:
+            keys = [Actor(n, a, kind_of(n)) for n, a in self._local.items()]
+            keys += [Actor(n, a, kind_of(n)) for n, a in resolved.items() if a and n not in self._local]
+            self._index(keys)
+            self._write_cache(self.fingerprint, keys)
+
+    def _maybe_refresh(self) -> None:
+        if time.monotonic() - self._checked_at < self.CHECK_INTERVAL:
+            return
+        self._checked_at = time.monotonic()
+        if self._fingerprint() != self.fingerprint:
+            self.load()
+
+    # ---- lookups ----
+
+    def name_of(self, addr: str) -> str | None:
+        self._maybe_refresh()
+        a = self._by_addr.get(addr)
+        return a.name if a else None
+
+    def addr_of(self, name: str, *, local_only: bool = False) -> str | None:
+        """Address for a key name; local_only ignores pinned addresses with no local key."""
+        self._maybe_refresh()
+        if local_only:
+            return self._local.get(name)
+        a = self._by_name.get(name)
+        return a.addr if a and a.addr else None
+
+    def actors(self, kind: str | None = None) -> list[Actor]:
+        self._maybe_refresh()
+        return sorted((a for a in self._by_name.values() if kind is None or a.kind == kind), key=lambda a: a.name)
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "count": len(self._by_name),
+            "actors": [asdict(a) for a in self.actors()],
+        }
@@ -0,0 +1,136 @@
+"""Memoized per-task audit results.
+
+A task's audit view only changes when the chain gains a log for it, or when a
+stored row or its ledger entry changes. Entries are keyed by the sha256 of the
+task's sorted chain logHash list, and ingest drops a task's entry. A reused
+entry skips the DB read and ledger backfill.
+
+A result built while an ingest for the same task ran must not be stored. A
+build takes a token from a logical clock (`generation`) and `put` refuses it
+if the task was invalidated at or after that tick. Only the newest
+AUDIT_CACHE_MAX_TRACKED invalidation ticks are kept per task. Older ones are
+folded into one floor tick, so memory stays bounded while tasks keep
+arriving. A fold can only make `put` skip a result, never accept a stale one.
+
+Eviction is LRU under a byte budget (AUDIT_CACHE_MAX_BYTES, default 32 MiB;
+0 disables the cache). Entry size is the length of the result's JSON encoding.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+
+def chain_digest(log_hashes: Iterable[str | None]) -> str:
+    return hashlib.sha256("\n".join(sorted(h or "" for h in log_hashes)).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Entry:
+    digest: str
+    generation: int
+    result: dict[str, Any]
+    size: int
+
+
+class AuditCache:
+    """LRU of task_id -> audit result, bounded by an approximate byte budget."""
+
+    def __init__(self, max_bytes: int | None = None) -> None:
+        if max_bytes is None:
+            max_bytes = int(os.getenv("AUDIT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        self.max_bytes = max_bytes
+        self.max_tracked = int(os.getenv("AUDIT_CACHE_MAX_TRACKED", "4096"))
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._invalidated: OrderedDict[str, int] = OrderedDict()  # task_id -> last invalidation tick
+        self._clock = 0
+        self._floor = 0  # invalidation tick of every task no longer tracked
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _invalidated_at(self, task_id: str) -> int:
+        return max(self._floor, self._invalidated.get(task_id, 0))
+
+    def generation(self, task_id: str) -> int:
+        """Read before loading DB rows; pass to `put` so a concurrent ingest wins."""
+        with self._lock:
+            self._clock += 1
+            return self._clock
+
+    def has(self, task_id: str) -> bool:
+        return task_id in self._entries
+
+    def get(self, task_id: str, digest: str) -> dict[str, Any] | None:
+        with self._lock:
+            e = self._entries.get(task_id)
+            if e is not None and e.digest == digest:
+                self._entries.move_to_end(task_id)
+                self.hits += 1
+                return e.result
+            self.misses += 1
+            return None
+
+    def put(self, task_id: str, digest: str, generation: int, result: dict[str, Any]) -> None:
+        if self.max_bytes <= 0:
+            return
+        size = len(json.dumps(result, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation <= self._invalidated_at(task_id):
+                return  # invalidated while the result was being built
+            self._drop(task_id)
+            self._entries[task_id] = _Entry(digest, generation, result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= old.size
+                self.evictions += 1
+
+    def _drop(self, task_id: str) -> None:
+        old = self._entries.pop(task_id, None)
+        if old is not None:
+            self._bytes -= old.size
+
+    def invalidate(self, task_id: str) -> None:
+        with self._lock:
+            self._clock += 1
+            self._invalidated.pop(task_id, None)
+            self._invalidated[task_id] = self._clock
+            while len(self._invalidated) > self.max_tracked:
+                _, tick = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, tick)
+            self._drop(task_id)
+            self.invalidations += 1
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated.clear()
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
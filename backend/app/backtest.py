@@ -0,0 +1,217 @@
+"""Offline backtest of SubmitLogSummary's anomaly thresholds.
+
+The keeper turns every log summary into a reputation observation:
+
+    timeout          latency_ms > timeoutThr                      -> 2
+    resource anomaly cpu > cpuThr or mem > memThr or
+                     net > netThr or latency_ms > latThr          -> 1
+    otherwise                                                     -> 0
+
+`backtest` replays the stored log_details rows (hot table plus archive
+partitions) through that rule for many candidate threshold sets at once and
+reports, per set, what the fleet would have looked like:
+
+  - proposals: edges whose score fell below the 0.30 threshold at some point
+    (the keeper opens one pending proposal per edge; none is decided here)
+  - frozen: edges still below the threshold after their last row, i.e. the
+    ones an approved proposal would freeze
+  - the distribution of final scores
+
+Each edge starts from fresh evidence and only log observations are replayed
+(feedback, results and consensus events also move scores on chain). The
+score depends on evidence counts only, so the HMM belief is not tracked.
+
+With NumPy the sets x rows observation matrix is evaluated in blocks and
+per-edge running scores come from cumulative sums; without it every set is
+replayed row by row.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .db import LogDetail
+from .partitions import LogStore, iter_archive_rows
+from .reputation_engine import FP_SCALE, PRIOR, PROPOSAL_THRESHOLD, np, score_from_opinion, subjective_from_evidence
+
+
+@dataclass(frozen=True)
+class ThresholdSet:
+    cpu_ms: int = 5000
+    mem_mb: int = 800
+    net_kb: int = 5000
+    latency_ms: int = 2000
+    timeout_ms: int = 4000
+
+    def classify(self, cpu: int, mem: int, net: int, lat: int) -> int:
+        if lat > self.timeout_ms:
+            return 2
+        if cpu > self.cpu_ms or mem > self.mem_mb or net > self.net_kb or lat > self.latency_ms:
+            return 1
+        return 0
+
+
+# Constants in keeper/msg_server_submit_log_summary.go.
+KEEPER_THRESHOLDS = ThresholdSet()
+
+_FIELDS = ("edge_addr", "ts", "id", "cpu_ms", "mem_mb_peak", "net_kb", "latency_ms")
+# Max sets x rows cells evaluated per NumPy block.
+BLOCK_CELLS = int(os.getenv("BACKTEST_BLOCK_CELLS", "4000000"))
+
+
+@dataclass
+class LogMetrics:
+    """log_details columns needed by the classifier, grouped by edge in chain order."""
+
+    edges: list[str]
+    starts: list[int]  # first row of each edge; rows of edges[i] are starts[i]:starts[i+1]
+    cpu: list[int]
+    mem: list[int]
+    net: list[int]
+    lat: list[int]
+
+    @property
+    def rows(self) -> int:
+        return len(self.cpu)
+
+
+def _iter_rows(db: Session, log_store: LogStore, from_ts: int | None, to_ts: int | None) -> Iterator[tuple]:
+    q = select(*[getattr(LogDetail, f) for f in _FIELDS]).where(LogDetail.edge_addr.is_not(None))
+    where = ["edge_addr IS NOT NULL"]
+    params: dict[str, Any] = {}
+    if from_ts is not None:
+        q = q.where(LogDetail.ts >= from_ts)
+        where.append("ts >= :from_ts")
+        params["from_ts"] = from_ts
+    if to_ts is not None:
+        q = q.where(LogDetail.ts <= to_ts)
+        where.append("ts <= :to_ts")
+        params["to_ts"] = to_ts
+    for r in db.execute(q.execution_options(yield_per=5000)):
+        yield tuple(r)
+    sql = f"SELECT {', '.join(_FIELDS)} FROM log_details WHERE {' AND '.join(where)}"
+    for p in log_store.prune(db, from_ts=from_ts, to_ts=to_ts):
+        yield from iter_archive_rows(p.path, sql, params)
+
+
+def load_log_metrics(db: Session, log_store: LogStore, *, from_ts: int | None = None, to_ts: int | None = None) -> LogMetrics:
+    rows = sorted(_iter_rows(db, log_store, from_ts, to_ts), key=lambda r: (r[0], r[1], r[2]))
+    m = LogMetrics([], [], [], [], [], [])
+    for i, r in enumerate(rows):
+        if not m.edges or m.edges[-1] != r[0]:
+            m.edges.append(r[0])
+            m.starts.append(i)
+        m.cpu.append(int(r[3] or 0))
+        m.mem.append(int(r[4] or 0))
+        m.net.append(int(r[5] or 0))
+        m.lat.append(int(r[6] or 0))
+    return m
+
+
+def _summary(final: Sequence[int], crossed: int, frozen: int, obs_counts: Sequence[int]) -> dict[str, Any]:
+    scores = sorted(final)
+
+    def pct(q: float) -> int | None:
+        return scores[min(int(q * len(scores)), len(scores) - 1)] if scores else None
+
+    hist = [0] * 10
+    for s in scores:
+        hist[min(s * 10 // FP_SCALE, 9)] += 1
+    return {
+        "proposals": crossed,
+        "frozen": frozen,
+        "observations": {"good": obs_counts[0], "anomaly": obs_counts[1], "timeout": obs_counts[2]},
+        "scores": {
+            "mean": round(sum(scores) / len(scores)) if scores else None,
+            "min": scores[0] if scores else None,
+            "p10": pct(0.10),
+            "p50": pct(0.50),
+            "p90": pct(0.90),
+            # counts of final scores in [0, 0.1), [0.1, 0.2), ... [0.9, 1.0]
+            "histogram": hist,
+        },
+    }
+
+
+def _backtest_py(m: LogMetrics, ts: ThresholdSet, threshold: int) -> dict[str, Any]:
+    ends = m.starts[1:] + [m.rows]
+    final: list[int] = []
+    counts = [0, 0, 0]
+    crossed = frozen = 0
+    for a, b in zip(m.starts, ends):
+        pos = neg = 0
+        low = False
+        score = 0
+        for i in range(a, b):
+            obs = ts.classify(m.cpu[i], m.mem[i], m.net[i], m.lat[i])
+            counts[obs] += 1
+            if obs == 0:
+                pos += 1
+            else:
+                neg += 1
+            bb, _, u = subjective_from_evidence(pos, neg)
+            score = score_from_opinion(bb, u)
+            low = low or score < threshold
+        final.append(score)
+        crossed += low
+        frozen += score < threshold
+    return _summary(final, crossed, frozen, counts)
+
+
+def _backtest_np(m: LogMetrics, sets: Sequence[ThresholdSet], threshold: int) -> list[dict[str, Any]]:
+    n = m.rows
+    cols = {k: np.asarray(getattr(m, k), dtype=np.int64) for k in ("cpu", "mem", "net", "lat")}
+    starts = np.asarray(m.starts, dtype=np.int64)
+    ends = np.append(starts[1:], n) - 1
+    lengths = np.diff(np.append(starts, n))
+    # 1-based position of each row within its edge; evidence total is that + PRIOR.
+    k = np.arange(n, dtype=np.int64) - np.repeat(starts, lengths) + 1
+    total = k + PRIOR
+    half_u = (PRIOR * FP_SCALE // total) // 2
+
+    out: list[dict[str, Any]] = []
+    block = max(1, BLOCK_CELLS // max(n, 1))
+    for lo in range(0, len(sets), block):
+        chunk = sets[lo : lo + block]
+        thr = {f: np.asarray([getattr(s, f) for s in chunk], dtype=np.int64)[:, None] for f in asdict(KEEPER_THRESHOLDS)}
+        timeout = cols["lat"][None, :] > thr["timeout_ms"]
+        anomaly = (
+            (cols["cpu"][None, :] > thr["cpu_ms"])
+            | (cols["mem"][None, :] > thr["mem_mb"])
+            | (cols["net"][None, :] > thr["net_kb"])
+            | (cols["lat"][None, :] > thr["latency_ms"])
+        )
+        bad = timeout | anomaly
+        # Negative evidence so far within each edge: global running sum minus the sum before the edge's first row.
+        cs = np.cumsum(bad, axis=1, dtype=np.int64)
+        before = np.where(starts > 0, cs[:, np.maximum(starts - 1, 0)], 0)
+        neg = cs - np.repeat(before, lengths, axis=1)
+        score = (k - neg) * FP_SCALE // total + half_u
+        lowest = np.minimum.reduceat(score, starts, axis=1)
+        final = score[:, ends]
+        n_timeout = timeout.sum(axis=1)
+        n_anomaly = bad.sum(axis=1) - n_timeout
+        for j in range(len(chunk)):
+            out.append(
+                _summary(
+                    final[j].tolist(),
+                    int((lowest[j] < threshold).sum()),
+                    int((final[j] < threshold).sum()),
+                    (n - int(n_anomaly[j]) - int(n_timeout[j]), int(n_anomaly[j]), int(n_timeout[j])),
+                )
+            )
+    return out
+
+
+def backtest(m: LogMetrics, sets: Sequence[ThresholdSet], *, threshold: int = PROPOSAL_THRESHOLD) -> list[dict[str, Any]]:
+    """One summary per threshold set, in input order."""
+    if np is not None and m.rows:
+        results = _backtest_np(m, sets, threshold)
+    else:
+        results = [_backtest_py(m, s, threshold) for s in sets]
+    return [{"thresholds": asdict(s), **r} for s, r in zip(sets, results)]
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
 import json
+import os
+import re
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Sequence
 
+_SEQ_MISMATCH = re.compile(r"account sequence mismatch, expected (\d+), got (\d+)")
+
+
+def expected_sequence(msg: str) -> int | None:
+    """The sequence the chain wants, from an "account sequence mismatch" error; else None."""
+    m = _SEQ_MISMATCH.search(msg)
+    return int(m.group(1)) if m else None
+
 
 @dataclass
 class TxResult:
@@ -14,6 +26,13 @@ class TxResult:
     def txhash(self) -> str | None:
         return self.raw.get("txhash") or self.raw.get("tx_hash")
 
+    @property
+    def code(self) -> int:
+        try:
+            return int(self.raw.get("code") or 0)
+        except Exception:
+            return 0
+
     @property
     def height(self) -> int | None:
         h = self.raw.get("height")
@@ -81,7 +100,34 @@ class ChainCLI:
             raise RuntimeError(err or out)
         return out
 
-    def tx(self, module: str, cmd: str, args: Sequence[str], *, from_name: str) -> TxResult:
+    def keys_list(self) -> list[dict[str, Any]]:
+        """All local keys as [{"name", "type", "address", "pubkey"}, ...]."""
+        code, out, err = self._run(
+            [
+                self.tbthreed,
+                "keys",
+                "list",
+                "--output",
+                "json",
+                "--keyring-backend",
+                self.keyring_backend,
+                "--home",
+                self.home,
+            ]
+        )
+        if code != 0:
+            raise RuntimeError(err or out)
+        # Some builds print the JSON on stderr.
+        raw = out or err
+        keys = json.loads(raw) if raw else []
+        return keys if isinstance(keys, list) else []
+
+    def tx(self, module: str, cmd: str, args: Sequence[str], *, from_name: str, sequence: int | None = None) -> TxResult:
+        """Sign and broadcast (sync mode).
+
+        `sequence` overrides the account sequence the CLI would otherwise query
+        from committed state, so one signer can queue txs within a block.
+        """
         base = [
             self.tbthreed,
             "tx",
@@ -104,12 +150,104 @@ class ChainCLI:
             "--output",
             "json",
         ]
+        if sequence is not None:
+            base += ["--sequence", str(sequence)]
         raw = self._run_json(base)
         return TxResult(raw=raw)
 
-    def query(self, module: str, cmd: str, args: Sequence[str]) -> dict[str, Any]:
+    def tx_generate(self, module: str, cmd: str, args: Sequence[str], *, from_name: str) -> dict[str, Any]:
+        """Unsigned tx for one message (`--generate-only`); nothing is broadcast."""
+        return self._run_json(
+            [
+                self.tbthreed,
+                "tx",
+                module,
+                cmd,
+                *args,
+                "--from",
+                from_name,
+                "--keyring-backend",
+                self.keyring_backend,
+                "--home",
+                self.home,
+                "--chain-id",
+                self.chain_id,
+                "--generate-only",
+                "--output",
+                "json",
+            ]
+        )
+
+    def tx_multi(
+        self,
+        module: str,
+        msgs: Sequence[tuple[str, Sequence[str]]],
+        *,
+        from_name: str,
+        gas_per_msg: int = 200000,
+        sequence: int | None = None,
+    ) -> TxResult:
+        """Sign and broadcast several messages of one signer as a single tx.
+
+        Each (cmd, args) is rendered with --generate-only (in parallel), the
+        messages are merged into the first tx body, and the result goes
+        through `tx sign` and `tx broadcast`. The tx is atomic on chain:
+        every message applies or none does.
+        """
+        with ThreadPoolExecutor(max_workers=min(8, len(msgs)) or 1) as ex:
+            unsigned = list(ex.map(lambda m: self.tx_generate(module, m[0], m[1], from_name=from_name), msgs))
+        tx = unsigned[0]
+        tx["body"]["messages"] = [m for u in unsigned for m in u["body"]["messages"]]
+        tx["auth_info"]["fee"]["gas_limit"] = str(gas_per_msg * len(msgs))
+
+        with tempfile.TemporaryDirectory() as d:
+            unsigned_path, signed_path = os.path.join(d, "unsigned.json"), os.path.join(d, "signed.json")
+            with open(unsigned_path, "w", encoding="utf-8") as f:
+                json.dump(tx, f)
+            sign = [
+                self.tbthreed,
+                "tx",
+                "sign",
+                unsigned_path,
+                "--from",
+                from_name,
+                "--keyring-backend",
+                self.keyring_backend,
+                "--home",
+                self.home,
+                "--chain-id",
+                self.chain_id,
+                "--node",
+                self.node,
+                "--output-document",
+                signed_path,
+            ]
+            if sequence is not None:
+                sign += ["--sequence", str(sequence)]
+            code, out, err = self._run(sign)
+            if code != 0:
+                raise RuntimeError(f"Command failed ({code}): {' '.join(sign)}\n{err}\n{out}")
+            raw = self._run_json(
+                [
+                    self.tbthreed,
+                    "tx",
+                    "broadcast",
+                    signed_path,
+                    "--node",
+                    self.node,
+                    "--broadcast-mode",
+                    "sync",
+                    "--output",
+                    "json",
+                ]
+            )
+        return TxResult(raw=raw)
+
+    def query(self, module: str, cmd: str, args: Sequence[str], *, height: int | None = None) -> dict[str, Any]:
         """Run `tbthreed query ...`.
 
+        `height` queries historical state (needs a non-pruned node).
+
         Note: some newer `tbthreed` builds removed `--node` from `query`.
         To keep compatibility across versions, we try with `--node` first,
         and fall back to running without it if the flag is rejected.
@@ -126,6 +264,8 @@ class ChainCLI:
             "--output",
             "json",
         ]
+        if height is not None:
+            base_common += ["--height", str(height)]
 
         # Prefer explicit node when supported.
         with_node = [
@@ -141,6 +281,8 @@ class ChainCLI:
             "--output",
             "json",
         ]
+        if height is not None:
+            with_node += ["--height", str(height)]
 
         try:
             return self._run_json(with_node)
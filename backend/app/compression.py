@@ -0,0 +1,238 @@
+"""zlib compression of canonical JSON payloads with a preset dictionary.
+
+Log details repeat the same keys (and many similar values) on every row, which
+plain zlib cannot exploit on payloads of a few hundred bytes. A preset
+dictionary primes the compressor with those common substrings.
+
+Blob layout: 1 byte format version, 2 bytes dictionary id (big endian), then
+the raw zlib stream. The id lets rows written with an older dictionary stay
+readable after a new one is trained.
+
+Decompression always yields the exact bytes that were stored, so hashing the
+canonical JSON read back from a blob gives the same `sha256_hex_of_json` result
+as the plain `Text` column did.
+"""
+
+from __future__ import annotations
+
+import re
+import struct
+import sys
+import threading
+import zlib
+from collections import Counter
+from typing import Callable, Iterable
+
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">BH")
+
+DICT_NONE = 0
+DICT_BUILTIN = 1
+
+# zlib only uses the last 32KB of a preset dictionary.
+MAX_DICT_SIZE = 32 * 1024
+
+
+# Dictionary id 1. Frozen: blobs written with it must stay decodable, so
+# never edit this literal; train and register a new dictionary instead.
+_BUILTIN_DICT = (
+    b'{"ok":false,"task_id":"demo-B-0001","value":0.'
+    b'{"ok":true,"task_id":"demo-A-0001","value":0.'
+    b'"resultHash":"","stage":"RECV","ts":17'
+    b'"resultHash":"","stage":"EXEC","ts":17'
+    b'"resultHash":"","stage":"RESULT","ts":17'
+    b'{"cpu_ms":10,"edgeAddr":"cosmos1'
+    b'","latency_ms":100,"mem_mb_peak":100,"net_kb":10,"resultHash":"'
+    b'","stage":"RESULT","taskId":"demo-A-0001","ts":17'
+)
+
+
+_TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*":?|[^,{}\[\]"]+')
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = 16 * 1024) -> bytes:
+    """Build a preset dictionary from sample payloads.
+
+    Counts JSON tokens (keys with their colon, string values, scalars) and
+    `key:value` pairs, then packs the most valuable ones. zlib favours
+    matches close to the end of the dictionary, so the best tokens go last.
+    """
+    size = min(size, MAX_DICT_SIZE)
+    counts: Counter[bytes] = Counter()
+    for raw in samples:
+        toks = _TOKEN_RE.findall(raw)
+        counts.update(toks)
+        counts.update(a + b for a, b in zip(toks, toks[1:]) if a.endswith(b":"))
+
+    ranked = sorted(
+        ((n * len(tok), tok) for tok, n in counts.items() if n > 1 and len(tok) > 2),
+        reverse=True,
+    )
+    picked: list[bytes] = []
+    used = 0
+    for _, tok in ranked:
+        if used + len(tok) > size:
+            continue
+        picked.append(tok)
+        used += len(tok)
+    return b"".join(reversed(picked))
+
+
+class DetailCodec:
+    """Compress/decompress JSON payloads against a set of known dictionaries."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._dicts: dict[int, bytes] = {
+            DICT_NONE: b"",
+            DICT_BUILTIN: _BUILTIN_DICT,
+        }
+        self.active_id = DICT_BUILTIN
+        # Looks up a dictionary id this process has not seen (set by load_dictionaries).
+        self.loader: Callable[[int], bytes | None] | None = None
+
+    def register(self, dict_id: int, data: bytes, *, activate: bool = False) -> None:
+        if dict_id <= DICT_BUILTIN:
+            raise ValueError(f"dictionary id {dict_id} is reserved")
+        with self._lock:
+            self._dicts[dict_id] = bytes(data[-MAX_DICT_SIZE:])
+            if activate:
+                self.active_id = dict_id
+
+    def compress(self, raw: bytes) -> bytes:
+        dict_id = self.active_id
+        zdict = self._dicts[dict_id]
+        c = zlib.compressobj(level=9, zdict=zdict) if zdict else zlib.compressobj(level=9)
+        return _HEADER.pack(FORMAT_VERSION, dict_id) + c.compress(raw) + c.flush()
+
+    def decompress(self, blob: bytes) -> bytes:
+        version, dict_id = _HEADER.unpack_from(blob)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported blob format {version}")
+        zdict = self._dicts.get(dict_id)
+        if zdict is None and self.loader is not None:
+            # Trained by another process (`python -m app.compression train`) since startup.
+            data = self.loader(dict_id)
+            if data is not None:
+                self.register(dict_id, data, activate=dict_id > self.active_id)
+                zdict = self._dicts[dict_id]
+        if zdict is None:
+            raise ValueError(f"unknown compression dictionary {dict_id}")
+        d = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+        return d.decompress(blob[_HEADER.size :]) + d.flush()
+
+
+codec = DetailCodec()
+
+
+def pack_json_text(text: str, *, compress: bool) -> tuple[str, bytes | None]:
+    """Return the (text column, blob column) pair to store for a JSON payload.
+
+    When compressed the text column holds "" (it is NOT NULL on old schemas).
+    """
+    if not compress:
+        return text, None
+    return "", codec.compress(text.encode("utf-8"))
+
+
+def unpack_json_text(text: str | None, blob: bytes | None) -> str:
+    if blob is not None:
+        return codec.decompress(blob).decode("utf-8")
+    return text or ""
+
+
+# ------------------------- dictionary persistence / lazy backfill -------------------------
+
+
+def load_dictionaries(SessionLocal) -> None:
+    """Register dictionaries stored in `compression_dicts`; the newest becomes active.
+
+    Ids added later are fetched from the table on first use.
+    """
+    from .db import CompressionDict, session_scope
+
+    with session_scope(SessionLocal) as db:
+        rows = db.query(CompressionDict).order_by(CompressionDict.id).all()
+        for r in rows:
+            codec.register(r.id, r.data, activate=True)
+
+    def _load(dict_id: int) -> bytes | None:
+        with session_scope(SessionLocal) as db:
+            row = db.get(CompressionDict, dict_id)
+            return bytes(row.data) if row is not None else None
+
+    codec.loader = _load
+
+
+def train_from_db(SessionLocal, *, sample_rows: int = 2000, size: int = 16 * 1024) -> int:
+    """Train a dictionary from recent rows, persist it and make it active."""
+    from sqlalchemy import func
+
+    from .db import CompressionDict, LogDetail, session_scope
+
+    with session_scope(SessionLocal) as db:
+        last_id = db.query(func.max(CompressionDict.id)).scalar() or DICT_BUILTIN
+        dict_id = max(int(last_id), DICT_BUILTIN) + 1
+        rows = (
+            db.query(LogDetail.detail_json, LogDetail.detail_blob)
+            .order_by(LogDetail.id.desc())
+            .limit(sample_rows)
+            .all()
+        )
+        samples = [unpack_json_text(t, b).encode("utf-8") for t, b in rows]
+        data = train_dictionary(samples, size=size)
+        db.add(CompressionDict(id=dict_id, data=data))
+    codec.register(dict_id, data, activate=True)
+    return dict_id
+
+
+def backfill(SessionLocal, *, batch_size: int = 500, max_rows: int | None = None) -> int:
+    """Compress rows still stored as plain text, in small committed batches.
+
+    Safe to interrupt and rerun: each batch only touches rows whose blob is
+    still NULL, so the migration proceeds lazily in the background.
+    """
+    from .db import LogDetail, TaskResultDetail, session_scope
+
+    done = 0
+    for model, text_col, blob_col in (
+        (LogDetail, "detail_json", "detail_blob"),
+        (TaskResultDetail, "result_json", "result_blob"),
+    ):
+        while max_rows is None or done < max_rows:
+            with session_scope(SessionLocal) as db:
+                rows = (
+                    db.query(model)
+                    .filter(getattr(model, blob_col).is_(None))
+                    .order_by(model.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                for r in rows:
+                    text = getattr(r, text_col)
+                    setattr(r, text_col, "")
+                    setattr(r, blob_col, codec.compress(text.encode("utf-8")))
+            done += len(rows)
+            if len(rows) < batch_size:
+                break
+    return done
+
+
+def _main(argv: list[str]) -> int:
+    from .config import get_settings
+    from .db import init_db
+
+    SessionLocal = init_db(get_settings().db_url)
+    cmd = argv[0] if argv else "backfill"
+    if cmd == "train":
+        print(f"trained dictionary id={train_from_db(SessionLocal)}")
+        return 0
+    if cmd == "backfill":
+        print(f"compressed {backfill(SessionLocal)} rows (dictionary id={codec.active_id})")
+        return 0
+    print(f"unknown command: {cmd}", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
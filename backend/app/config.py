@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
@@ -37,6 +38,9 @@ class Settings:
 
     # Storage
     db_url: str
+    detail_compression: bool = False
+    log_partition: str = "week"
+    log_retention_days: int = 0
 
 
 def _first_env(*keys: str, default: str | None = None) -> str | None:
@@ -48,6 +52,13 @@ def _first_env(*keys: str, default: str | None = None) -> str | None:
     return default
 
 
+def _env_flag(key: str, *, default: bool) -> bool:
+    v = _first_env(key)
+    if v is None:
+        return default
+    return v.lower() in {"1", "true", "yes", "y", "on"}
+
+
 def _default_chain_home(chain_name: str, chain_id: str) -> str:
     # Ignite/Cosmos defaults to ~/.<chain_name>
     home = Path.home() / f".{chain_name}"
@@ -77,8 +88,14 @@ def _resolve_addrs(
     keyring_backend: str,
     names_and_addrs: list[tuple[str, str]],
 ) -> dict[str, str]:
-    """Resolve missing addresses from local keyring via `tbthreed keys show <name> -a`."""
+    """Resolve missing addresses from the local keyring.
+
+    Served from the actor registry's disk cache while the keyring directory is
+    unchanged; otherwise one `tbthreed keys list` call reloads it. Names still
+    missing after that fall back to `keys show <name> -a`, run in parallel.
+    """
     try:
+        from .actors import ActorRegistry
         from .chain_cli import ChainCLI
 
         cli = ChainCLI(
@@ -90,13 +107,35 @@ def _resolve_addrs(
             keyring_backend=keyring_backend,
         )
 
+        registry = ActorRegistry(cli)
         resolved: dict[str, str] = {}
+        missing: list[str] = []
         for name, addr in names_and_addrs:
             if addr and addr.strip() != "":
                 resolved[name] = addr.strip()
                 continue
-            got = cli.keys_show_addr(name)
-            resolved[name] = got.strip() if got else ""
+            if registry.fingerprint == "":
+                registry.load()
+            got = registry.addr_of(name, local_only=True)
+            if got:
+                resolved[name] = got
+            else:
+                missing.append(name)
+
+        # A complete listing is authoritative; per-key lookups only help when `keys list` failed.
+        if missing and not registry.complete:
+
+            def _show(name: str) -> str:
+                try:
+                    return cli.keys_show_addr(name).strip()
+                except Exception:
+                    return ""
+
+            with ThreadPoolExecutor(max_workers=len(missing)) as ex:
+                shown = dict(zip(missing, ex.map(_show, missing)))
+            resolved.update(shown)
+            if any(shown.values()):
+                registry.remember(shown)
         return resolved
     except Exception:
         # If anything goes wrong (missing binary, etc.), do not crash startup.
@@ -164,6 +203,12 @@ def get_settings() -> Settings:
     # DB
     db_path = Path(__file__).resolve().parents[1] / "data" / "tbthree.db"
     db_url = os.getenv("DB_URL") or f"sqlite:///{db_path}"
+    # Store new detail/result payloads as zlib blobs (see app.compression).
+    detail_compression = _env_flag("DETAIL_COMPRESSION", default=False)
+    # Move log_details older than the retention window into per-day/week
+    # archive files (see app.partitions). 0 keeps everything in the hot table.
+    log_partition = _first_env("LOG_PARTITION", default="week") or "week"
+    log_retention_days = int(_first_env("LOG_RETENTION_DAYS", default="0") or "0")
 
     return Settings(
         chain_name=chain_name,
@@ -187,4 +232,7 @@ def get_settings() -> Settings:
         edge3_name=edge3_name,
         edge3_addr=resolved.get(edge3_name, edge3_addr_env),
         db_url=db_url,
+        detail_compression=detail_compression,
+        log_partition=log_partition,
+        log_retention_days=log_retention_days,
     )
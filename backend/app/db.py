@@ -1,22 +1,31 @@
 from __future__ import annotations
 
 import json
+import sqlite3
 from datetime import datetime
-from typing import Any, Generator
-from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Generator
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
 
 from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     create_engine,
     select,
 )
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
+from .compression import load_dictionaries, pack_json_text, unpack_json_text
+from .migrations import run_migrations
+
 
 class Base(DeclarativeBase):
     pass
@@ -29,25 +38,39 @@ class LogDetail(Base):
     task_id = Column(String(128), index=True, nullable=False)
     edge_addr = Column(String(128), index=True, nullable=True)
     stage = Column(String(32), index=True, nullable=False)
-    ts = Column(Integer, nullable=False)
+    ts = Column(Integer, index=True, nullable=False)
 
     cpu_ms = Column(Integer, nullable=False)
     mem_mb_peak = Column(Integer, nullable=False)
     net_kb = Column(Integer, nullable=False)
     latency_ms = Column(Integer, nullable=False)
 
-    result_hash = Column(String(128), nullable=True)
+    result_hash = Column(String(128), index=True, nullable=True)
     log_hash = Column(String(128), unique=True, index=True, nullable=False)
+    # Canonical JSON; "" when the payload lives compressed in detail_blob.
     detail_json = Column(Text, nullable=False)
+    detail_blob = Column(LargeBinary, nullable=True)
 
     # chain audit
-    tx_hash = Column(String(128), nullable=True)
+    tx_hash = Column(String(128), index=True, nullable=True)
     height = Column(Integer, nullable=True)
     msg_type = Column(String(128), nullable=True)
     signer = Column(String(128), nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    @property
+    def detail_text(self) -> str:
+        """Canonical detail JSON, whether stored plain or compressed."""
+        return unpack_json_text(self.detail_json, self.detail_blob)
+
+    # Keep in sync with migrations._m001_log_details_composite_indexes.
+    __table_args__ = (
+        Index("ix_log_details_task_id_ts", "task_id", "ts"),
+        Index("ix_log_details_edge_addr_ts", "edge_addr", "ts"),
+        Index("ix_log_details_stage_ts", "stage", "ts"),
+    )
+
 
 class TaskResultDetail(Base):
     __tablename__ = "task_results"
@@ -56,24 +79,214 @@ class TaskResultDetail(Base):
     task_id = Column(String(128), unique=True, index=True, nullable=False)
     chosen_edge_addr = Column(String(128), nullable=False)
     result_json = Column(Text, nullable=False)
-    result_hash = Column(String(128), nullable=False)
+    result_blob = Column(LargeBinary, nullable=True)
+    result_hash = Column(String(128), index=True, nullable=False)
     result_sig = Column(Text, nullable=True)
     verified = Column(Boolean, default=False, nullable=False)
 
-    tx_hash = Column(String(128), nullable=True)
+    tx_hash = Column(String(128), index=True, nullable=True)
     height = Column(Integer, nullable=True)
     signer = Column(String(128), nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    @property
+    def result_text(self) -> str:
+        return unpack_json_text(self.result_json, self.result_blob)
+
+
+class CompressionDict(Base):
+    """Trained zlib preset dictionaries, referenced by id from compressed blobs."""
+
+    __tablename__ = "compression_dicts"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class LogVerification(Base):
+    """Materialized audit ledger: hash check of each stored log detail (see app.ledger)."""
+
+    __tablename__ = "log_verifications"
+
+    log_hash = Column(String(128), primary_key=True)
+    recomputed_hash = Column(String(128), nullable=False)
+    match = Column(Boolean, nullable=False)
+    # chain height of the row's submitLogSummary tx when it was verified
+    verified_height = Column(Integer, nullable=True)
+    verified_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    checked_at = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
+    check_count = Column(Integer, default=1, nullable=False)
+
+
+class LogPartition(Base):
+    """Manifest of sealed log_details archive files (see app.partitions)."""
+
+    __tablename__ = "log_partitions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(64), unique=True, nullable=False)
+    period = Column(String(16), index=True, nullable=False)
+    path = Column(Text, nullable=False)
+    period_start = Column(Integer, nullable=False)
+    period_end = Column(Integer, nullable=False)
+    min_ts = Column(Integer, index=True, nullable=False)
+    max_ts = Column(Integer, nullable=False)
+    min_task_id = Column(String(128), nullable=False)
+    max_task_id = Column(String(128), nullable=False)
+    rows = Column(Integer, nullable=False)
+    sealed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SeedRun(Base):
+    """One demo seed plan, keyed by a digest of its parameters (see app.seeding)."""
+
+    __tablename__ = "seed_runs"
+
+    run_key = Column(String(64), primary_key=True)
+    params_json = Column(Text, nullable=False)
+    # Clock values the plan was generated with, so a resume replans identical logs.
+    now_ts = Column(Integer, nullable=False)
+    created_ts = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)  # running | partial | done
+    steps_total = Column(Integer, nullable=False)
+    attempts = Column(Integer, default=1, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class SeedStep(Base):
+    """A seed tx that reached the chain; a resumed run skips these."""
+
+    __tablename__ = "seed_steps"
+
+    run_key = Column(String(64), primary_key=True)
+    task_id = Column(String(128), primary_key=True)  # "" for run-wide steps (edge registration)
+    step = Column(String(160), primary_key=True)
+    tx_hash = Column(String(128), nullable=True)
+    height = Column(Integer, nullable=True)
+    done_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class MetricRollup(Base):
+    """Log metric totals of one edge or region per time bucket (see app.rollups)."""
+
+    __tablename__ = "metric_rollups"
+
+    scope = Column(String(8), primary_key=True)  # edge | region
+    key = Column(String(128), primary_key=True)
+    bucket = Column(String(4), primary_key=True)  # 1m | 1h | 1d
+    bucket_ts = Column(Integer, primary_key=True)  # bucket start (unix seconds)
+    count = Column(Integer, nullable=False)
+    cpu_ms = Column(Integer, nullable=False)
+    mem_mb_peak = Column(Integer, nullable=False)
+    net_kb = Column(Integer, nullable=False)
+    latency_ms = Column(Integer, nullable=False)
+
+
+class MetricLatencyBin(Base):
+    """Latency sketch counters of one metric_rollups bucket (see app.rollups)."""
+
+    __tablename__ = "metric_latency_bins"
+
+    scope = Column(String(8), primary_key=True)
+    key = Column(String(128), primary_key=True)
+    bucket = Column(String(4), primary_key=True)
+    bucket_ts = Column(Integer, primary_key=True)
+    bin = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+
+class PendingRegionRollup(Base):
+    """A log detail stored before its edge's region was known; its region rollups are added later (see app.rollups)."""
+
+    __tablename__ = "pending_region_rollups"
+
+    log_hash = Column(String(128), primary_key=True)
+    task_id = Column(String(128), nullable=False)
+    edge_addr = Column(String(128), nullable=False)
+    ts = Column(Integer, nullable=False)
+    cpu_ms = Column(Integer, nullable=False)
+    mem_mb_peak = Column(Integer, nullable=False)
+    net_kb = Column(Integer, nullable=False)
+    latency_ms = Column(Integer, nullable=False)
+
+
+class TaskPipeline(Base):
+    """When a task reached each pipeline stage (see app.pipeline)."""
+
+    __tablename__ = "task_pipeline"
+
+    task_id = Column(String(128), primary_key=True)
+    edge_addr = Column(String(128), index=True, nullable=True)
+    region = Column(String(32), nullable=True)
+    create_ts = Column(Integer, nullable=True)
+    recv_ts = Column(Integer, nullable=True)
+    exec_ts = Column(Integer, nullable=True)
+    result_ts = Column(Integer, nullable=True)
+    stage = Column(String(16), nullable=False)  # furthest stage reached
+    stage_ts = Column(Integer, nullable=False)  # when it was reached
+
+    __table_args__ = (Index("ix_task_pipeline_stage_ts", "stage", "stage_ts"),)
+
+
+class PipelineLatencyBin(Base):
+    """Stage-to-stage duration sketch counters per fleet / edge / region (see app.pipeline)."""
+
+    __tablename__ = "pipeline_latency_bins"
+
+    scope = Column(String(8), primary_key=True)  # all | edge | region
+    key = Column(String(128), primary_key=True)  # "" for scope=all
+    transition = Column(String(16), primary_key=True)  # e.g. RECV>EXEC
+    bin = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+    sum_sec = Column(Integer, nullable=False)
+
 
 def make_engine(db_url: str):
     return create_engine(db_url, future=True)
 
 
+def _sqlite_file(db_url: str) -> str | None:
+    url = make_url(db_url)
+    if url.get_backend_name() != "sqlite" or url.database in {None, "", ":memory:"}:
+        return None
+    return str(Path(url.database).resolve())
+
+
 def init_db(db_url: str) -> sessionmaker[Session]:
     engine = make_engine(db_url)
+    if _sqlite_file(db_url):
+        # WAL lets readers (exports, audits) run alongside the ingest writer.
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
     Base.metadata.create_all(engine)
+    run_migrations(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    load_dictionaries(SessionLocal)
+    return SessionLocal
+
+
+def init_readonly_db(db_url: str) -> sessionmaker[Session] | None:
+    """Session factory on a read-only connection pool, for bulk reads.
+
+    SQLite files are opened with mode=ro, so a long export can never take a
+    write lock. Returns None for in-memory SQLite (no second connection can
+    see it).
+    """
+    url = make_url(db_url)
+    if url.get_backend_name() != "sqlite":
+        engine = create_engine(db_url, future=True)
+    else:
+        path = _sqlite_file(db_url)
+        if path is None:
+            return None
+        engine = create_engine(
+            "sqlite://",
+            creator=lambda: sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False),
+            future=True,
+        )
     return sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
@@ -90,6 +303,42 @@ def session_scope(SessionLocal: sessionmaker[Session]) -> Generator[Session, Non
         db.close()
 
 
+# async (aiosqlite) — same DB file, for endpoints that await DB work next to chain calls.
+# Schema creation and migrations stay on the sync engine in init_db, which must run first.
+
+def async_db_url(db_url: str) -> str:
+    url = make_url(db_url)
+    if url.drivername in {"sqlite", "sqlite+pysqlite"}:
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def init_async_db(db_url: str) -> async_sessionmaker[AsyncSession] | None:
+    """Async session factory for db_url, or None for in-memory SQLite.
+
+    An in-memory database is private to its connection, so an async engine
+    could never see the tables created by init_db.
+    """
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite" and url.database in {None, "", ":memory:"}:
+        return None
+    engine = create_async_engine(async_db_url(db_url), future=True)
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def async_session_scope(AsyncSessionLocal: async_sessionmaker[AsyncSession]) -> AsyncGenerator[AsyncSession, None]:
+    db = AsyncSessionLocal()
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
 # helpers
 
 def upsert_task_result(
@@ -104,8 +353,10 @@ def upsert_task_result(
     tx_hash: str | None = None,
     height: int | None = None,
     signer: str | None = None,
+    compress: bool = False,
 ) -> None:
     payload = json.dumps(result_json, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    payload, blob = pack_json_text(payload, compress=compress)
     existing = db.execute(select(TaskResultDetail).where(TaskResultDetail.task_id == task_id)).scalar_one_or_none()
     if existing is None:
         db.add(
@@ -113,6 +364,7 @@ def upsert_task_result(
                 task_id=task_id,
                 chosen_edge_addr=chosen_edge_addr,
                 result_json=payload,
+                result_blob=blob,
                 result_hash=result_hash,
                 result_sig=result_sig,
                 verified=verified,
@@ -124,6 +376,7 @@ def upsert_task_result(
     else:
         existing.chosen_edge_addr = chosen_edge_addr
         existing.result_json = payload
+        existing.result_blob = blob
         existing.result_hash = result_hash
         existing.result_sig = result_sig
         existing.verified = verified
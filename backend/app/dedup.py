@@ -0,0 +1,139 @@
+"""Idempotent log ingestion keyed on `log_hash`.
+
+Edges retry `POST /edges/{edge_addr}/logs` after timeouts. A Bloom filter of
+every stored `log_hash` answers "definitely new" without touching the DB; only
+possible duplicates pay for the indexed lookup. The filter is rebuilt from
+`log_details` (hot table and archive partitions) at startup and updated on
+every insert, so it never yields a false negative inside one process.
+
+The filter is sized from the row counts and filled straight from the cursors,
+so startup never holds the hashes in memory. Once inserts push it past its
+capacity it is rebuilt at the new size on a background thread; hashes added
+meanwhile are replayed into the new filter before it replaces the old one.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import LogDetail, LogPartition, session_scope
+from .partitions import LogStore, iter_archive_rows
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (double hashing over sha256)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.nbits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 64)
+        self.k = max(int(round(self.nbits / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.nbits + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str) -> list[int]:
+        d = hashlib.sha256(key.encode("utf-8")).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:16], "little") | 1
+        return [(h1 + i * h2) % self.nbits for i in range(self.k)]
+
+    def add(self, key: str) -> None:
+        pos = self._positions(key)
+        with self._lock:
+            for p in pos:
+                self.bits[p >> 3] |= 1 << (p & 7)
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class LogDedup:
+    """Bloom-filter front plus indexed confirmation for log_hash duplicates."""
+
+    # Headroom so the filter stays near its target error rate as logs arrive.
+    GROWTH = 4
+
+    def __init__(self, log_store: LogStore) -> None:
+        self.log_store = log_store
+        self.bloom = BloomFilter(1024)
+        self._inflight: set[str] = set()
+        self._lock = threading.Lock()
+        self._SessionLocal: sessionmaker[Session] | None = None
+        self._pending: list[str] | None = None  # hashes added while a rebuild runs
+
+    def rebuild(self, SessionLocal: sessionmaker[Session]) -> int:
+        """Reload the filter from every stored log_hash. Returns the number loaded."""
+        self._SessionLocal = SessionLocal
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+        try:
+            n = 0
+            with session_scope(SessionLocal) as db:
+                hot = db.execute(select(func.count()).select_from(LogDetail)).scalar() or 0
+                parts = db.execute(select(LogPartition.path, LogPartition.rows)).all()
+                bloom = BloomFilter(max((hot + sum(r for _, r in parts)) * self.GROWTH, 1024))
+                stmt = select(LogDetail.log_hash).execution_options(yield_per=5000)
+                for chunk in db.execute(stmt).scalars().partitions():
+                    for h in chunk:
+                        bloom.add(h)
+                    n += len(chunk)
+            for path, _ in parts:
+                for (h,) in iter_archive_rows(path, "SELECT log_hash FROM log_details"):
+                    bloom.add(h)
+                    n += 1
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            for h in self._pending:
+                bloom.add(h)
+            self.bloom = bloom
+            self._pending = None
+        return n
+
+    def _grow(self) -> None:
+        try:
+            n = self.rebuild(self._SessionLocal)
+            print(f"[dedup] bloom filter resized for {n} log hashes")
+        except Exception as e:
+            print(f"[dedup] bloom filter resize failed: {e}")
+
+    def add(self, log_hash: str) -> None:
+        self.bloom.add(log_hash)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(log_hash)
+                return
+            if self.bloom.count <= self.bloom.capacity or self._SessionLocal is None:
+                return
+            self._pending = [log_hash]
+        threading.Thread(target=self._grow, name="dedup-grow", daemon=True).start()
+
+    async def lookup(self, db: AsyncSession, log_hash: str) -> LogDetail | None:
+        """Return the stored row for log_hash, or None if it was never ingested."""
+        if log_hash not in self.bloom:
+            return None
+        rows = await self.log_store.aquery(db, log_hash=log_hash)
+        return rows[0] if rows else None
+
+    def claim(self, log_hash: str) -> bool:
+        """Mark log_hash as being ingested by this process; False if already in flight."""
+        with self._lock:
+            if log_hash in self._inflight:
+                return False
+            self._inflight.add(log_hash)
+            return True
+
+    def release(self, log_hash: str) -> None:
+        with self._lock:
+            self._inflight.discard(log_hash)
@@ -0,0 +1,220 @@
+"""In-memory edge selection for create_task.
+
+Each region keeps its selectable edges (registered, not TASK_FROZEN) in a
+list ranked by score. Picking an edge reads that list and the in-flight
+counters without touching the chain:
+
+  - best: the top-ranked edge.
+  - p2c (default): power of two choices. Sample two edges from the region's
+    top EDGE_SELECT_TOP_K and keep the one with the higher
+    score / (1 + in-flight tasks), so a popular edge sheds load to its peers.
+
+State comes from `list-edge` snapshots (`sync`). A background refresher
+takes one every EDGE_SELECT_REFRESH_SEC, or sooner after `request_refresh()`
+(txs that move scores or freeze edges). In-flight counts are kept locally:
+`acquire` when a task is created on an edge, `release` when its result or
+feedback lands. Tasks that never get either (abandoned) stop counting after
+EDGE_SELECT_INFLIGHT_TTL_SEC; they are aged out on every sync.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+POLICIES = ("p2c", "best")
+
+
+def _int(v: Any) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(frozen=True)
+class EdgeState:
+    addr: str
+    region: str
+    score: int
+    frozen: bool
+
+
+def edge_state(e: dict[str, Any]) -> EdgeState | None:
+    addr = e.get("edgeAddr") or e.get("edge_addr")
+    if not addr:
+        return None
+    return EdgeState(addr, str(e.get("region") or ""), _int(e.get("score", 0)), e.get("status") == "TASK_FROZEN")
+
+
+class EdgeSelector:
+    def __init__(self, *, policy: str | None = None, top_k: int | None = None, rng: random.Random | None = None) -> None:
+        self.policy = policy or os.getenv("EDGE_SELECT_POLICY", "p2c")
+        if self.policy not in POLICIES:
+            raise ValueError(f"policy must be one of: {', '.join(POLICIES)}")
+        self.top_k = top_k or int(os.getenv("EDGE_SELECT_TOP_K", "8"))
+        self._rng = rng or random.Random()
+        self._edges: dict[str, EdgeState] = {}
+        self._ranked: dict[str, list[tuple[int, str]]] = {}  # region -> [(-score, addr)] of selectable edges
+        self._in_flight: dict[str, int] = {}
+        self._tasks: dict[str, tuple[str, float]] = {}  # task_id -> (edge addr, acquired at), oldest first
+        self.inflight_ttl = float(os.getenv("EDGE_SELECT_INFLIGHT_TTL_SEC", "3600"))
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.synced_at: float | None = None
+        self.picks = 0
+
+    # ---- chain state ----
+
+    def sync(self, edges: list[dict[str, Any]]) -> int:
+        """Replace the edge set with a `list-edge` snapshot. Returns the number of edges."""
+        states = [st for st in map(edge_state, edges) if st is not None]
+        ranked: dict[str, list[tuple[int, str]]] = {}
+        for st in states:
+            if not st.frozen:
+                ranked.setdefault(st.region, []).append((-st.score, st.addr))
+        for lst in ranked.values():
+            lst.sort()
+        with self._lock:
+            self._edges = {st.addr: st for st in states}
+            self._ranked = ranked
+            self.synced_at = time.time()
+            self._expire(self.synced_at - self.inflight_ttl)
+        return len(states)
+
+    def update(self, edge: dict[str, Any]) -> None:
+        """Apply one changed edge object (e.g. from show-edge)."""
+        st = edge_state(edge)
+        if st is None:
+            return
+        with self._lock:
+            old = self._edges.get(st.addr)
+            if old is not None and not old.frozen:
+                lst = self._ranked.get(old.region, [])
+                i = bisect.bisect_left(lst, (-old.score, old.addr))
+                if i < len(lst) and lst[i] == (-old.score, old.addr):
+                    del lst[i]
+            self._edges[st.addr] = st
+            if not st.frozen:
+                bisect.insort(self._ranked.setdefault(st.region, []), (-st.score, st.addr))
+
+    def region_of(self, addr: str) -> str | None:
+        st = self._edges.get(addr)
+        return st.region if st is not None and st.region else None
+
+    def regions(self) -> dict[str, str]:
+        """{edge address: region} of the known edges that have one."""
+        with self._lock:
+            return {a: st.region for a, st in self._edges.items() if st.region}
+
+    # ---- selection ----
+
+    def pick(self, region: str, *, policy: str | None = None) -> str | None:
+        """Edge address for a new task in region; falls back to any known edge."""
+        with self._lock:
+            return self._pick(region, policy or self.policy)
+
+    def assign(self, tasks: list[tuple[str, str]], *, policy: str | None = None) -> list[str | None]:
+        """Pick and acquire edges for [(task_id, region), ...] in one pass.
+
+        Each pick sees the in-flight counts of the picks before it, so p2c
+        spreads a batch over the region's top edges.
+        """
+        with self._lock:
+            out: list[str | None] = []
+            for task_id, region in tasks:
+                addr = self._pick(region, policy or self.policy)
+                if addr is not None:
+                    self._acquire(task_id, addr)
+                out.append(addr)
+            return out
+
+    def _pick(self, region: str, policy: str) -> str | None:
+        lst = self._ranked.get(region)
+        if not lst:
+            if not self._edges:
+                return None
+            return next(iter(self._edges))
+        self.picks += 1
+        if policy == "best" or len(lst) == 1:
+            return lst[0][1]
+        a, b = self._rng.sample(lst[: self.top_k], 2)
+        return max(a, b, key=lambda x: (-x[0] / (1 + self._in_flight.get(x[1], 0)), -self._in_flight.get(x[1], 0)))[1]
+
+    def acquire(self, task_id: str, addr: str) -> None:
+        with self._lock:
+            self._acquire(task_id, addr)
+
+    def _acquire(self, task_id: str, addr: str) -> None:
+        cur = self._tasks.get(task_id)
+        if cur is not None and cur[0] == addr:
+            return
+        self._release(task_id)
+        self._tasks[task_id] = (addr, time.time())
+        self._in_flight[addr] = self._in_flight.get(addr, 0) + 1
+
+    def release(self, task_id: str) -> None:
+        with self._lock:
+            self._release(task_id)
+
+    def _release(self, task_id: str) -> None:
+        cur = self._tasks.pop(task_id, None)
+        if cur is None:
+            return
+        addr = cur[0]
+        n = self._in_flight.get(addr, 0) - 1
+        if n > 0:
+            self._in_flight[addr] = n
+        else:
+            self._in_flight.pop(addr, None)
+
+    def _expire(self, before: float) -> None:
+        # _tasks is in acquisition order (re-acquiring re-inserts), so stop at the first live one.
+        stale = []
+        for task_id, (_, at) in self._tasks.items():
+            if at >= before:
+                break
+            stale.append(task_id)
+        for task_id in stale:
+            self._release(task_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "topK": self.top_k,
+                "edges": len(self._edges),
+                "selectable": {r: len(lst) for r, lst in self._ranked.items()},
+                "inFlight": dict(self._in_flight),
+                "picks": self.picks,
+                "syncedAt": self.synced_at,
+            }
+
+    # ---- refresher ----
+
+    def request_refresh(self) -> None:
+        self._wake.set()
+
+    def start_refresher(
+        self, fetch: Callable[[], list[dict[str, Any]]], *, interval: float | None = None, on_sync: Callable[[], None] | None = None
+    ) -> None:
+        """Re-sync from fetch() every interval seconds, or right after request_refresh(); on_sync runs after each successful sync."""
+        interval = interval if interval is not None else float(os.getenv("EDGE_SELECT_REFRESH_SEC", "10"))
+
+        def _worker() -> None:
+            while True:
+                try:
+                    self.sync(fetch())
+                    if on_sync is not None:
+                        on_sync()
+                except Exception as e:
+                    print(f"[edge-select] refresh failed: {e}")
+                self._wake.wait(interval)
+                self._wake.clear()
+
+        threading.Thread(target=_worker, name="edge-select", daemon=True).start()
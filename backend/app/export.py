@@ -0,0 +1,146 @@
+"""Bulk export of log details for offline analytics.
+
+Rows stream from sealed archive partitions (oldest first) and then the hot
+table, each in ts order. The hot table is read through a server-side cursor
+(`yield_per`) on the read-only session factory. Output is written one chunk
+at a time, so memory stays flat regardless of range size.
+
+Formats:
+  - csv:      header row plus one line per log
+  - ndjson:   one JSON object per log
+  - columnar: {"columns": [...], "chunks": [{"rows": n, "values": [[col0...], [col1...], ...]}], "rows": total}
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Callable, Iterator
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .compression import unpack_json_text
+from .db import session_scope
+from .partitions import LogStore, build_query, iter_archive_rows
+
+CHUNK_SIZE = 2000
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson", "columnar": "application/json"}
+SUFFIXES = {"csv": ".csv", "ndjson": ".ndjson", "columnar": ".json"}
+
+EXPORT_COLUMNS = [
+    "log_hash",
+    "task_id",
+    "edge_addr",
+    "stage",
+    "ts",
+    "cpu_ms",
+    "mem_mb_peak",
+    "net_kb",
+    "latency_ms",
+    "result_hash",
+    "tx_hash",
+    "height",
+    "msg_type",
+    "signer",
+    "created_at",
+]
+
+
+def _cell(v: Any) -> Any:
+    # Hot rows carry datetimes, archive rows the SQLite text form; emit both the same way.
+    return str(v) if isinstance(v, datetime) else v
+
+
+def iter_export_chunks(
+    db: Session,
+    log_store: LogStore,
+    *,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+    stage: str | None = None,
+    include_detail: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[list[tuple]]:
+    """Lists of up to chunk_size row tuples (EXPORT_COLUMNS [+ detail])."""
+    cols = EXPORT_COLUMNS + (["detail_json", "detail_blob"] if include_detail else [])
+    q, sql, params = build_query(edge_addr=edge, stage=stage, from_ts=from_ts, to_ts=to_ts, columns=cols)
+    sql += " ORDER BY ts"
+    n = len(EXPORT_COLUMNS)
+
+    def shape(r: tuple) -> tuple:
+        out = tuple(_cell(v) for v in r[:n])
+        return out + (unpack_json_text(r[n], r[n + 1]),) if include_detail else out
+
+    streams: list[Iterator[tuple]] = [
+        iter_archive_rows(p.path, sql, params, chunk_size=chunk_size)
+        for p in log_store.prune(db, from_ts=from_ts, to_ts=to_ts)
+    ]
+    streams.append(iter(db.execute(q.execution_options(yield_per=chunk_size))))
+
+    chunk: list[tuple] = []
+    for stream in streams:
+        for r in stream:
+            chunk.append(shape(tuple(r)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv(columns: list[str], chunks: Iterator[list[tuple]]) -> Iterator[str]:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(columns)
+    for chunk in chunks:
+        w.writerows(chunk)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _ndjson(columns: list[str], chunks: Iterator[list[tuple]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(json.dumps(dict(zip(columns, r)), ensure_ascii=False) + "\n" for r in chunk)
+
+
+def _columnar(columns: list[str], chunks: Iterator[list[tuple]]) -> Iterator[str]:
+    yield '{"columns":' + json.dumps(columns) + ',"chunks":['
+    total = 0
+    for i, chunk in enumerate(chunks):
+        body = json.dumps({"rows": len(chunk), "values": [list(c) for c in zip(*chunk)]}, ensure_ascii=False, separators=(",", ":"))
+        yield ("," if i else "") + body
+        total += len(chunk)
+    yield '],"rows":' + str(total) + "}"
+
+
+_WRITERS = {"csv": _csv, "ndjson": _ndjson, "columnar": _columnar}
+
+
+def export_logs(
+    SessionLocal: sessionmaker[Session],
+    log_store: LogStore,
+    fmt: str,
+    *,
+    include_detail: bool = False,
+    on_rows: Callable[[int], None] | None = None,
+    **filters: Any,
+) -> Iterator[str]:
+    """Encoded export text, chunk by chunk. `on_rows` is called with each chunk's row count."""
+    columns = EXPORT_COLUMNS + (["detail"] if include_detail else [])
+    with session_scope(SessionLocal) as db:
+        chunks = iter_export_chunks(db, log_store, include_detail=include_detail, **filters)
+        if on_rows is not None:
+            chunks = _counted(chunks, on_rows)
+        yield from _WRITERS[fmt](columns, chunks)
+
+
+def _counted(chunks: Iterator[list[tuple]], on_rows: Callable[[int], None]) -> Iterator[list[tuple]]:
+    for chunk in chunks:
+        on_rows(len(chunk))
+        yield chunk
@@ -0,0 +1,215 @@
+"""Fleet-wide streaming audit (chain log summaries vs stored log details).
+
+Both sides are sorted by log hash and merge-joined, so memory stays bounded by
+the chain summary list plus one chunk of DB rows. The DB side streams the hot
+table and each overlapping archive partition with server-side cursors and
+merges them with `heapq.merge`. Hashes are recomputed in chunks on a process
+pool. The app creates it at startup (`start_pool`) and shuts it down on exit;
+its workers come from a forkserver (spawn where that is unavailable), never
+a fork of the threaded server process.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from .compression import unpack_json_text
+from .db import LogDetail, session_scope
+from .hashing import canonicalize_and_hash_many
+from .partitions import LogStore, iter_archive_rows
+
+CHUNK_SIZE = 512
+
+_POOL: ProcessPoolExecutor | None = None
+
+
+def start_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        workers = int(os.getenv("AUDIT_POOL_WORKERS", "0")) or None
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+    return _POOL
+
+
+def get_pool() -> ProcessPoolExecutor:
+    return _POOL if _POOL is not None else start_pool()
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(cancel_futures=True)
+        _POOL = None
+
+
+def recompute_hashes(texts: list[str]) -> list[str]:
+    """Audit rule for a batch of stored detail JSON strings (runs in a worker process)."""
+    objs: list[Any] = []
+    bad: set[int] = set()
+    for i, t in enumerate(texts):
+        try:
+            objs.append(json.loads(t))
+        except Exception:
+            objs.append(None)
+            bad.add(i)
+    return ["" if i in bad else h for i, (_, h) in enumerate(canonicalize_and_hash_many(objs))]
+
+
+def _chain_in_range(item: dict[str, Any], from_ts: int | None, to_ts: int | None, edge: str | None) -> bool:
+    if edge is not None and item.get("edgeAddr") != edge:
+        return False
+    try:
+        ts = int(item.get("ts", 0))
+    except Exception:
+        ts = 0
+    if from_ts is not None and ts < from_ts:
+        return False
+    if to_ts is not None and ts > to_ts:
+        return False
+    return True
+
+
+def sorted_chain_items(
+    chain_items: Iterable[dict[str, Any]],
+    *,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+) -> list[tuple[str, dict[str, Any]]]:
+    items = [
+        ((it.get("logHash") or it.get("log_hash") or ""), it)
+        for it in chain_items
+        if _chain_in_range(it, from_ts, to_ts, edge)
+    ]
+    items.sort(key=lambda x: x[0])
+    return items
+
+
+_DB_FIELDS = ("log_hash", "task_id", "edge_addr", "stage", "ts", "detail_json", "detail_blob", "tx_hash", "height")
+
+
+def _iter_hot(db: Session, from_ts: int | None, to_ts: int | None, edge: str | None) -> Iterator[tuple]:
+    cols = [getattr(LogDetail, f) for f in _DB_FIELDS]
+    q = select(*cols)
+    if from_ts is not None:
+        q = q.where(LogDetail.ts >= from_ts)
+    if to_ts is not None:
+        q = q.where(LogDetail.ts <= to_ts)
+    if edge is not None:
+        q = q.where(LogDetail.edge_addr == edge)
+    q = q.order_by(LogDetail.log_hash).execution_options(yield_per=CHUNK_SIZE)
+    for r in db.execute(q):
+        yield tuple(r)
+
+
+def _iter_archive(path: str, from_ts: int | None, to_ts: int | None, edge: str | None) -> Iterator[tuple]:
+    where: list[str] = []
+    params: dict[str, Any] = {}
+    if from_ts is not None:
+        where.append("ts >= :from_ts")
+        params["from_ts"] = from_ts
+    if to_ts is not None:
+        where.append("ts <= :to_ts")
+        params["to_ts"] = to_ts
+    if edge is not None:
+        where.append("edge_addr = :edge")
+        params["edge"] = edge
+    sql = f"SELECT {', '.join(_DB_FIELDS)} FROM log_details"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY log_hash"
+    return iter_archive_rows(path, sql, params, chunk_size=CHUNK_SIZE)
+
+
+def iter_db_sorted(
+    db: Session,
+    log_store: LogStore,
+    *,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+) -> Iterator[tuple]:
+    """Stored rows (hot + pruned archives) as `_DB_FIELDS` tuples in log_hash order."""
+    streams = [_iter_hot(db, from_ts, to_ts, edge)]
+    for p in log_store.prune(db, from_ts=from_ts, to_ts=to_ts):
+        streams.append(_iter_archive(p.path, from_ts, to_ts, edge))
+    return heapq.merge(*streams, key=lambda r: r[0])
+
+
+def _db_view(r: tuple) -> dict[str, Any]:
+    return {"taskId": r[1], "edgeAddr": r[2], "stage": r[3], "ts": r[4], "txHash": r[7], "height": r[8]}
+
+
+def stream_fleet_audit(
+    chain_sorted: list[tuple[str, dict[str, Any]]],
+    db_rows: Iterator[tuple],
+    *,
+    pool: Executor,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Merge-join both sorted sides; yield one record per log hash, then a summary."""
+    summary = {"matched": 0, "mismatched": 0, "missing_in_db": 0, "missing_on_chain": 0}
+    workers = workers or os.cpu_count() or 1
+    pending: list[tuple[str, dict[str, Any], tuple]] = []
+
+    def flush() -> Iterator[dict[str, Any]]:
+        if not pending:
+            return
+        texts = [unpack_json_text(r[5], r[6]) for _, _, r in pending]
+        step = max(len(texts) // workers, 64)
+        parts = [texts[i : i + step] for i in range(0, len(texts), step)]
+        recomputed = [h for part in pool.map(recompute_hashes, parts) for h in part]
+        for (h, item, r), rh in zip(pending, recomputed):
+            status = "matched" if rh == h else "mismatched"
+            summary[status] += 1
+            yield {"logHash": h, "status": status, "recomputed": rh, "chain": item, "db": _db_view(r)}
+        pending.clear()
+
+    it = iter(db_rows)
+    cur = next(it, None)
+    for h, item in chain_sorted:
+        while cur is not None and cur[0] < h:
+            summary["missing_on_chain"] += 1
+            yield {"logHash": cur[0], "status": "missing_on_chain", "db": _db_view(cur)}
+            cur = next(it, None)
+        if cur is not None and cur[0] == h:
+            pending.append((h, item, cur))
+            cur = next(it, None)
+            if len(pending) >= chunk_size:
+                yield from flush()
+        else:
+            summary["missing_in_db"] += 1
+            yield {"logHash": h, "status": "missing_in_db", "chain": item}
+    while cur is not None:
+        summary["missing_on_chain"] += 1
+        yield {"logHash": cur[0], "status": "missing_on_chain", "db": _db_view(cur)}
+        cur = next(it, None)
+    yield from flush()
+
+    yield {"summary": {**summary, "total": sum(summary.values())}}
+
+
+def fleet_audit_ndjson(
+    SessionLocal: sessionmaker[Session],
+    log_store: LogStore,
+    chain_items: Iterable[dict[str, Any]],
+    *,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+) -> Iterator[str]:
+    chain_sorted = sorted_chain_items(chain_items, from_ts=from_ts, to_ts=to_ts, edge=edge)
+    with session_scope(SessionLocal) as db:
+        rows = iter_db_sorted(db, log_store, from_ts=from_ts, to_ts=to_ts, edge=edge)
+        for rec in stream_fleet_audit(chain_sorted, rows, pool=get_pool()):
+            yield json.dumps(rec, ensure_ascii=False) + "\n"
@@ -2,7 +2,11 @@ from __future__ import annotations
 
 import hashlib
 import json
-from typing import Any
+import os
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Sequence
 
 
 def canonical_json_bytes(obj: Any) -> bytes:
@@ -24,3 +28,181 @@ def sha256_hex(data: bytes) -> str:
 
 def sha256_hex_of_json(obj: Any) -> str:
     return sha256_hex(canonical_json_bytes(obj))
+
+
+# ------------------------- hashing engine -------------------------
+#
+# `canonical_json_bytes` above is the reference rule. Faster serializers are
+# only used for values they are known to encode byte-for-byte identically, and
+# only after a randomized conformance check against the reference passes.
+
+_INT64 = 2**63
+
+
+def _fast_safe(obj: Any) -> bool:
+    """True if obj only holds types where orjson matches the reference rule.
+
+    Floats are excluded (repr formatting differs, e.g. 1e+16 vs 1e16), as are
+    non-str keys (json.dumps coerces them, orjson rejects them) and ints
+    outside int64.
+    """
+    stack = [obj]
+    while stack:
+        x = stack.pop()
+        t = type(x)
+        if t is str or t is bool or x is None:
+            continue
+        if t is int:
+            if not -_INT64 <= x < _INT64:
+                return False
+            continue
+        if t is dict:
+            for k, v in x.items():
+                if type(k) is not str:
+                    return False
+                stack.append(v)
+            continue
+        if t is list or t is tuple:
+            stack.extend(x)
+            continue
+        return False
+    return True
+
+
+def _orjson_backend() -> Callable[[Any], bytes] | None:
+    try:
+        import orjson  # type: ignore
+    except ImportError:
+        return None
+    opts = orjson.OPT_SORT_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        if _fast_safe(obj):
+            return orjson.dumps(obj, option=opts)
+        return canonical_json_bytes(obj)
+
+    return dumps
+
+
+_BACKENDS: dict[str, Callable[[], Callable[[Any], bytes] | None]] = {
+    "json": lambda: canonical_json_bytes,
+    "orjson": _orjson_backend,
+}
+
+
+def random_json(rnd: random.Random, depth: int = 3) -> Any:
+    """Random JSON value for conformance checks (unicode, nesting, edge numbers)."""
+    alphabet = "abcXYZ_-09 \"\\/\n\t\x00\x1f\x7fé中 \U0001f600"
+
+    def s() -> str:
+        return "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 8)))
+
+    kind = rnd.randint(0, 8 if depth > 0 else 5)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return rnd.random() < 0.5
+    if kind == 2:
+        return rnd.choice([0, -1, 1, 2**31, -(2**53), 2**63 - 1, -(2**63), 2**64, rnd.randint(-(10**9), 10**9)])
+    if kind == 3:
+        return rnd.choice([0.0, -0.0, 0.1, 1e16, 1e-7, 123.456, rnd.random()])
+    if kind in (4, 5):
+        return s()
+    if kind in (6, 7):
+        return {s(): random_json(rnd, depth - 1) for _ in range(rnd.randint(0, 5))}
+    return [random_json(rnd, depth - 1) for _ in range(rnd.randint(0, 5))]
+
+
+def conformance_check(dumps: Callable[[Any], bytes], *, samples: int = 2000, seed: int = 0) -> list[Any]:
+    """Return the generated values (up to 10) where dumps differs from the reference rule."""
+    rnd = random.Random(seed)
+    bad: list[Any] = []
+    for _ in range(samples):
+        obj = random_json(rnd)
+        try:
+            ok = dumps(obj) == canonical_json_bytes(obj)
+        except Exception:
+            ok = False
+        if not ok:
+            bad.append(obj)
+            if len(bad) >= 10:
+                break
+    return bad
+
+
+class HashEngine:
+    """Canonicalize + sha256 with a pluggable, conformance-checked serializer."""
+
+    # Below this many objects a thread pool costs more than it saves.
+    PARALLEL_MIN_BATCH = 256
+
+    def __init__(self, backend: str = "auto", *, workers: int | None = None) -> None:
+        self.backend = "json"
+        self._dumps: Callable[[Any], bytes] = canonical_json_bytes
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        names = ["orjson", "json"] if backend == "auto" else [backend, "json"]
+        for name in names:
+            factory = _BACKENDS.get(name)
+            dumps = factory() if factory else None
+            if dumps is None:
+                continue
+            if dumps is not canonical_json_bytes and conformance_check(dumps):
+                print(f"[hashing] backend {name} failed conformance check; falling back", file=sys.stderr)
+                continue
+            self.backend, self._dumps = name, dumps
+            break
+
+    def canonicalize(self, obj: Any) -> bytes:
+        return self._dumps(obj)
+
+    def canonicalize_and_hash(self, obj: Any) -> tuple[bytes, str]:
+        data = self._dumps(obj)
+        return data, hashlib.sha256(data).hexdigest()
+
+    def canonicalize_and_hash_many(self, objs: Sequence[Any]) -> list[tuple[bytes, str]]:
+        """(canonical bytes, sha256 hex) for each object, in order.
+
+        Serialization is GIL-bound and runs inline; hashing releases the GIL
+        on large buffers and is spread over threads for big batches.
+        """
+        datas = [self._dumps(o) for o in objs]
+        if len(datas) < self.PARALLEL_MIN_BATCH or self.workers <= 1:
+            return [(d, hashlib.sha256(d).hexdigest()) for d in datas]
+        step = -(-len(datas) // self.workers)
+        chunks = [datas[i : i + step] for i in range(0, len(datas), step)]
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            digests = [h for part in ex.map(lambda c: [hashlib.sha256(d).hexdigest() for d in c], chunks) for h in part]
+        return list(zip(datas, digests))
+
+
+_ENGINE: HashEngine | None = None
+
+
+def get_engine() -> HashEngine:
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = HashEngine(os.getenv("HASH_BACKEND", "auto"))
+    return _ENGINE
+
+
+def canonicalize_and_hash(obj: Any) -> tuple[bytes, str]:
+    return get_engine().canonicalize_and_hash(obj)
+
+
+def canonicalize_and_hash_many(objs: Sequence[Any]) -> list[tuple[bytes, str]]:
+    return get_engine().canonicalize_and_hash_many(objs)
+
+
+if __name__ == "__main__":
+    # python -m app.hashing [samples]: run the conformance check for every available backend.
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    failed = False
+    for name, factory in _BACKENDS.items():
+        dumps = factory()
+        if dumps is None:
+            print(f"{name}: not installed")
+            continue
+        bad = conformance_check(dumps, samples=n)
+        failed = failed or bool(bad)
+        print(f"{name}: {'OK' if not bad else f'{len(bad)} mismatches, e.g. {bad[0]!r}'} ({n} samples)")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,61 @@
+"""Monotonic ULIDs for ids minted by the API (task ids).
+
+A ULID is 48 bits of millisecond time plus 80 random bits, written as 26
+Crockford base32 characters, so ids sort by creation time. Within one
+millisecond the generator increments the random part instead of redrawing
+it. Ids from one process are therefore strictly increasing and never
+collide, however many are minted per second.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RAND_MAX = (1 << 80) - 1
+
+
+def _encode(value: int, length: int) -> str:
+    out = []
+    for _ in range(length):
+        value, r = divmod(value, 32)
+        out.append(_ALPHABET[r])
+    return "".join(reversed(out))
+
+
+class ULIDGenerator:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_rand = 0
+
+    def new(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms <= self._last_ms:
+                # Same millisecond (or the clock stepped back): stay on the last timestamp and count up.
+                ms = self._last_ms
+                rand = self._last_rand + 1
+                if rand > _RAND_MAX:
+                    ms, rand = ms + 1, int.from_bytes(os.urandom(10), "big") >> 1
+            else:
+                # The top bit stays clear so the increment has 2^79 ids of room.
+                rand = int.from_bytes(os.urandom(10), "big") >> 1
+            self._last_ms, self._last_rand = ms, rand
+        return _encode(ms, 10) + _encode(rand, 16)
+
+    def batch(self, n: int) -> list[str]:
+        return [self.new() for _ in range(n)]
+
+
+_default = ULIDGenerator()
+
+
+def new_ulid() -> str:
+    return _default.new()
+
+
+def new_ulids(n: int) -> list[str]:
+    return _default.batch(n)
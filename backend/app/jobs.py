@@ -0,0 +1,168 @@
+"""Background jobs for long-running operations (seeding, exports, fleet audits).
+
+A job runs `fn(job)` on a bounded thread pool (JOB_WORKERS, default 2) and is
+tracked in memory by id. The function reports progress with `job.bump(...)`
+and polls `job.check_cancelled()` (or `job.cancelled`) at safe points.
+Cancelling a queued job drops it before it starts. Cancelling a running job
+sets a flag the job observes at its next check.
+
+Jobs that produce a file write it under data/jobs/ (`job.artifact_path`). The
+oldest finished jobs, and their files, are forgotten beyond JOB_HISTORY
+(default 200).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+_FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def default_artifact_dir() -> Path:
+    # backend/app -> backend
+    return Path(__file__).resolve().parents[1] / "data" / "jobs"
+
+
+class Job:
+    MAX_ERRORS = 50
+
+    def __init__(self, kind: str, params: dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.progress: dict[str, int] = {}
+        self.errors: list[str] = []
+        self.result: Any = None
+        self.artifact_path: Path | None = None
+        self.media_type: str | None = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._future: Future | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def bump(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.progress[key] = self.progress.get(key, 0) + n
+
+    def set(self, key: str, value: int) -> None:
+        with self._lock:
+            self.progress[key] = value
+
+    def error(self, msg: str) -> None:
+        with self._lock:
+            self.progress["errors"] = self.progress.get("errors", 0) + 1
+            if len(self.errors) < self.MAX_ERRORS:
+                self.errors.append(msg)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            progress = dict(self.progress)
+            errors = list(self.errors)
+        end = self.finished_at or datetime.utcnow()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "createdAt": self.created_at.isoformat(),
+            "startedAt": self.started_at.isoformat() if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsedSec": round((end - self.started_at).total_seconds(), 3) if self.started_at else None,
+            "progress": progress,
+            "errors": errors,
+            "result": self.result,
+            "artifact": self.artifact_path is not None and self.status == SUCCEEDED,
+        }
+
+
+class JobManager:
+    def __init__(self, *, max_workers: int | None = None, history: int | None = None, artifact_dir: Path | None = None) -> None:
+        self.max_workers = max_workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.history = history or int(os.getenv("JOB_HISTORY", "200"))
+        self.artifact_dir = artifact_dir or default_artifact_dir()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[[Job], Any], *, params: dict[str, Any] | None = None) -> Job:
+        job = Job(kind, params or {})
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        job._future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def artifact(self, job: Job, suffix: str, media_type: str) -> Path:
+        """Reserve the output file for job."""
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        job.artifact_path = self.artifact_dir / f"{job.id}{suffix}"
+        job.media_type = media_type
+        return job.artifact_path
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        if job.cancelled:
+            job.status, job.finished_at = CANCELLED, datetime.utcnow()
+            return
+        job.status, job.started_at = RUNNING, datetime.utcnow()
+        try:
+            job.result = fn(job)
+            job.status = CANCELLED if job.cancelled else SUCCEEDED
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error(str(e))
+            print(f"[jobs] {job.kind} {job.id} failed:")
+            print(traceback.format_exc())
+        finally:
+            job.finished_at = datetime.utcnow()
+            if job.status != SUCCEEDED and job.artifact_path is not None:
+                job.artifact_path.unlink(missing_ok=True)
+
+    def _trim(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in _FINISHED]
+        for j in finished[: max(len(finished) - self.history, 0)]:
+            del self._jobs[j.id]
+            if j.artifact_path is not None:
+                j.artifact_path.unlink(missing_ok=True)
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list(self, kind: str | None = None) -> list[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in reversed(jobs) if kind is None or j.kind == kind]
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            job.status, job.finished_at = CANCELLED, datetime.utcnow()
+        return job
@@ -0,0 +1,107 @@
+"""Materialized audit ledger for log details.
+
+Rows in `log_details` are immutable once written, so their hash check only
+needs to run once: at ingest the stored detail is re-read, re-hashed with the
+audit rule and the result written to `log_verifications`. Audit reads then
+become a primary-key lookup instead of a json.loads + re-hash per row.
+
+A background re-verifier walks the ledger oldest-check-first and re-hashes the
+stored bytes again, so tampering with `log_details` after ingest still shows up
+as `match = False`. It also backfills ledger rows for details written before
+the ledger existed.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import LogDetail, LogVerification, session_scope
+from .hashing import canonicalize_and_hash
+from .partitions import LogStore
+
+
+def recompute_log_hash(row: LogDetail) -> str:
+    """Audit rule: hash of the canonical re-serialization of the stored detail."""
+    try:
+        return canonicalize_and_hash(json.loads(row.detail_text))[1]
+    except Exception:
+        return ""
+
+
+def build_verification(row: LogDetail) -> LogVerification:
+    recomputed = recompute_log_hash(row)
+    now = datetime.utcnow()
+    return LogVerification(
+        log_hash=row.log_hash,
+        recomputed_hash=recomputed,
+        match=recomputed == row.log_hash,
+        verified_height=row.height,
+        verified_at=now,
+        checked_at=now,
+        check_count=1,
+    )
+
+
+async def aset_verified_height(db: AsyncSession, log_hash: str, height: int | None) -> None:
+    v = await db.get(LogVerification, log_hash)
+    if v is not None:
+        v.verified_height = height
+
+
+async def load_verifications(db: AsyncSession, log_hashes: Iterable[str]) -> dict[str, LogVerification]:
+    hashes = [h for h in set(log_hashes) if h]
+    out: dict[str, LogVerification] = {}
+    for i in range(0, len(hashes), 500):
+        rows = (await db.execute(select(LogVerification).where(LogVerification.log_hash.in_(hashes[i : i + 500])))).scalars()
+        out.update((v.log_hash, v) for v in rows)
+    return out
+
+
+def reverify_batch(SessionLocal: sessionmaker[Session], log_store: LogStore, *, batch_size: int = 1000) -> tuple[int, list[str]]:
+    """Re-check the `batch_size` least recently checked rows and backfill missing ones.
+
+    Returns (rows checked, log hashes that no longer match).
+    """
+    mismatched: list[str] = []
+    with session_scope(SessionLocal) as db:
+        # 1) details without a ledger row (written before the ledger existed)
+        missing = (
+            db.execute(
+                select(LogDetail)
+                .outerjoin(LogVerification, LogVerification.log_hash == LogDetail.log_hash)
+                .where(LogVerification.log_hash.is_(None))
+                .limit(batch_size)
+            )
+            .scalars()
+            .all()
+        )
+        for row in missing:
+            v = build_verification(row)
+            db.add(v)
+            if not v.match:
+                mismatched.append(row.log_hash)
+
+        # 2) oldest checks first
+        ledger = (
+            db.execute(select(LogVerification).order_by(LogVerification.checked_at).limit(max(batch_size - len(missing), 0)))
+            .scalars()
+            .all()
+        )
+        rows = {r.log_hash: r for r in log_store.query(db, log_hashes=[v.log_hash for v in ledger])}
+        now = datetime.utcnow()
+        for v in ledger:
+            row = rows.get(v.log_hash)
+            recomputed = recompute_log_hash(row) if row is not None else ""
+            v.recomputed_hash = recomputed
+            v.match = recomputed == v.log_hash
+            v.checked_at = now
+            v.check_count = (v.check_count or 0) + 1
+            if not v.match:
+                mismatched.append(v.log_hash)
+    return len(missing) + len(ledger), mismatched
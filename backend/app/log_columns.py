@@ -0,0 +1,345 @@
+"""Columnar in-memory copy of the chain's log summaries.
+
+`list-log-summary` returns one dict per summary with every number as a
+string. Here the same data is kept as NumPy columns instead:
+
+  - ts / cpuMs / memMbPeak / netKb / latencyMs: integers
+  - taskId / edgeAddr / stage / resultHash: codes into dictionaries of the
+    distinct values (fixed-width byte arrays, so a task's id and result
+    hash are stored once and cost no Python objects)
+  - logHash: the raw 32-byte digest (S32)
+
+Integer columns start at the narrowest dtype and are widened the first
+time a value does not fit (stage codes stay int8, latencies int16 until
+one exceeds 32767). That is about 60 bytes per summary plus the
+dictionaries, an order of magnitude below the parsed dicts. Filters, group-bys and top-K run as array
+operations over the whole store.
+
+`extend` appends only summaries whose logHash is new, so a refresh costs
+the chain query plus encoding the new rows. Rows are never updated or
+removed: log summaries are immutable on chain. The store is loaded on its
+first read; from then on a background refresher (`start_refresher`)
+re-reads the chain right after `request_refresh()` (called when this
+backend submits or seeds logs) and otherwise every LOG_COLUMNS_REFRESH_SEC
+(default 600), which only picks up summaries submitted elsewhere. Summaries whose logHash is not a 64-char
+hex digest are counted in `rejected` and not stored.
+
+Only `/logs/query` and `/logs/columns` read from here. Per-task reads and
+the audit query the chain directly, so they never see a stale snapshot or
+miss a rejected summary.
+
+Requires NumPy; `np` is None without it.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+NUMERIC = ("ts", "cpuMs", "memMbPeak", "netKb", "latencyMs")
+STRINGS = ("taskId", "edgeAddr", "stage", "resultHash")
+GROUP_KEYS = {"task": "taskId", "edge": "edgeAddr", "stage": "stage"}
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _int(v: Any) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _digest(h: Any) -> bytes | None:
+    try:
+        b = bytes.fromhex(h)
+    except (TypeError, ValueError):
+        return None
+    return b if len(b) == 32 else None
+
+
+def _parse_ints(values: list[Any]) -> Any:
+    try:
+        return np.array(values).astype(np.int64)
+    except (TypeError, ValueError):
+        return np.array([_int(v) for v in values], dtype=np.int64)
+
+
+def _fit(col: Any, vals: Any) -> Any:
+    """col, widened to the narrowest int dtype that also holds vals."""
+    if len(vals) == 0:
+        return col
+    lo, hi = int(vals.min()), int(vals.max())
+    info = np.iinfo(col.dtype)
+    if info.min <= lo and hi <= info.max:
+        return col
+    for dt in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dt).min <= lo and hi <= np.iinfo(dt).max and np.dtype(dt).itemsize > col.dtype.itemsize:
+            return col.astype(dt)
+    return col.astype(np.int64)
+
+
+def _find(values: Any, order: Any, keys: Any) -> tuple[Any, Any]:
+    """(index into values, found) for each key; `order` sorts `values`."""
+    n = len(values)
+    if n == 0:
+        return np.zeros(len(keys), dtype=np.intp), np.zeros(len(keys), dtype=bool)
+    pos = order[np.minimum(np.searchsorted(values, keys, sorter=order), n - 1)]
+    return pos, values[pos] == keys
+
+
+class _Dictionary:
+    """Distinct strings <-> dense int32 codes, stored as one fixed-width byte array."""
+
+    def __init__(self) -> None:
+        self.values = np.zeros(0, dtype="S1")
+        self._order = np.zeros(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, strings: list[str]) -> Any:
+        uniq, inverse = np.unique(np.array([v.encode() for v in strings], dtype="S"), return_inverse=True)
+        codes, found = _find(self.values, self._order, uniq)
+        new = uniq[~found]
+        if len(new):
+            n = len(self.values)
+            width = max(self.values.dtype.itemsize, new.dtype.itemsize)
+            self.values = np.concatenate([self.values.astype(f"S{width}"), new.astype(f"S{width}")])
+            self._order = np.argsort(self.values, kind="stable").astype(np.int32)
+            codes[~found] = n + np.arange(len(new))
+        return codes[inverse.reshape(-1)]
+
+    def code(self, v: str) -> int | None:
+        codes, found = _find(self.values, self._order, np.array([v.encode()], dtype="S"))
+        return int(codes[0]) if found[0] else None
+
+    def decode(self, codes: Any) -> list[str]:
+        return [b.decode() for b in self.values[codes].tolist()]
+
+
+class LogColumns:
+    def __init__(self, capacity: int = 4096) -> None:
+        self._n = 0
+        self._num = {f: np.zeros(capacity, dtype=np.int16) for f in NUMERIC}
+        self._codes = {f: np.zeros(capacity, dtype=np.int8) for f in STRINGS}
+        self._hash = np.zeros(capacity, dtype="S32")
+        self._order = np.zeros(0, dtype=np.int32)  # row indices sorted by logHash
+        self._dicts = {f: _Dictionary() for f in STRINGS}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._refreshing = False
+        self.synced_at: float | None = None
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ---- loading ----
+
+    def _reserve(self, n: int) -> None:
+        cap = len(self._hash)
+        if n <= cap:
+            return
+        while cap < n:
+            cap *= 2
+
+        def grow(a: Any) -> Any:
+            out = np.zeros(cap, dtype=a.dtype)
+            out[: self._n] = a[: self._n]
+            return out
+
+        self._num = {f: grow(a) for f, a in self._num.items()}
+        self._codes = {f: grow(a) for f, a in self._codes.items()}
+        self._hash = grow(self._hash)
+
+    def extend(self, items: Iterable[dict[str, Any]]) -> int:
+        """Append the summaries not loaded yet (by logHash). Returns how many were added."""
+        keep: list[dict[str, Any]] = []
+        digests: list[bytes] = []
+        rejected = 0
+        for it in items:
+            d = _digest(it.get("logHash") or it.get("log_hash"))
+            if d is None:
+                rejected += 1
+                continue
+            keep.append(it)
+            digests.append(d)
+        with self._lock:
+            self.rejected += rejected
+            if not keep:
+                return 0
+            inc = np.array(digests, dtype="S32")
+            _, known = _find(self._hash[: self._n], self._order, inc)
+            new = np.flatnonzero(~known)
+            if len(new) == 0:
+                return 0
+            # First occurrence of each new digest, in input order.
+            _, first = np.unique(inc[new], return_index=True)
+            new = new[np.sort(first)]
+
+            n, m = self._n, len(new)
+            self._reserve(n + m)
+            rows = [keep[i] for i in new.tolist()]
+            for f in NUMERIC:
+                vals = _parse_ints([it.get(f) or 0 for it in rows])
+                self._num[f] = _fit(self._num[f], vals)
+                self._num[f][n : n + m] = vals
+            for f in STRINGS:
+                codes = self._dicts[f].encode([str(it.get(f) or "") for it in rows])
+                self._codes[f] = _fit(self._codes[f], codes)
+                self._codes[f][n : n + m] = codes
+            added = inc[new]
+            self._hash[n : n + m] = added
+
+            by_hash = np.argsort(added, kind="stable")
+            at = np.searchsorted(self._hash[:n], added[by_hash], sorter=self._order) if n else np.zeros(m, dtype=np.intp)
+            self._order = np.insert(self._order, at, (n + by_hash).astype(np.int32))
+            self._n = n + m
+            return m
+
+    def sync(self, items: Iterable[dict[str, Any]]) -> int:
+        added = self.extend(items)
+        self.synced_at = time.time()
+        return added
+
+    # ---- queries (row indices are positions in load order) ----
+
+    def _col(self, name: str) -> Any:
+        return self._num[name][: self._n]
+
+    def select(
+        self,
+        *,
+        task_id: str | None = None,
+        edge: str | None = None,
+        stage: str | None = None,
+        from_ts: int | None = None,
+        to_ts: int | None = None,
+        lower: dict[str, int] | None = None,
+        upper: dict[str, int] | None = None,
+    ) -> Any:
+        """Row indices matching every given filter (string equality, inclusive numeric bounds)."""
+        with self._lock:
+            mask = np.ones(self._n, dtype=bool)
+            for f, v in (("taskId", task_id), ("edgeAddr", edge), ("stage", stage)):
+                if v is None:
+                    continue
+                code = self._dicts[f].code(v)
+                if code is None:
+                    return np.zeros(0, dtype=np.intp)
+                mask &= self._codes[f][: self._n] == code
+            lo = dict(lower or {})
+            hi = dict(upper or {})
+            if from_ts is not None:
+                lo["ts"] = from_ts
+            if to_ts is not None:
+                hi["ts"] = to_ts
+            for f, v in lo.items():
+                mask &= self._col(f) >= v
+            for f, v in hi.items():
+                mask &= self._col(f) <= v
+            return np.flatnonzero(mask)
+
+    def top_k(self, idx: Any, field: str, k: int, *, ascending: bool = False) -> Any:
+        """The k rows of idx with the largest (or smallest) field, in that order."""
+        with self._lock:
+            vals = self._col(field)[idx].astype(np.int64)
+        if not ascending:
+            vals = -vals
+        if k < len(idx):
+            part = np.argpartition(vals, k)[:k]
+            return idx[part[np.argsort(vals[part], kind="stable")]]
+        return idx[np.argsort(vals, kind="stable")]
+
+    def group_by(self, idx: Any, by: str) -> list[dict[str, Any]]:
+        """Per task / edge / stage: count, sums and averages of the numeric fields, max latency."""
+        f_key = GROUP_KEYS[by]
+        with self._lock:
+            codes = self._codes[f_key][idx]
+            d = self._dicts[f_key]
+            size = len(d)
+            counts = np.bincount(codes, minlength=size)
+            sums = {f: np.bincount(codes, weights=self._col(f)[idx], minlength=size) for f in NUMERIC if f != "ts"}
+            max_lat = np.zeros(size, dtype=np.int64)
+            np.maximum.at(max_lat, codes, self._col("latencyMs")[idx])
+            present = np.flatnonzero(counts)
+            present = present[np.argsort(-counts[present], kind="stable")]
+            keys = d.decode(present)
+            out = []
+            for key, c in zip(keys, present.tolist()):
+                n = int(counts[c])
+                g: dict[str, Any] = {"key": key, "count": n}
+                for f, s in sums.items():
+                    g[f + "Sum"] = int(s[c])
+                    g[f + "Avg"] = round(float(s[c]) / n, 1)
+                g["latencyMsMax"] = int(max_lat[c])
+                out.append(g)
+            return out
+
+    def rows(self, idx: Any) -> list[dict[str, Any]]:
+        """Rows in the chain's summary shape (numbers as strings)."""
+        with self._lock:
+            strs = {f: self._dicts[f].decode(self._codes[f][idx]) for f in STRINGS}
+            nums = {f: self._num[f][idx].tolist() for f in NUMERIC}
+            hashes = self._hash[idx].tolist()
+        out = []
+        for i, h in enumerate(hashes):
+            it = {f: strs[f][i] for f in STRINGS}
+            it["logHash"] = h.ljust(32, b"\0").hex()
+            for f in NUMERIC:
+                it[f] = str(nums[f][i])
+            out.append(it)
+        return out
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            n = self._n
+            arrays = [*self._num.values(), *self._codes.values(), self._hash]
+            return {
+                "rows": n,
+                "capacity": len(self._hash),
+                "columnBytes": n * sum(a.itemsize for a in arrays) + self._order.nbytes,
+                "dictionaryBytes": sum(d.values.nbytes + d._order.nbytes for d in self._dicts.values()),
+                "dictionaries": {f: len(d) for f, d in self._dicts.items()},
+                "rejected": self.rejected,
+                "syncedAt": self.synced_at,
+            }
+
+    # ---- refresher ----
+
+    def request_refresh(self) -> None:
+        self._wake.set()
+
+    def start_refresher(self, fetch: Callable[[], list[dict[str, Any]]], *, interval: float | None = None) -> None:
+        """Load new summaries from fetch() right after request_refresh(), or after interval seconds.
+
+        The first load is the caller's; calls after the first are no-ops.
+        """
+        interval = interval if interval is not None else float(os.getenv("LOG_COLUMNS_REFRESH_SEC", "600"))
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _worker() -> None:
+            while True:
+                self._wake.wait(interval)
+                self._wake.clear()
+                try:
+                    added = self.sync(fetch())
+                    if added:
+                        print(f"[log-columns] +{added} summaries ({self._n} total)")
+                except Exception as e:
+                    print(f"[log-columns] refresh failed: {e}")
+
+        threading.Thread(target=_worker, name="log-columns", daemon=True).start()
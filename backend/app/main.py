@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import json
 import tempfile
@@ -10,19 +11,93 @@ from pathlib import Path
 from datetime import datetime, timezone
 from typing import Any
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 
-from .chain_cli import ChainCLI
+from .actors import Actor, ActorRegistry
+from .audit_cache import AuditCache, chain_digest
+from .backtest import KEEPER_THRESHOLDS, ThresholdSet, backtest, load_log_metrics
+from .chain_cli import ChainCLI, expected_sequence
+from .compression import pack_json_text
 from .config import Settings, get_settings
-from .db import LogDetail, init_db, session_scope, upsert_task_result
-from .hashing import sha256_hex_of_json
+from .dedup import LogDedup
+from .edge_select import EdgeSelector
+from .ids import new_ulid, new_ulids
+from .export import FORMATS as EXPORT_FORMATS, SUFFIXES as EXPORT_SUFFIXES, export_logs
+from .fleet_audit import fleet_audit_ndjson, shutdown_pool as shutdown_audit_pool, start_pool as start_audit_pool
+from .jobs import Job, JobManager
+from .log_columns import GROUP_KEYS as LOG_GROUP_KEYS, NUMERIC as LOG_NUMERIC_FIELDS, LogColumns, available as log_columns_available
+from .merkle import MerkleIndex, chain_hashes_for
+from .pipeline import (
+    STAGES as PIPELINE_STAGES,
+    fill_task_regions,
+    fold_events,
+    get_task as get_pipeline_task,
+    latency_from_tasks,
+    log_stage_event,
+    pipeline_empty,
+    query_latency,
+    rebuild_pipeline,
+    record_stages,
+    stuck_from_tasks,
+    stuck_tasks,
+    task_view,
+)
+from .rollups import (
+    BUCKETS as ROLLUP_BUCKETS,
+    add_rollups,
+    backfill_region_rollups,
+    defer_regions,
+    metrics_from_rows,
+    pending_regions,
+    query_metrics,
+    rebuild_rollups,
+    rollup_row,
+    rollups_empty,
+)
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from .db import (
+    LogDetail,
+    LogVerification,
+    async_session_scope,
+    init_async_db,
+    init_db,
+    init_readonly_db,
+    session_scope,
+    upsert_task_result,
+)
+from .hashing import canonicalize_and_hash, sha256_hex_of_json
+from .ledger import (
+    aset_verified_height,
+    build_verification,
+    load_verifications,
+    reverify_batch,
+)
+from .partitions import LogStore
+from .reputation import SnapshotVerifier
+from . import reputation_engine
+from .search import MIN_PREFIX, search_prefix
+from .seeding import (
+    SeedActors,
+    begin_seed_run,
+    finish_seed_run,
+    plan_seed,
+    plan_steps,
+    run_seed_txs,
+    store_planned_logs,
+    write_seed_progress,
+)
 from .schemas import (
+    CreateTaskBatchRequest,
     CreateTaskRequest,
     DemoSeedRequest,
     RecordResultRequest,
     SubmitLogRequest,
     TaskFeedbackRequest,
+    ThresholdBacktestRequest,
 )
 
 from .mock_data import (
@@ -65,6 +140,19 @@ def chain_cli(s: Settings = Depends(settings)) -> ChainCLI:
 
 
 SessionLocal = None  # set in startup
+AsyncSessionLocal = None  # set in startup; None for in-memory DBs
+ReadOnlySessionLocal = None  # set in startup; falls back to SessionLocal for in-memory DBs
+log_store: LogStore | None = None  # set in startup
+log_dedup: LogDedup | None = None  # set in startup
+merkle_index: MerkleIndex | None = None  # set in startup
+snapshot_verifier = SnapshotVerifier()
+audit_cache = AuditCache()
+actor_registry: ActorRegistry | None = None  # set in startup
+job_manager = JobManager()
+edge_selector = EdgeSelector()
+log_columns: LogColumns | None = LogColumns() if log_columns_available() else None
+# Set when a log detail or task was stored without its edge's region; the next edge sync backfills it.
+_regions_pending = False
 
 
 # ------------------------- auto demo seed (startup) -------------------------
@@ -137,16 +225,17 @@ def _mock_addrs(s: Settings) -> dict[str, str]:
 
 def _auto_seed_marker_path() -> Path:
     # backend/app -> backend
+    # Progress file: {"done": bool, "run", "steps_done", "steps_total", "tasks_done", ...}
     base = Path(__file__).resolve().parents[1]
     return base / 'data' / '.auto_demo_seed_done.json'
 
 
 def _start_auto_demo_seed() -> None:
-    """Kick off demo seed in a background thread on startup.
+    """Kick off demo seed as a background job (kind "seed") on startup.
 
     Controlled by env:
       - AUTO_DEMO_SEED (default: true)
-      - AUTO_DEMO_SEED_FORCE (default: false)
+      - AUTO_DEMO_SEED_FORCE (default: false; replans from scratch)
       - AUTO_DEMO_SEED_MAX_WAIT_SEC (default: 120)
       - AUTO_DEMO_SEED_DELAY_SEC (default: 2)
       - AUTO_DEMO_SEED_TASKS_PER_REGION / DAYS_SPAN / BAD_EDGE_MODE / SEED
@@ -161,14 +250,22 @@ def _start_auto_demo_seed() -> None:
 
     _AUTO_SEED_STARTED = True
 
-    def _worker() -> None:
+    def _worker(job: Job) -> dict[str, Any] | None:
         try:
             s = get_settings()
             marker_path = _auto_seed_marker_path()
             force = _env_bool('AUTO_DEMO_SEED_FORCE', False)
-            if marker_path.exists() and not force:
+            marker: dict[str, Any] = {}
+            if marker_path.exists():
+                try:
+                    marker = json.loads(marker_path.read_text(encoding='utf-8'))
+                except ValueError:
+                    marker = {}
+            if marker.get('done') and not force:
                 print(f'[auto-seed] skip: marker exists at {marker_path}')
                 return
+            if marker:
+                print(f"[auto-seed] resuming: {marker.get('steps_done', 0)}/{marker.get('steps_total', '?')} txs done")
 
             # Wait for chain to be ready (non-blocking for server startup).
             max_wait = int(os.getenv('AUTO_DEMO_SEED_MAX_WAIT_SEC', '120'))
@@ -200,31 +297,102 @@ def _start_auto_demo_seed() -> None:
                 tasks_per_region=int(os.getenv('AUTO_DEMO_SEED_TASKS_PER_REGION', str(DemoSeedRequest().tasks_per_region))),
                 days_span=int(os.getenv('AUTO_DEMO_SEED_DAYS_SPAN', str(DemoSeedRequest().days_span))),
                 bad_edge_mode=_env_bool('AUTO_DEMO_SEED_BAD_EDGE_MODE', DemoSeedRequest().bad_edge_mode),
+                resume=not force,
             )
 
             print(f'[auto-seed] start: seed={req.seed} tasks_per_region={req.tasks_per_region} days_span={req.days_span} bad_edge_mode={req.bad_edge_mode}')
 
             # Call the same implementation as the HTTP endpoint (no network request).
-            res = demo_seed(req=req, s=s, chain=chain)
-
-            marker_path.parent.mkdir(parents=True, exist_ok=True)
-            import json as _json
-
-            marker_path.write_text(
-                _json.dumps({'done': True, 'ts': datetime.utcnow().isoformat(), 'result': res}, ensure_ascii=False),
-                encoding='utf-8',
-            )
-            print(f'[auto-seed] done; marker written to {marker_path}')
+            res = _run_demo_seed(req, s, chain, job=job, progress_path=marker_path)
+            progress = res['progress']
+            # done only once every planned tx is checkpointed; otherwise the next start resumes.
+            done = progress.get('status') == 'done'
+            write_seed_progress(marker_path, progress, done=done, result=res)
+            if done:
+                print(f'[auto-seed] done; marker written to {marker_path}')
+            else:
+                print(f"[auto-seed] incomplete ({progress['steps_done']}/{progress['steps_total']} txs); will resume on next start")
+            return res
         except Exception:
             print('[auto-seed] failed with exception:')
             print(traceback.format_exc())
+            raise
+
+    job_manager.submit('seed', _worker, params={'auto': True})
+
+
+# ------------------------- log retention (startup) -------------------------
+
+_ARCHIVER_STARTED = False
+
+
+def _start_log_archiver(s: Settings) -> None:
+    """Periodically seal log_details older than LOG_RETENTION_DAYS into archive files.
+
+    Controlled by env:
+      - LOG_RETENTION_DAYS (default: 0 = disabled)
+      - LOG_PARTITION (day|week, default: week)
+      - LOG_ARCHIVE_INTERVAL_SEC (default: 3600)
+    """
+    global _ARCHIVER_STARTED
+    if _ARCHIVER_STARTED or s.log_retention_days <= 0 or log_store is None:
+        return
+    _ARCHIVER_STARTED = True
+    interval = float(os.getenv("LOG_ARCHIVE_INTERVAL_SEC", "3600"))
+    store = log_store
+
+    def _worker() -> None:
+        while True:
+            try:
+                written = store.archive_expired(retention_days=s.log_retention_days, granularity=s.log_partition)
+                if written:
+                    print(f"[log-archive] sealed: {', '.join(written)}")
+            except Exception:
+                print("[log-archive] failed with exception:")
+                print(traceback.format_exc())
+            time.sleep(interval)
+
+    threading.Thread(target=_worker, daemon=True).start()
+
+
+# ------------------------- audit ledger re-verification (startup) -------------------------
+
+_REVERIFIER_STARTED = False
+
+
+def _start_reverifier() -> None:
+    """Periodically re-hash stored log details against the audit ledger.
+
+    Controlled by env:
+      - AUDIT_REVERIFY_INTERVAL_SEC (default: 600; 0 = disabled)
+      - AUDIT_REVERIFY_BATCH (default: 1000)
+    """
+    global _REVERIFIER_STARTED
+    interval = float(os.getenv("AUDIT_REVERIFY_INTERVAL_SEC", "600"))
+    if _REVERIFIER_STARTED or interval <= 0 or SessionLocal is None or log_store is None:
+        return
+    _REVERIFIER_STARTED = True
+    batch = int(os.getenv("AUDIT_REVERIFY_BATCH", "1000"))
+    db_factory, store = SessionLocal, log_store
+
+    def _worker() -> None:
+        while True:
+            try:
+                checked, mismatched = reverify_batch(db_factory, store, batch_size=batch)
+                if mismatched:
+                    audit_cache.invalidate_all()
+                    print(f"[re-verify] {len(mismatched)}/{checked} log details no longer match: {', '.join(mismatched[:10])}")
+            except Exception:
+                print("[re-verify] failed with exception:")
+                print(traceback.format_exc())
+            time.sleep(interval)
 
     threading.Thread(target=_worker, daemon=True).start()
 
 
 @app.on_event("startup")
 def _startup() -> None:
-    global SessionLocal
+    global SessionLocal, AsyncSessionLocal, ReadOnlySessionLocal, log_store, log_dedup, merkle_index, actor_registry, _regions_pending
     s = get_settings()
     db_url = s.db_url
     # In MOCK_DATA mode we try hard to avoid failing startup due to a broken/old DB file.
@@ -239,6 +407,15 @@ def _startup() -> None:
             SessionLocal = init_db("sqlite://")
         else:
             raise
+    log_store = LogStore(SessionLocal)
+    AsyncSessionLocal = init_async_db(str(SessionLocal.kw["bind"].url))
+    ReadOnlySessionLocal = init_readonly_db(str(SessionLocal.kw["bind"].url)) or SessionLocal
+    log_dedup = LogDedup(log_store)
+    n = log_dedup.rebuild(SessionLocal)
+    print(f"[dedup] bloom filter loaded with {n} log hashes")
+    merkle_index = MerkleIndex()
+    merkle_index.rebuild(SessionLocal)
+    start_audit_pool()
 
     # In MOCK_DATA mode we do NOT talk to the chain; we only create sqlite + preload mock rows.
     if _mock_enabled():
@@ -247,9 +424,31 @@ def _startup() -> None:
         print(f"[mock-data] enabled (seed={seed}) db={db_url}")
         return
 
+    actor_registry = ActorRegistry(chain_cli(s), pinned=_pinned_actors(s))
+    n = actor_registry.load()
+    print(f"[actors] {n} actors (keyring {actor_registry.fingerprint or 'unavailable'})")
+
+    edge_selector.start_refresher(lambda: _edge_list(chain_cli(s)), on_sync=_on_edge_sync)
+    with session_scope(SessionLocal) as db:
+        has_logs = db.execute(select(LogDetail.id).limit(1)).first() is not None
+        backfill = has_logs and rollups_empty(db)
+        backfill_pipeline = has_logs and pipeline_empty(db)
+        _regions_pending = pending_regions(db)
+    if backfill:
+        # Log details stored before rollups existed.
+        _submit_rollup_rebuild(chain_cli(s))
+    if backfill_pipeline:
+        _submit_pipeline_rebuild(chain_cli(s))
+    _start_log_archiver(s)
+    _start_reverifier()
     _start_auto_demo_seed()
 
 
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    shutdown_audit_pool()
+
+
 @app.get("/health")
 def health() -> dict[str, Any]:
     return {"ok": True, "ts": datetime.utcnow().isoformat()}
@@ -275,8 +474,46 @@ def accounts(s: Settings = Depends(settings)) -> dict[str, Any]:
     }
 
 
+@app.get("/actors")
+def list_actors(kind: str | None = None, refresh: bool = False) -> dict[str, Any]:
+    """Local keys known to the actor registry (edge / vehicle / cloud / admin / other)."""
+    registry = _actors()
+    if refresh:
+        registry.load(force=True)
+    out = registry.describe()
+    if kind is not None:
+        out["actors"] = [a for a in out["actors"] if a["kind"] == kind]
+    return out
+
+
+def _pinned_actors(s: Settings) -> list[Actor]:
+    return [
+        Actor(s.admin_name, s.admin_addr, "admin"),
+        Actor(s.cloud_name, s.cloud_addr, "cloud"),
+        Actor(s.vehicle1_name, s.vehicle1_addr, "vehicle"),
+        Actor(s.edge1_name, s.edge1_addr, "edge"),
+        Actor(s.edge2_name, s.edge2_addr, "edge"),
+        Actor(s.edge3_name, s.edge3_addr, "edge"),
+    ]
+
+
+def _actors() -> ActorRegistry:
+    global actor_registry
+    if actor_registry is None:
+        # Startup skips the registry in MOCK_DATA mode; build it on first use.
+        s = get_settings()
+        actor_registry = ActorRegistry(chain_cli(s), pinned=_pinned_actors(s))
+        actor_registry.load()
+    return actor_registry
+
+
 # ------------------------- chain queries (thin wrappers) -------------------------
 
+def _edge_list(chain: ChainCLI) -> list[dict[str, Any]]:
+    edges_raw = chain.query(chain.module, "list-edge", [])
+    return edges_raw.get("edge") or edges_raw.get("edges") or []
+
+
 def _safe_query(chain: ChainCLI, module: str, cmd: str, args: list[str]) -> dict[str, Any]:
     try:
         return chain.query(module, cmd, args)
@@ -292,6 +529,11 @@ def list_edges(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     return _safe_query(chain, chain.module, "list-edge", [])
 
 
+@app.get("/edge-selection")
+def edge_selection_stats() -> dict[str, Any]:
+    return edge_selector.stats()
+
+
 @app.get("/edges/{edge_addr}")
 def show_edge(edge_addr: str, chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     if _mock_enabled():
@@ -300,6 +542,250 @@ def show_edge(edge_addr: str, chain: ChainCLI = Depends(chain_cli)) -> dict[str,
     return _safe_query(chain, chain.module, "show-edge", [edge_addr])
 
 
+def _metrics(scope: str, key: str, bucket: str, from_ts: int | None, to_ts: int | None) -> dict[str, Any]:
+    if bucket not in ROLLUP_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of: {', '.join(ROLLUP_BUCKETS)}")
+    limit = int(os.getenv("ROLLUP_MAX_BUCKETS", "1440"))
+    if _mock_enabled():
+        s = get_settings()
+        addrs = _mock_addrs(s)
+        regions = {e.get("edgeAddr"): e.get("region") for e in mock_list_edges(seed=_mock_seed(), addrs=addrs).get("edge") or []}
+        rows = [
+            (l["edgeAddr"], regions.get(l["edgeAddr"]), int(l["ts"]), int(l["cpuMs"]), int(l["memMbPeak"]), int(l["netKb"]), int(l["latencyMs"]))
+            for l in mock_list_log_summaries(seed=_mock_seed(), addrs=addrs)["logSummary"]
+        ]
+        out = metrics_from_rows(rows, scope, key, bucket, from_ts=from_ts, to_ts=to_ts, limit=limit)
+    else:
+        if ReadOnlySessionLocal is None:
+            raise HTTPException(status_code=500, detail="DB not ready")
+        with session_scope(ReadOnlySessionLocal) as db:
+            out = query_metrics(db, scope, key, bucket, from_ts=from_ts, to_ts=to_ts, limit=limit)
+    return {scope: key, "bucket": bucket, "from": from_ts, "to": to_ts, **out}
+
+
+@app.get("/edges/{edge_addr}/metrics")
+def edge_metrics(
+    edge_addr: str,
+    bucket: str = "1h",
+    from_ts: int | None = Query(None, alias="from"),
+    to_ts: int | None = Query(None, alias="to"),
+) -> dict[str, Any]:
+    """Log metric rollups of one edge: per-bucket counts, sums and latency p50/p95/p99 (see app.rollups)."""
+    return _metrics("edge", edge_addr, bucket, from_ts, to_ts)
+
+
+@app.get("/regions/{region}/metrics")
+def region_metrics(
+    region: str,
+    bucket: str = "1h",
+    from_ts: int | None = Query(None, alias="from"),
+    to_ts: int | None = Query(None, alias="to"),
+) -> dict[str, Any]:
+    return _metrics("region", region, bucket, from_ts, to_ts)
+
+
+@app.get("/edges/{edge_addr}/logs")
+def recent_edge_logs(edge_addr: str, limit: int = 20) -> dict[str, Any]:
+    """Newest stored log summaries of one edge."""
+    limit = max(1, min(limit, 500))
+    if _mock_enabled():
+        s = get_settings()
+        logs = mock_list_log_summaries(seed=_mock_seed(), addrs=_mock_addrs(s))["logSummary"]
+        items = sorted((l for l in logs if l.get("edgeAddr") == edge_addr), key=lambda l: int(l["ts"]), reverse=True)[:limit]
+        return {"items": items, "total": len(items)}
+    if ReadOnlySessionLocal is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+    with session_scope(ReadOnlySessionLocal) as db:
+        rows = db.execute(
+            select(LogDetail).where(LogDetail.edge_addr == edge_addr).order_by(LogDetail.ts.desc()).limit(limit)
+        ).scalars().all()
+        items = [
+            {
+                "taskId": r.task_id,
+                "edgeAddr": r.edge_addr,
+                "stage": r.stage,
+                "ts": str(r.ts),
+                "logHash": r.log_hash,
+                "resultHash": r.result_hash or "",
+                "cpuMs": str(r.cpu_ms),
+                "memMbPeak": str(r.mem_mb_peak),
+                "latencyMs": str(r.latency_ms),
+                "netKb": str(r.net_kb),
+                "txHash": r.tx_hash,
+            }
+            for r in rows
+        ]
+    return {"items": items, "total": len(items)}
+
+
+@app.post("/metrics/rollups/rebuild")
+def rebuild_metric_rollups(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    """Recompute metric rollups from all stored log details as a background job."""
+    if SessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+    return _submit_rollup_rebuild(chain).to_dict()
+
+
+def _submit_rollup_rebuild(chain: ChainCLI) -> Job:
+    db_factory, store = SessionLocal, log_store
+
+    def _run(job: Job) -> dict[str, Any]:
+        global _regions_pending
+        try:
+            regions = {e.get("edgeAddr"): e.get("region") for e in _edge_list(chain)}
+        except Exception as e:
+            # Edge rollups do not need the chain; region rollups are skipped.
+            print(f"[rollups] edge regions unavailable: {e}")
+            regions = {}
+        n = rebuild_rollups(db_factory, store, regions, job=job)
+        _regions_pending = True
+        print(f"[rollups] rebuilt from {n} log rows")
+        return {"rows": n, "regions": len(regions)}
+
+    return job_manager.submit("rollups", _run)
+
+
+def _on_edge_sync() -> None:
+    if _regions_pending:
+        _backfill_regions()
+
+
+def _backfill_regions() -> None:
+    """Add log details and tasks stored before their edge's region was known to the region scopes."""
+    global _regions_pending
+    regions = edge_selector.regions()
+    if SessionLocal is None or not regions:
+        return
+    _regions_pending = False
+    try:
+        with session_scope(SessionLocal) as db:
+            n = backfill_region_rollups(db, regions)
+            m = fill_task_regions(db, regions)
+            left = pending_regions(db)
+    except Exception as e:
+        _regions_pending = True
+        print(f"[rollups] region backfill failed: {e}")
+        return
+    if left:
+        _regions_pending = True
+    if n or m:
+        print(f"[rollups] region backfill: {n} log rows, {m} tasks")
+
+
+# ------------------------- task pipeline latency -------------------------
+
+def _task_created_events(tasks: list[dict[str, Any]]) -> list[tuple]:
+    out = []
+    for t in tasks:
+        try:
+            created = int(t.get("createdAt") or 0)
+        except (TypeError, ValueError):
+            continue
+        if created > 0:
+            out.append((t.get("taskId"), "CREATE", created, t.get("chosenEdgeAddr") or None, t.get("region") or None))
+    return out
+
+
+def _mock_pipeline_tasks() -> list:
+    s = get_settings()
+    addrs = _mock_addrs(s)
+    tasks = mock_list_tasks(seed=_mock_seed(), addrs=addrs)["task"]
+    regions = {t["taskId"]: t.get("region") for t in tasks}
+    logs = mock_list_log_summaries(seed=_mock_seed(), addrs=addrs)["logSummary"]
+    events = _task_created_events(tasks) + [
+        (l["taskId"], l.get("stage"), int(l["ts"]), l.get("edgeAddr"), regions.get(l["taskId"])) for l in logs
+    ]
+    return list(fold_events(events).values())
+
+
+def _pipeline_scope(edge: str | None, region: str | None) -> tuple[str, str]:
+    if edge and region:
+        raise HTTPException(status_code=400, detail="pass edge or region, not both")
+    if edge:
+        return "edge", edge
+    if region:
+        return "region", region
+    return "all", ""
+
+
+@app.get("/tasks/{task_id}/pipeline")
+def task_pipeline(task_id: str) -> dict[str, Any]:
+    """When the task reached each stage, stage-to-stage durations and whether it is stuck past its SLA."""
+    now = int(time.time())
+    if _mock_enabled():
+        t = next((t for t in _mock_pipeline_tasks() if t.task_id == task_id), None)
+    else:
+        if ReadOnlySessionLocal is None:
+            raise HTTPException(status_code=500, detail="DB not ready")
+        with session_scope(ReadOnlySessionLocal) as db:
+            t = get_pipeline_task(db, task_id)
+    if t is None:
+        raise HTTPException(status_code=404, detail=f"no pipeline times for task {task_id}")
+    return task_view(t, now)
+
+
+@app.get("/pipeline/latency")
+def pipeline_latency(edge: str | None = None, region: str | None = None) -> dict[str, Any]:
+    """Stage-to-stage duration count / avg / p50 / p95 / p99 (seconds) for the fleet, one edge or one region."""
+    scope, key = _pipeline_scope(edge, region)
+    if _mock_enabled():
+        transitions = latency_from_tasks(_mock_pipeline_tasks(), scope, key)
+    else:
+        if ReadOnlySessionLocal is None:
+            raise HTTPException(status_code=500, detail="DB not ready")
+        with session_scope(ReadOnlySessionLocal) as db:
+            transitions = query_latency(db, scope, key)
+    return {"scope": scope, "key": key, "transitions": transitions}
+
+
+@app.get("/pipeline/stuck")
+def pipeline_stuck(stage: str | None = None, edge: str | None = None, region: str | None = None, limit: int = 100) -> dict[str, Any]:
+    """Tasks sitting in a stage longer than its SLA (PIPELINE_SLA_SEC), longest waiting first."""
+    limit = max(1, min(limit, 1000))
+    if stage is not None:
+        stage = stage.upper()
+        if stage not in PIPELINE_STAGES:
+            raise HTTPException(status_code=400, detail=f"stage must be one of {', '.join(PIPELINE_STAGES)}")
+    now = int(time.time())
+    if _mock_enabled():
+        out = stuck_from_tasks(_mock_pipeline_tasks(), now, stage=stage, edge=edge, region=region, limit=limit)
+    else:
+        if ReadOnlySessionLocal is None:
+            raise HTTPException(status_code=500, detail="DB not ready")
+        with session_scope(ReadOnlySessionLocal) as db:
+            out = stuck_tasks(db, now, stage=stage, edge=edge, region=region, limit=limit)
+    return {"now": now, **out}
+
+
+@app.post("/pipeline/rebuild")
+def rebuild_task_pipeline(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    """Recompute task stage times and duration sketches from the chain's tasks and all stored log details."""
+    if SessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+    return _submit_pipeline_rebuild(chain).to_dict()
+
+
+def _submit_pipeline_rebuild(chain: ChainCLI) -> Job:
+    db_factory, store = SessionLocal, log_store
+
+    def _run(job: Job) -> dict[str, Any]:
+        global _regions_pending
+        try:
+            tasks_raw = chain.query(chain.module, "list-task", [])
+            created = _task_created_events(tasks_raw.get("task") or tasks_raw.get("tasks") or [])
+            regions = {e.get("edgeAddr"): e.get("region") for e in _edge_list(chain)}
+        except Exception as e:
+            # Log stage times do not need the chain; CREATE times and regions are skipped.
+            print(f"[pipeline] chain tasks unavailable: {e}")
+            created, regions = [], {}
+        n = rebuild_pipeline(db_factory, store, created, regions, job=job)
+        _regions_pending = True
+        print(f"[pipeline] rebuilt {n} tasks")
+        return {"tasks": n, "created": len(created)}
+
+    return job_manager.submit("pipeline", _run)
+
+
 @app.get("/tasks")
 def list_tasks(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     if _mock_enabled():
@@ -324,11 +810,74 @@ def list_log_summaries(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     return _safe_query(chain, chain.module, "list-log-summary", [])
 
 
+def _log_summary_items(chain: ChainCLI) -> list[dict[str, Any]]:
+    if _mock_enabled():
+        s = get_settings()
+        return mock_list_log_summaries(seed=_mock_seed(), addrs=_mock_addrs(s))["logSummary"]
+    all_logs = chain.query(chain.module, "list-log-summary", [])
+    return all_logs.get("logSummary") or all_logs.get("logSummaries") or []
+
+
+def _log_columns(chain: ChainCLI) -> LogColumns:
+    """The columnar summary store, loaded on first use (see app.log_columns)."""
+    if log_columns is None:
+        raise HTTPException(status_code=500, detail="log column store needs numpy")
+    if log_columns.synced_at is None:
+        try:
+            log_columns.sync(_log_summary_items(chain))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        log_columns.start_refresher(lambda: _log_summary_items(chain))
+    return log_columns
+
+
+@app.get("/logs/query")
+def query_log_summaries(
+    task_id: str | None = None,
+    edge: str | None = None,
+    stage: str | None = None,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    min_latency_ms: int | None = None,
+    max_latency_ms: int | None = None,
+    min_cpu_ms: int | None = None,
+    min_mem_mb: int | None = None,
+    min_net_kb: int | None = None,
+    group_by: str | None = None,
+    top: str | None = None,
+    ascending: bool = False,
+    limit: int = 100,
+    chain: ChainCLI = Depends(chain_cli),
+) -> dict[str, Any]:
+    """Filter chain log summaries in the columnar store, then group (by task / edge / stage) or take the top rows by a field."""
+    if group_by is not None and group_by not in LOG_GROUP_KEYS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(LOG_GROUP_KEYS)}")
+    if top is not None and top not in LOG_NUMERIC_FIELDS:
+        raise HTTPException(status_code=400, detail=f"top must be one of: {', '.join(LOG_NUMERIC_FIELDS)}")
+    limit = max(1, min(limit, 10000))
+    store = _log_columns(chain)
+    lower = {f: v for f, v in (("latencyMs", min_latency_ms), ("cpuMs", min_cpu_ms), ("memMbPeak", min_mem_mb), ("netKb", min_net_kb)) if v is not None}
+    upper = {"latencyMs": max_latency_ms} if max_latency_ms is not None else {}
+    idx = store.select(task_id=task_id, edge=edge, stage=stage, from_ts=from_ts, to_ts=to_ts, lower=lower, upper=upper)
+    if group_by is not None:
+        groups = store.group_by(idx, group_by)
+        return {"total": len(idx), "groups": groups[:limit], "truncated": len(groups) > limit}
+    total = len(idx)
+    idx = store.top_k(idx, top, limit, ascending=ascending) if top is not None else idx[:limit]
+    return {"total": total, "items": store.rows(idx)}
+
+
+@app.get("/logs/columns")
+def log_columns_stats(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    return _log_columns(chain).stats()
+
+
 @app.get("/tasks/{task_id}/logs")
 def list_logs_by_task(task_id: str, chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     if _mock_enabled():
         s = get_settings()
         return mock_logs_by_task(task_id, seed=_mock_seed(), addrs=_mock_addrs(s))
+    # Live query: the audit reads through here and must see current chain state.
     # Chain only supports list-all; we filter in backend.
     all_logs = _safe_query(chain, chain.module, "list-log-summary", [])
     logs = all_logs.get("logSummary") or all_logs.get("logSummaries") or []
@@ -337,55 +886,305 @@ def list_logs_by_task(task_id: str, chain: ChainCLI = Depends(chain_cli)) -> dic
 
 
 @app.get("/audit/tasks/{task_id}/logs")
-def audit_task_logs(task_id: str, chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+async def audit_task_logs(task_id: str, chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     if _mock_enabled():
         s = get_settings()
         return mock_audit_task_logs(task_id, seed=_mock_seed(), addrs=_mock_addrs(s))
 
     """Audit view: compare chain log hashes vs DB detail -> recompute hash and match."""
-    if SessionLocal is None:
+    if AsyncSessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+
+    async def _load_rows() -> tuple[list[LogDetail], dict[str, LogVerification]]:
+        async with async_session_scope(AsyncSessionLocal) as db:
+            # Hot table plus any archived partitions whose task_id range covers this task.
+            rows = await log_store.aquery(db, task_id=task_id)
+            return rows, await load_verifications(db, [r.log_hash for r in rows])
+
+    generation = audit_cache.generation(task_id)
+    if audit_cache.has(task_id):
+        # A cached result is reusable if the chain's log set is unchanged; skip the DB read.
+        chain_logs = await asyncio.to_thread(list_logs_by_task, task_id, chain)
+        chain_items = chain_logs.get("items", [])
+        digest = chain_digest(it.get("logHash") or it.get("log_hash") for it in chain_items)
+        cached = audit_cache.get(task_id, digest)
+        if cached is not None:
+            return cached
+        rows, ledger = await _load_rows()
+    else:
+        # The chain query is a subprocess call; run it in a thread while the DB read is awaited.
+        chain_logs, (rows, ledger) = await asyncio.gather(
+            asyncio.to_thread(list_logs_by_task, task_id, chain),
+            _load_rows(),
+        )
+        chain_items = chain_logs.get("items", [])
+        digest = chain_digest(it.get("logHash") or it.get("log_hash") for it in chain_items)
+        audit_cache.get(task_id, digest)  # no entry yet: records the miss
+
+    db_map = {r.log_hash: r for r in rows}
+
+    audited = []
+    backfill: list[LogVerification] = []
+    for item in chain_items:
+        log_hash = item.get("logHash") or item.get("log_hash")
+        db_row = db_map.get(log_hash)
+        if not db_row:
+            audited.append({"logHash": log_hash, "match": False, "reason": "missing_in_db", "chain": item})
+            continue
+        v = ledger.get(log_hash)
+        if v is None:
+            # Row predates the ledger: verify now and record it.
+            v = build_verification(db_row)
+            backfill.append(v)
+        audited.append(
+            {
+                "logHash": log_hash,
+                "match": bool(v.match),
+                "verifiedHeight": v.verified_height,
+                "checkedAt": v.checked_at.isoformat() if v.checked_at else None,
+                "chain": item,
+                "db": {
+                    "stage": db_row.stage,
+                    "ts": db_row.ts,
+                    "cpu_ms": db_row.cpu_ms,
+                    "mem_mb_peak": db_row.mem_mb_peak,
+                    "net_kb": db_row.net_kb,
+                    "latency_ms": db_row.latency_ms,
+                    "tx_hash": db_row.tx_hash,
+                    "height": db_row.height,
+                    "signer": db_row.signer,
+                },
+            }
+        )
+
+    if backfill:
+        async with async_session_scope(AsyncSessionLocal) as db:
+            for v in backfill:
+                await db.merge(v)
+
+    result = {"taskId": task_id, "items": audited}
+    audit_cache.put(task_id, digest, generation, result)
+    return result
+
+
+@app.get("/audit/cache/stats")
+def audit_cache_stats() -> dict[str, Any]:
+    return audit_cache.stats()
+
+
+@app.get("/audit/logs")
+def audit_fleet_logs(
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+    chain: ChainCLI = Depends(chain_cli),
+) -> StreamingResponse:
+    """Fleet-wide audit as NDJSON: one line per log hash, then a summary line."""
+    if _mock_enabled():
+        s = get_settings()
+        addrs = _mock_addrs(s)
+
+        def _mock_lines():
+            summary = {"matched": 0, "mismatched": 0, "missing_in_db": 0, "missing_on_chain": 0}
+            for t in mock_list_tasks(seed=_mock_seed(), addrs=addrs)["task"]:
+                for it in mock_audit_task_logs(t["taskId"], seed=_mock_seed(), addrs=addrs)["items"]:
+                    status = "matched" if it["match"] else "mismatched"
+                    summary[status] += 1
+                    yield json.dumps({"logHash": it["logHash"], "status": status, "recomputed": it["dbLogHash"]}) + "\n"
+            yield json.dumps({"summary": {**summary, "total": sum(summary.values())}}) + "\n"
+
+        return StreamingResponse(_mock_lines(), media_type="application/x-ndjson")
+
+    if SessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+
+    # One chain query for the whole range; the DB side is streamed.
+    all_logs = _safe_query(chain, chain.module, "list-log-summary", [])
+    chain_items = all_logs.get("logSummary") or all_logs.get("logSummaries") or []
+    return StreamingResponse(
+        fleet_audit_ndjson(SessionLocal, log_store, chain_items, from_ts=from_ts, to_ts=to_ts, edge=edge),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get("/export/logs")
+def export_log_details(
+    format: str = "ndjson",
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+    stage: str | None = None,
+    include_detail: bool = False,
+) -> StreamingResponse:
+    """Stream log details (hot + archived) as csv, ndjson or columnar JSON, ordered by ts."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if ReadOnlySessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+    return StreamingResponse(
+        export_logs(
+            ReadOnlySessionLocal,
+            log_store,
+            format,
+            include_detail=include_detail,
+            from_ts=from_ts,
+            to_ts=to_ts,
+            edge=edge,
+            stage=stage,
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="log_details{EXPORT_SUFFIXES[format]}"'},
+    )
+
+
+@app.post("/export/logs/jobs")
+def export_log_details_job(
+    format: str = "ndjson",
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+    stage: str | None = None,
+    include_detail: bool = False,
+) -> dict[str, Any]:
+    """Same export as GET /export/logs, written to a file by a background job."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if ReadOnlySessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+    filters = {"from_ts": from_ts, "to_ts": to_ts, "edge": edge, "stage": stage}
+    db_factory, store = ReadOnlySessionLocal, log_store
+
+    def _run(job: Job) -> dict[str, Any]:
+        path = job_manager.artifact(job, EXPORT_SUFFIXES[format], EXPORT_FORMATS[format])
+
+        def _rows(n: int) -> None:
+            job.check_cancelled()
+            job.bump("rows", n)
+
+        with path.open("w", encoding="utf-8", newline="") as f:
+            for part in export_logs(db_factory, store, format, include_detail=include_detail, on_rows=_rows, **filters):
+                f.write(part)
+        return {"rows": job.progress.get("rows", 0), "bytes": path.stat().st_size}
+
+    job = job_manager.submit("export", _run, params={"format": format, "include_detail": include_detail, **filters})
+    return job.to_dict()
+
+
+@app.post("/audit/logs/jobs")
+def audit_fleet_logs_job(
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    edge: str | None = None,
+    chain: ChainCLI = Depends(chain_cli),
+) -> dict[str, Any]:
+    """Fleet-wide audit (see GET /audit/logs) as a background job writing NDJSON to a file."""
+    if _mock_enabled():
+        raise HTTPException(status_code=400, detail="fleet audit jobs need a chain (MOCK_DATA=1)")
+    if SessionLocal is None or log_store is None:
         raise HTTPException(status_code=500, detail="DB not ready")
+    db_factory, store = SessionLocal, log_store
+
+    def _run(job: Job) -> dict[str, Any]:
+        all_logs = chain.query(chain.module, "list-log-summary", [])
+        chain_items = all_logs.get("logSummary") or all_logs.get("logSummaries") or []
+        job.set("chain_items", len(chain_items))
+        path = job_manager.artifact(job, ".ndjson", "application/x-ndjson")
+        last = ""
+        with path.open("w", encoding="utf-8") as f:
+            for line in fleet_audit_ndjson(db_factory, store, chain_items, from_ts=from_ts, to_ts=to_ts, edge=edge):
+                job.check_cancelled()
+                f.write(line)
+                job.bump("records")
+                last = line
+        return json.loads(last).get("summary") if last else None
+
+    job = job_manager.submit("fleet-audit", _run, params={"from_ts": from_ts, "to_ts": to_ts, "edge": edge})
+    return job.to_dict()
+
+
+# ------------------------- background jobs -------------------------
+
+def _job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@app.get("/jobs")
+def list_jobs(kind: str | None = None) -> dict[str, Any]:
+    return {"items": [j.to_dict() for j in job_manager.list(kind)], "workers": job_manager.max_workers}
+
 
-    chain_logs = list_logs_by_task(task_id, chain)
-    chain_items = chain_logs.get("items", [])
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> dict[str, Any]:
+    return _job_or_404(job_id).to_dict()
 
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str) -> dict[str, Any]:
+    _job_or_404(job_id)
+    return job_manager.cancel(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/artifact")
+def get_job_artifact(job_id: str) -> FileResponse:
+    job = _job_or_404(job_id)
+    if job.status != "succeeded" or job.artifact_path is None or not job.artifact_path.exists():
+        raise HTTPException(status_code=404, detail="job has no artifact (not finished or produces none)")
+    return FileResponse(job.artifact_path, media_type=job.media_type, filename=f"{job.kind}-{job.id}{job.artifact_path.suffix}")
+
+
+@app.get("/search")
+def search(q: str, limit: int = 20) -> dict[str, Any]:
+    """Prefix lookup of logHash / txHash / resultHash / taskId."""
+    if len(q.strip()) < MIN_PREFIX:
+        raise HTTPException(status_code=400, detail=f"query must be at least {MIN_PREFIX} characters")
+    if SessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
     with session_scope(SessionLocal) as db:
-        rows = db.query(LogDetail).filter(LogDetail.task_id == task_id).all()
+        items = search_prefix(db, log_store, q, limit=max(1, min(limit, 100)))
+    return {"q": q, "items": items, "total": len(items)}
 
-        db_map = {r.log_hash: r for r in rows}
 
-        audited = []
-        for item in chain_items:
-            log_hash = item.get("logHash") or item.get("log_hash")
-            db_row = db_map.get(log_hash)
-            if not db_row:
-                audited.append({"logHash": log_hash, "match": False, "reason": "missing_in_db", "chain": item})
-                continue
-            try:
-                detail = db_row.detail_json
-                recomputed = sha256_hex_of_json(json.loads(detail))  # type: ignore
-            except Exception:
-                recomputed = ""
-            audited.append(
-                {
-                    "logHash": log_hash,
-                    "match": recomputed == log_hash,
-                    "chain": item,
-                    "db": {
-                        "stage": db_row.stage,
-                        "ts": db_row.ts,
-                        "cpu_ms": db_row.cpu_ms,
-                        "mem_mb_peak": db_row.mem_mb_peak,
-                        "net_kb": db_row.net_kb,
-                        "latency_ms": db_row.latency_ms,
-                        "tx_hash": db_row.tx_hash,
-                        "height": db_row.height,
-                        "signer": db_row.signer,
-                    },
-                }
-            )
+# ------------------------- merkle index -------------------------
+
+def _merkle_ready() -> MerkleIndex:
+    if merkle_index is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+    return merkle_index
+
+
+@app.get("/merkle/{kind}/{key}")
+def merkle_node(kind: str, key: str, prefix: str = "") -> dict[str, Any]:
+    """Root (or subtree at `prefix`) of the log-hash tree for a task or a UTC day (YYYYMMDD)."""
+    try:
+        return _merkle_ready().describe(kind, key, prefix.lower())
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"unknown tree kind: {kind}")
+
 
-    return {"taskId": task_id, "items": audited}
+@app.get("/merkle/{kind}/{key}/proof/{log_hash}")
+def merkle_proof(kind: str, key: str, log_hash: str) -> dict[str, Any]:
+    try:
+        proof = _merkle_ready().proof(kind, key, log_hash)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"unknown tree kind: {kind}")
+    if proof is None:
+        raise HTTPException(status_code=404, detail="logHash not in tree")
+    return proof
+
+
+@app.get("/merkle/{kind}/{key}/reconcile")
+def merkle_reconcile(kind: str, key: str, chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    """Compare the DB tree with one built from the chain's log summaries; drill down only where they differ."""
+    index = _merkle_ready()
+    all_logs = _safe_query(chain, chain.module, "list-log-summary", [])
+    items = all_logs.get("logSummary") or all_logs.get("logSummaries") or []
+    try:
+        return index.reconcile(kind, key, chain_hashes_for(kind, key, items))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"unknown tree kind: {kind}")
 
 
 @app.get("/governance/proposals")
@@ -401,78 +1200,244 @@ def list_propagations(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     return _safe_query(chain, chain.module, "list-reputation-propagation", [])
 
 
+@app.get("/reputation/propagations/verify")
+def verify_propagations(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    """Recompute every RepSnapshotHash from the edge state at the propagation's height."""
+    raw = _safe_query(chain, chain.module, "list-reputation-propagation", [])
+    props = raw.get("reputationPropagation") or raw.get("reputation_propagation") or raw.get("reputationPropagations") or []
+    try:
+        return snapshot_verifier.verify(chain, props)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/reputation/simulate")
+def simulate_reputation(
+    steps: int = 100,
+    runs: int = 200,
+    seed: int = 0,
+    edge: str | None = None,
+    p_bad: float | None = None,
+    chain: ChainCLI = Depends(chain_cli),
+) -> dict[str, Any]:
+    """Forecast each edge's score `steps` observations ahead and when it crosses the 0.30 proposal threshold.
+
+    Starts from current chain state and replays `runs` random futures per
+    edge through the keeper's math (app.reputation_engine). Observations are
+    drawn from each edge's own evidence unless p_bad overrides P(bad).
+    Runs are capped so edges x runs stays under REPUTATION_SIM_MAX_ROWS.
+    """
+    if _mock_enabled():
+        edges = (mock_list_edges(seed=_mock_seed(), addrs=_mock_addrs(get_settings())).get("edge") or [])
+    else:
+        try:
+            edges = _edge_list(chain)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    if edge is not None:
+        edges = [e for e in edges if (e.get("edgeAddr") or e.get("edge_addr")) == edge]
+        if not edges:
+            raise HTTPException(status_code=404, detail="edge not found")
+    if p_bad is not None and not 0.0 <= p_bad <= 1.0:
+        raise HTTPException(status_code=400, detail="p_bad must be in [0, 1]")
+    max_rows = int(os.getenv("REPUTATION_SIM_MAX_ROWS", "500000"))
+    steps = max(1, min(steps, 5000))
+    runs = max(1, min(runs, 10000, max_rows // max(len(edges), 1)))
+
+    t0 = time.perf_counter()
+    states = [reputation_engine.EdgeState.from_edge(e) for e in edges]
+    mixes = [
+        reputation_engine.observation_mix(e, st) if p_bad is None else (1.0 - p_bad, p_bad / 2, p_bad / 2)
+        for e, st in zip(edges, states)
+    ]
+    forecasts = reputation_engine.simulate(states, mixes, steps=steps, runs=runs, seed=seed)
+    items = []
+    for e, st, mix, fc in zip(edges, states, mixes, forecasts):
+        items.append(
+            {
+                "edgeAddr": e.get("edgeAddr") or e.get("edge_addr"),
+                "region": e.get("region"),
+                "status": e.get("status"),
+                "score": st.score,
+                "evidence": {"pos": st.pos, "neg": st.neg},
+                "pBad": round(1.0 - mix[0], 4),
+                "badStepsToThreshold": reputation_engine.steps_to_threshold(st),
+                "forecast": fc,
+            }
+        )
+    items.sort(key=lambda it: (-it["forecast"]["crossProb"], it["score"]))
+    return {
+        "threshold": reputation_engine.PROPOSAL_THRESHOLD,
+        "steps": steps,
+        "runs": runs,
+        "engine": "numpy" if reputation_engine.np is not None else "python",
+        "elapsedMs": round((time.perf_counter() - t0) * 1000, 1),
+        "items": items,
+    }
+
+
+@app.post("/backtest/thresholds")
+def backtest_thresholds(req: ThresholdBacktestRequest) -> dict[str, Any]:
+    """Replay stored log_details through candidate SubmitLogSummary thresholds (see app.backtest)."""
+    if ReadOnlySessionLocal is None or log_store is None:
+        raise HTTPException(status_code=500, detail="DB not ready")
+    sets = [ThresholdSet(**ts.model_dump()) for ts in req.sets]
+    if req.include_keeper:
+        sets.insert(0, KEEPER_THRESHOLDS)
+    t0 = time.perf_counter()
+    with session_scope(ReadOnlySessionLocal) as db:
+        metrics = load_log_metrics(db, log_store, from_ts=req.from_ts, to_ts=req.to_ts)
+    t1 = time.perf_counter()
+    items = backtest(metrics, sets)
+    if req.include_keeper:
+        items[0]["keeper"] = True
+    return {
+        "rows": metrics.rows,
+        "edges": len(metrics.edges),
+        "threshold": reputation_engine.PROPOSAL_THRESHOLD,
+        "engine": "numpy" if reputation_engine.np is not None else "python",
+        "loadMs": round((t1 - t0) * 1000, 1),
+        "elapsedMs": round((time.perf_counter() - t1) * 1000, 1),
+        "items": items,
+    }
+
+
 # ------------------------- chain tx wrappers -------------------------
 
 @app.post("/admin/edges/register")
 def admin_register_edge(edge_addr: str, region: str, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     try:
         res = chain.tx(chain.module, "register-edge", [edge_addr, region], from_name=s.admin_name)
+        edge_selector.request_refresh()
         return {"txHash": res.txhash, "height": res.height, "raw": res.raw}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _create_task_args(task_id: str, vehicle_addr: str, edge_addr: str, t: CreateTaskRequest, now_ts: str) -> list[str]:
+    payload_hash = sha256_hex_of_json(t.payload)
+    # log_hashes, result_hash, result_sig empty; not yet verified
+    return [task_id, vehicle_addr, edge_addr, t.region, "CREATED", t.task_type, payload_hash, "", "", "", "false", now_ts, now_ts]
+
+
 @app.post("/tasks")
 def create_task(req: CreateTaskRequest, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
-    """Create task and choose edge by reputation (simple sort by score)."""
+    """Create task and choose an edge by reputation and load (see app.edge_select)."""
     try:
-        edges_raw = chain.query(chain.module, "list-edge", [])
-        edges = edges_raw.get("edge") or edges_raw.get("edges") or []
-        region_edges = [e for e in edges if (e.get("region") == req.region) and (e.get("status") != "TASK_FROZEN")]
-        # sort by score desc
-        def score_of(e: dict) -> int:
-            try:
-                return int(e.get("score", 0))
-            except Exception:
-                return 0
-
-        region_edges.sort(key=score_of, reverse=True)
-        chosen = region_edges[0] if region_edges else (edges[0] if edges else None)
-        if not chosen:
-            raise RuntimeError("No edge available")
-        chosen_edge_addr = chosen.get("edgeAddr") or chosen.get("edge_addr")
+        if edge_selector.synced_at is None:
+            # first task before the refresher's first snapshot
+            edge_selector.sync(_edge_list(chain))
+        chosen_edge_addr = edge_selector.pick(req.region, policy=req.policy)
         if not chosen_edge_addr:
-            raise RuntimeError("Bad edge object")
+            raise RuntimeError("No edge available")
 
-        task_id = f"manual-{req.region}-{int(datetime.utcnow().timestamp())}"
-        payload_hash = sha256_hex_of_json(req.payload)
+        task_id = f"manual-{req.region}-{new_ulid()}"
         now_ts = str(int(datetime.now(timezone.utc).timestamp()))
         res = chain.tx(
             chain.module,
             "create-task",
-            [
-                task_id,
-                s.vehicle1_addr,
-                chosen_edge_addr,
-                req.region,
-                "CREATED",
-                req.task_type,
-                payload_hash,
-                "",  # log_hashes
-                "",  # result_hash
-                "",  # result_sig
-                "false",
-                now_ts,
-                now_ts,
-            ],
+            _create_task_args(task_id, s.vehicle1_addr, chosen_edge_addr, req, now_ts),
             from_name=s.vehicle1_name,
         )
+        if res.code:
+            raise RuntimeError(str(res.raw.get("raw_log") or f"create-task rejected with code {res.code}"))
+        edge_selector.acquire(task_id, chosen_edge_addr)
+        _record_created([(task_id, "CREATE", int(now_ts), chosen_edge_addr, req.region)])
         return {"taskId": task_id, "chosenEdgeAddr": chosen_edge_addr, "txHash": res.txhash, "height": res.height}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/tasks:batch")
+def create_tasks_batch(req: CreateTaskBatchRequest, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    """Create many tasks: one edge-selection pass, create-task msgs packed into multi-message txs.
+
+    Up to TASK_BATCH_MAX_MSGS (default 50) messages go in one tx; a tx is
+    atomic, so each item reports the outcome of the tx it was packed into.
+    """
+    try:
+        if edge_selector.synced_at is None:
+            edge_selector.sync(_edge_list(chain))
+        task_ids = [f"manual-{t.region}-{u}" for t, u in zip(req.tasks, new_ulids(len(req.tasks)))]
+        chosen = edge_selector.assign([(task_id, t.region) for task_id, t in zip(task_ids, req.tasks)], policy=req.policy)
+        if any(addr is None for addr in chosen):
+            for task_id in task_ids:
+                edge_selector.release(task_id)
+            raise RuntimeError("No edge available")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    now_ts = str(int(datetime.now(timezone.utc).timestamp()))
+    msgs = [("create-task", _create_task_args(task_id, s.vehicle1_addr, addr, t, now_ts)) for task_id, addr, t in zip(task_ids, chosen, req.tasks)]
+    per_tx = max(1, int(os.getenv("TASK_BATCH_MAX_MSGS", "50")))
+    gas_per_msg = int(os.getenv("TASK_BATCH_GAS_PER_MSG", "200000"))
+
+    items: list[dict[str, Any]] = []
+    sequence: int | None = None  # explicit once the first tx is in, so later txs can share its block
+    txs = 0
+    for i in range(0, len(msgs), per_tx):
+        part = range(i, min(i + per_tx, len(msgs)))
+        res, error = None, None
+        for _ in range(3):
+            try:
+                res = chain.tx_multi(chain.module, msgs[part.start : part.stop], from_name=s.vehicle1_name, gas_per_msg=gas_per_msg, sequence=sequence)
+                error = str(res.raw.get("raw_log") or f"code {res.code}") if res.code else None
+            except RuntimeError as e:
+                res, error = None, str(e)
+            if error is None:
+                sequence = sequence + 1 if sequence is not None else None
+                break
+            sequence = expected_sequence(error)
+            if sequence is None:
+                break
+        txs += 1
+        for j in part:
+            if error is not None:
+                edge_selector.release(task_ids[j])
+            items.append(
+                {
+                    "taskId": task_ids[j],
+                    "chosenEdgeAddr": chosen[j],
+                    "txHash": res.txhash if res is not None and error is None else None,
+                    "height": res.height if res is not None and error is None else None,
+                    "error": error,
+                }
+            )
+    _record_created(
+        [(it["taskId"], "CREATE", int(now_ts), it["chosenEdgeAddr"], t.region) for it, t in zip(items, req.tasks) if it["error"] is None]
+    )
+    created = sum(1 for it in items if it["error"] is None)
+    return {"items": items, "created": created, "failed": len(items) - created, "txs": txs}
+
+
+def _record_created(events: list[tuple]) -> None:
+    # best-effort: the tasks are on chain already; a rebuild recovers missed CREATE times
+    if SessionLocal is None or not events:
+        return
+    try:
+        with session_scope(SessionLocal) as db:
+            record_stages(db, events)
+    except Exception as e:
+        print(f"[pipeline] CREATE times not stored: {e}")
+
+
 @app.post("/edges/{edge_addr}/logs")
-def submit_log(edge_addr: str, req: SubmitLogRequest, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
-    if SessionLocal is None:
+async def submit_log(edge_addr: str, req: SubmitLogRequest, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    if AsyncSessionLocal is None or log_dedup is None:
         raise HTTPException(status_code=500, detail="DB not ready")
 
     # Compute logHash from detail
-    log_hash = sha256_hex_of_json(req.log_detail)
-
-    # Persist detail
-    with session_scope(SessionLocal) as db:
-        db.add(
+    # One serialization serves both the hash and the stored detail.
+    detail_bytes, log_hash = canonicalize_and_hash(req.log_detail)
+    detail_json, detail_blob = pack_json_text(detail_bytes.decode("utf-8"), compress=s.detail_compression)
+
+    # Retries of the same log are answered from the DB; only one request per
+    # logHash may be ingesting at a time in this process.
+    if not log_dedup.claim(log_hash):
+        raise HTTPException(status_code=409, detail=f"logHash {log_hash} is already being ingested")
+    try:
+        region = await _resolve_region(chain, edge_addr)
+        existing = await _store_log_detail(
             LogDetail(
                 task_id=req.task_id,
                 edge_addr=edge_addr,
@@ -484,50 +1449,130 @@ def submit_log(edge_addr: str, req: SubmitLogRequest, s: Settings = Depends(sett
                 latency_ms=req.latency_ms,
                 result_hash=req.result_hash,
                 log_hash=log_hash,
-                detail_json=json.dumps(req.log_detail, ensure_ascii=False, sort_keys=True, separators=(",", ":")),
-            )
+                detail_json=detail_json,
+                detail_blob=detail_blob,
+            ),
+            region,
         )
+        if existing is not None and existing.tx_hash:
+            return {"logHash": log_hash, "txHash": existing.tx_hash, "height": existing.height, "duplicate": True}
+        if existing is not None:
+            async with async_session_scope(AsyncSessionLocal) as db:
+                hot = (await db.execute(select(LogDetail.id).where(LogDetail.log_hash == log_hash))).first()
+            if hot is None:
+                # Archived unconfirmed by an older build: a rebroadcast's tx hash could not be recorded.
+                raise HTTPException(
+                    status_code=409,
+                    detail={
+                        "error": f"logHash {log_hash} is archived without a tx hash",
+                        "logHash": log_hash,
+                        "taskId": existing.task_id,
+                        "edgeAddr": existing.edge_addr,
+                        "stage": existing.stage,
+                        "ts": existing.ts,
+                        "txHash": None,
+                    },
+                )
+        # else: new row, or an earlier attempt stored it but its broadcast failed.
 
-    # Broadcast tx (edge signs)
-    try:
-        # map creator by edge_addr -> edge name
-        edge_name = {
-            s.edge1_addr: s.edge1_name,
-            s.edge2_addr: s.edge2_name,
-            s.edge3_addr: s.edge3_name,
-        }.get(edge_addr)
-        if not edge_name:
-            raise RuntimeError("Unknown edge addr")
+        # Broadcast tx (edge signs)
+        try:
+            # map creator by edge_addr -> local key name
+            # off the event loop: a keyring change makes the lookup run `keys list`
+            edge_name = await asyncio.to_thread(lambda: _actors().name_of(edge_addr))
+            if not edge_name:
+                raise RuntimeError("Unknown edge addr")
+
+            res = await asyncio.to_thread(
+                chain.tx,
+                chain.module,
+                "submit-log-summary",
+                [
+                    req.stage,
+                    req.task_id,
+                    log_hash,
+                    req.result_hash or "",
+                    str(req.cpu_ms),
+                    str(req.mem_mb_peak),
+                    str(req.latency_ms),
+                    str(req.net_kb),
+                    str(req.ts),
+                ],
+                from_name=edge_name,
+            )
+            if res.code:
+                # CheckTx rejected it: leave tx_hash unset so a retry broadcasts again.
+                raise RuntimeError(str(res.raw.get("raw_log") or f"tx rejected with code {res.code}"))
+
+            # update audit info in DB (best-effort)
+            async with async_session_scope(AsyncSessionLocal) as db:
+                row = (await db.execute(select(LogDetail).where(LogDetail.log_hash == log_hash))).scalar_one_or_none()
+                if row:
+                    row.tx_hash = res.txhash
+                    row.height = res.height
+                    row.msg_type = "submitLogSummary"
+                    row.signer = edge_addr
+                await aset_verified_height(db, log_hash, res.height)
+            audit_cache.invalidate(req.task_id)
+            if log_columns is not None:
+                log_columns.request_refresh()
+
+            return {"logHash": log_hash, "txHash": res.txhash, "height": res.height}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        log_dedup.release(log_hash)
 
-        res = chain.tx(
-            chain.module,
-            "submit-log-summary",
-            [
-                req.stage,
-                task_id,
-                log_hash,
-                req.result_hash or "",
-                str(req.cpu_ms),
-                str(req.mem_mb_peak),
-                str(req.latency_ms),
-                str(req.net_kb),
-                str(req.ts),
-            ],
-            from_name=edge_name,
-        )
 
-        # update audit info in DB (best-effort)
-        with session_scope(SessionLocal) as db:
-            row = db.query(LogDetail).filter(LogDetail.log_hash == log_hash).one_or_none()
-            if row:
-                row.tx_hash = res.txhash
-                row.height = res.height
-                row.msg_type = "submitLogSummary"
-                row.signer = edge_addr
-
-        return {"logHash": log_hash, "txHash": res.txhash, "height": res.height}
+async def _resolve_region(chain: ChainCLI, edge_addr: str) -> str | None:
+    """The edge's region from the synced edge list, else from show-edge; None if neither has it."""
+    region = edge_selector.region_of(edge_addr)
+    if region is not None:
+        return region
+    try:
+        resp = await asyncio.to_thread(chain.query, chain.module, "show-edge", [edge_addr])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"[rollups] region of {edge_addr} unavailable: {e}")
+        return None
+    edge_selector.update(resp.get("edge") or {})
+    return edge_selector.region_of(edge_addr)
+
+
+async def _store_log_detail(row: LogDetail, region: str | None) -> LogDetail | None:
+    """Insert row (with its ledger row, rollups and stage time) unless its log_hash is already stored; return the stored row if so.
+
+    With region None the row's region rollups are queued for _backfill_regions.
+    """
+    global _regions_pending
+    async with async_session_scope(AsyncSessionLocal) as db:
+        existing = await log_dedup.lookup(db, row.log_hash)
+        if existing is not None:
+            return existing
+    try:
+        rollup = [rollup_row(row, region)]
+        stages = [log_stage_event(row, region)]
+        async with async_session_scope(AsyncSessionLocal) as db:
+            db.add(row)
+            db.add(build_verification(row))
+            await db.run_sync(add_rollups, rollup)
+            await db.run_sync(record_stages, stages)
+            if region is None:
+                await db.run_sync(defer_regions, [(row.log_hash, row.task_id, rollup[0])])
+    except IntegrityError:
+        # Lost a race with another worker process; its row is the original.
+        async with async_session_scope(AsyncSessionLocal) as db:
+            existing = (await db.execute(select(LogDetail).where(LogDetail.log_hash == row.log_hash))).scalar_one_or_none()
+        if existing is None:
+            raise
+        log_dedup.add(row.log_hash)
+        return existing
+    log_dedup.add(row.log_hash)
+    if region is None:
+        _regions_pending = True
+    if merkle_index is not None:
+        merkle_index.add(row.task_id, row.ts, row.log_hash)
+    audit_cache.invalidate(row.task_id)
+    return None
 
 
 @app.post("/edges/{edge_addr}/tasks/{task_id}/result")
@@ -542,11 +1587,7 @@ def record_result(edge_addr: str, task_id: str, req: RecordResultRequest, s: Set
         f.write(result_hash)
         sign_file = f.name
 
-    edge_name = {
-        s.edge1_addr: s.edge1_name,
-        s.edge2_addr: s.edge2_name,
-        s.edge3_addr: s.edge3_name,
-    }.get(edge_addr)
+    edge_name = _actors().name_of(edge_addr)
     if not edge_name:
         raise HTTPException(status_code=400, detail="Unknown edge")
 
@@ -556,6 +1597,10 @@ def record_result(edge_addr: str, task_id: str, req: RecordResultRequest, s: Set
 
         # broadcast recordResult (cloud as tx signer)
         res = chain.tx(chain.module, "record-result", [task_id, result_hash, sig, str(verified).lower()], from_name=s.cloud_name)
+        if res.code:
+            # CheckTx rejected it: the task still runs on its edge and has no result to store.
+            raise RuntimeError(str(res.raw.get("raw_log") or f"record-result rejected with code {res.code}"))
+        edge_selector.release(task_id)
 
         # store in DB
         with session_scope(SessionLocal) as db:
@@ -570,6 +1615,7 @@ def record_result(edge_addr: str, task_id: str, req: RecordResultRequest, s: Set
                 tx_hash=res.txhash,
                 height=res.height,
                 signer=s.cloud_addr,
+                compress=s.detail_compression,
             )
 
         return {"taskId": task_id, "resultHash": result_hash, "signature": sig, "verified": verified, "txHash": res.txhash, "height": res.height}
@@ -585,15 +1631,20 @@ def record_result(edge_addr: str, task_id: str, req: RecordResultRequest, s: Set
 @app.post("/vehicles/{vehicle_addr}/tasks/{task_id}/complaint")
 def submit_feedback(vehicle_addr: str, task_id: str, req: TaskFeedbackRequest, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     try:
-        # for now only vehicle1
-        if vehicle_addr != s.vehicle1_addr:
-            raise HTTPException(status_code=403, detail="Only vehicle1 supported in MVP")
+        vehicle_name = _actors().name_of(vehicle_addr)
+        if not vehicle_name:
+            raise HTTPException(status_code=403, detail="Unknown vehicle (no local key for this address)")
         res = chain.tx(
             chain.module,
             "submit-task-feedback",
             [task_id, str(req.accepted).lower()],
-            from_name=s.vehicle1_name,
+            from_name=vehicle_name,
         )
+        if res.code:
+            raise RuntimeError(str(res.raw.get("raw_log") or f"submit-task-feedback rejected with code {res.code}"))
+        # feedback moves the edge's reputation
+        edge_selector.release(task_id)
+        edge_selector.request_refresh()
         return {"txHash": res.txhash, "height": res.height}
     except HTTPException:
         raise
@@ -605,6 +1656,7 @@ def submit_feedback(vehicle_addr: str, task_id: str, req: TaskFeedbackRequest, s
 def approve_proposal(proposal_id: str, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     try:
         res = chain.tx(chain.module, "approve-proposal", [proposal_id], from_name=s.admin_name)
+        edge_selector.request_refresh()
         return {"txHash": res.txhash, "height": res.height}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -614,6 +1666,7 @@ def approve_proposal(proposal_id: str, s: Settings = Depends(settings), chain: C
 def reject_proposal(proposal_id: str, reason: str = "", s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
     try:
         res = chain.tx(chain.module, "reject-proposal", [proposal_id, reason], from_name=s.admin_name)
+        edge_selector.request_refresh()
         return {"txHash": res.txhash, "height": res.height}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -639,22 +1692,34 @@ def demo_status(chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
 
 @app.post("/demo/seed")
 def demo_seed(req: DemoSeedRequest, s: Settings = Depends(settings), chain: ChainCLI = Depends(chain_cli)) -> dict[str, Any]:
+    """Seed demo data by sending REAL txs, as a background job (poll GET /jobs/{jobId})."""
     if _mock_enabled():
         return {"ok": True, "mock": True, "note": "MOCK_DATA=1: demo/seed is skipped; mock dataset is served via GET /edges,/tasks,/governance/proposals,/audit/..."}
-
-    """Seed demo data by sending REAL txs."""
     if SessionLocal is None:
         raise HTTPException(status_code=500, detail="DB not ready")
 
+    job = job_manager.submit("seed", lambda job: _run_demo_seed(req, s, chain, job=job), params=req.model_dump())
+    return {"ok": True, "jobId": job.id, "status": job.status}
+
+
+def _run_demo_seed(
+    req: DemoSeedRequest,
+    s: Settings,
+    chain: ChainCLI,
+    *,
+    job: Job | None = None,
+    progress_path: Path | None = None,
+) -> dict[str, Any]:
+    if SessionLocal is None:
+        raise RuntimeError("DB not ready")
+
     rnd = random.Random(req.seed)
 
         # Resolve which local keys actually exist. If some expected demo keys (vehicle1/edge*/cloud1)
     # are missing from the local keyring, fall back to the admin key so demo seed can still run.
     def _key_addr(name: str) -> str:
-        try:
-            return chain.keys_show_addr(name).strip()
-        except Exception:
-            return ""
+        # Served from the actor registry (one `keys list` per keyring change, not one fork per actor).
+        return _actors().addr_of(name, local_only=True) or ""
 
     admin_name = s.admin_name
     admin_addr = _key_addr(admin_name) or s.admin_addr
@@ -673,13 +1738,6 @@ def demo_seed(req: DemoSeedRequest, s: Settings = Depends(settings), chain: Chai
     edge2_name, edge2_addr = pick_actor(s.edge2_name, s.edge2_addr)
     edge3_name, edge3_addr = pick_actor(s.edge3_name, s.edge3_addr)
 
-    # Best-effort register edges (idempotent). Ignore errors (already exists, etc.).
-    for addr, region in [(edge1_addr, "A"), (edge2_addr, "A"), (edge3_addr, "B")]:
-        try:
-            chain.tx(chain.module, "register-edge", [addr, region], from_name=admin_name)
-        except Exception:
-            pass
-
     # helper to choose which edge to assign
     def pick_edge(region: str, i: int) -> str:
         if region == "A":
@@ -688,184 +1746,74 @@ def demo_seed(req: DemoSeedRequest, s: Settings = Depends(settings), chain: Chai
             return edge1_addr
         return edge3_addr
 
-    def edge_name_by_addr(addr: str) -> str:
-        return {edge1_addr: edge1_name, edge2_addr: edge2_name, edge3_addr: edge3_name}.get(addr, admin_name)
-
-    created_tasks: list[str] = []
-    created_logs = 0
     created_props_before = _safe_query(chain, chain.module, "list-governance-proposal", [])
     props_before = len(created_props_before.get("governanceProposal") or created_props_before.get("governanceProposals") or [])
 
-    now_ts = int(datetime.utcnow().timestamp())
-
-    for region in ["A", "B"]:
-        for i in range(req.tasks_per_region):
-            task_id = f"demo-{region}-{i+1:04d}"
-            chosen_edge = pick_edge(region, i)
-            payload = {"task_id": task_id, "region": region, "n": rnd.randint(1, 10)}
-            payload_hash = sha256_hex_of_json(payload)
-            created_ts = str(int(datetime.now(timezone.utc).timestamp()))
+    # A rerun with the same parameters resumes the same plan (same clocks, so
+    # the same log hashes) and only sends the txs without a checkpoint.
+    params = {
+        "seed": req.seed,
+        "tasks_per_region": req.tasks_per_region,
+        "days_span": req.days_span,
+        "bad_edge_mode": req.bad_edge_mode,
+        "chain_id": s.chain_id,
+        "signers": [admin_name, cloud_name, vehicle_name, edge1_name, edge2_name, edge3_name],
+        "edges": [edge1_addr, edge2_addr, edge3_addr],
+    }
+    checkpoint = begin_seed_run(SessionLocal, params, now_ts=int(datetime.utcnow().timestamp()), resume=req.resume)
+    if checkpoint.resumed:
+        print(f"[seed] resuming run {checkpoint.run_key}: {len(checkpoint.done)} txs already on chain")
+
+    # Plan everything, store all details in one transaction, then fan the txs
+    # out over one pipeline per signing key (see app.seeding).
+    tasks = plan_seed(
+        rnd,
+        tasks_per_region=req.tasks_per_region,
+        days_span=req.days_span,
+        bad_edge_mode=req.bad_edge_mode,
+        pick_edge=pick_edge,
+        bad_edge_addr=edge2_addr,
+        now_ts=checkpoint.now_ts,
+        created_ts=checkpoint.created_ts,
+        compress=s.detail_compression,
+    )
+    stored = store_planned_logs(SessionLocal, tasks)
+    if job is not None:
+        job.set("logs_written", len(stored))
+    for task, lg in stored:
+        if log_dedup is not None:
+            log_dedup.add(lg.log_hash)
+        if merkle_index is not None:
+            merkle_index.add(task.task_id, lg.ts, lg.log_hash)
+
+    actors = SeedActors(
+        admin_name=admin_name,
+        cloud_name=cloud_name,
+        cloud_addr=s.cloud_addr,
+        vehicle_name=vehicle_name,
+        vehicle_addr=vehicle_addr,
+        edges={edge1_addr: edge1_name, edge2_addr: edge2_name, edge3_addr: edge3_name},
+        registrations=[(edge1_addr, "A"), (edge2_addr, "A"), (edge3_addr, "B")],
+    )
 
-            # createTask
-            chain.tx(
-                chain.module,
-                "create-task",
-                [
-                    task_id,
-                    vehicle_addr,
-                    chosen_edge,
-                    region,
-                    "CREATED",
-                    "default",
-                    payload_hash,
-                    "",
-                    "",
-                    "",
-                    "false",
-                    created_ts,
-                    created_ts,
-                ],
-                from_name=vehicle_name,
-            )
-            created_tasks.append(task_id)
-
-            # logs
-            edge_addr = chosen_edge
-            edge_name = edge_name_by_addr(edge_addr)
-
-            base_latency = rnd.randint(50, 300)
-            bad = req.bad_edge_mode and (edge_addr == edge2_addr)
-
-            stages = ["RECV", "EXEC", "RESULT"]
-            stage_offsets = [0, rnd.randint(1, 3), rnd.randint(4, 6)]
-            for st, off in zip(stages, stage_offsets):
-                latency = base_latency + off * 20
-                cpu = rnd.randint(10, 80)
-                mem = rnd.randint(50, 200)
-                net = rnd.randint(5, 50)
-
-                if bad and st in ["EXEC", "RESULT"]:
-                    latency = rnd.randint(2500, 6000)
-                    cpu = rnd.randint(200, 800)
-                    mem = rnd.randint(800, 2000)
-                    net = rnd.randint(200, 800)
-
-                ts = now_ts - rnd.randint(0, req.days_span * 24 * 3600)
-
-                result_hash = ""
-                if st == "RESULT":
-                    result_json = {"task_id": task_id, "ok": not bad, "value": rnd.random()}
-                    result_hash = sha256_hex_of_json(result_json)
-
-                detail = {
-                    "taskId": task_id,
-                    "edgeAddr": edge_addr,
-                    "stage": st,
-                    "ts": ts,
-                    "cpu_ms": cpu,
-                    "mem_mb_peak": mem,
-                    "net_kb": net,
-                    "latency_ms": latency,
-                    "resultHash": result_hash,
-                }
-                log_hash = sha256_hex_of_json(detail)
-
-                # store DB
-                with session_scope(SessionLocal) as db:
-                    db.add(
-                        LogDetail(
-                            task_id=task_id,
-                            edge_addr=edge_addr,
-                            stage=st,
-                            ts=ts,
-                            cpu_ms=cpu,
-                            mem_mb_peak=mem,
-                            net_kb=net,
-                            latency_ms=latency,
-                            result_hash=result_hash or None,
-                            log_hash=log_hash,
-                            detail_json=json.dumps(detail, ensure_ascii=False, sort_keys=True, separators=(",", ":")),
-                        )
-                    )
-
-                # submitLogSummary tx (edge signs)
-                txr = chain.tx(
-                    chain.module,
-                    "submit-log-summary",
-                    [st, task_id, log_hash, result_hash or "", str(cpu), str(mem), str(latency), str(net), str(ts)],
-                    from_name=edge_name,
-                )
+    checkpoint.expected = plan_steps(tasks, actors)
 
-                with session_scope(SessionLocal) as db:
-                    row = db.query(LogDetail).filter(LogDetail.log_hash == log_hash).one_or_none()
-                    if row:
-                        row.tx_hash = txr.txhash
-                        row.height = txr.height
-                        row.signer = edge_addr
-                        row.msg_type = "submitLogSummary"
-
-                created_logs += 1
-
-                if st == "RESULT":
-                    # recordResult (cloud signs tx)
-                    # sign resultHash with edge key
-                    with tempfile.NamedTemporaryFile("w", delete=False) as f:
-                        f.write(result_hash)
-                        sign_file = f.name
-                    try:
-                        sig = chain.keys_sign(edge_name, sign_file)
-                        verified = chain.keys_verify(edge_addr, sig, sign_file)
-                        txres = chain.tx(chain.module, "record-result", [task_id, result_hash, sig, str(verified).lower()], from_name=cloud_name)
-
-                        with session_scope(SessionLocal) as db:
-                            upsert_task_result(
-                                db,
-                                task_id=task_id,
-                                chosen_edge_addr=edge_addr,
-                                result_json=result_json,
-                                result_hash=result_hash,
-                                result_sig=sig,
-                                verified=verified,
-                                tx_hash=txres.txhash,
-                                height=txres.height,
-                                signer=s.cloud_addr,
-                            )
-                    finally:
-                        try:
-                            os.unlink(sign_file)
-                        except Exception:
-                            pass
-
-            # feedback
-            # NOTE: newer tbthreed CLI expects exactly 2 positional args:
-            #   submit-task-feedback <task_id> <accepted>
-            # Keep demo seed compatible by only sending these two.
-            if bad:
-                chain.tx(
-                    chain.module,
-                    "submit-task-feedback",
-                    [task_id, "false"],
-                    from_name=vehicle_name,
-                )
-            else:
-                chain.tx(
-                    chain.module,
-                    "submit-task-feedback",
-                    [task_id, "true"],
-                    from_name=vehicle_name,
-                )
+    def _on_flush(task_ids: set[str]) -> None:
+        for task_id in task_ids:
+            audit_cache.invalidate(task_id)
+        if progress_path is not None:
+            write_seed_progress(progress_path, checkpoint.progress(SessionLocal), done=False, params=params)
 
-            # a few consensus events
-            if i % 5 == 0:
-                missed = 0 if not bad else rnd.randint(5, 20)
-                doubles = 0 if not bad else rnd.randint(0, 1)
-                part = 950 if not bad else rnd.randint(200, 700)
-                chain.tx(
-                    chain.module,
-                    "report-consensus-event",
-                    [edge_addr, str(missed), str(doubles), str(part)],
-                    from_name=cloud_name,
-                )
+    if progress_path is not None:
+        write_seed_progress(progress_path, checkpoint.progress(SessionLocal), done=False, params=params)
+    throughput = run_seed_txs(
+        chain, SessionLocal, tasks, actors, compress=s.detail_compression, on_flush=_on_flush, job=job, checkpoint=checkpoint
+    )
+    progress = finish_seed_run(SessionLocal, checkpoint)
+    edge_selector.request_refresh()
+    if log_columns is not None:
+        log_columns.request_refresh()
+    print(f"[seed] {throughput['txs']} txs ({throughput['failed']} failed) in {throughput['elapsed_sec']}s: {throughput['tx_per_sec']} tx/s")
 
     created_props_after = _safe_query(chain, chain.module, "list-governance-proposal", [])
     props_after = len(created_props_after.get("governanceProposal") or created_props_after.get("governanceProposals") or [])
@@ -873,8 +1821,10 @@ def demo_seed(req: DemoSeedRequest, s: Settings = Depends(settings), chain: Chai
     return {
         "ok": True,
         "seed": req.seed,
-        "tasks": len(created_tasks),
-        "logs": created_logs,
+        "tasks": len(tasks),
+        "logs": sum(len(t.logs) for t in tasks),
         "proposals_before": props_before,
         "proposals_after": props_after,
+        "throughput": throughput,
+        "progress": progress,
     }
@@ -0,0 +1,263 @@
+"""Merkle index over stored log hashes, bucketed by task and by UTC day.
+
+Each bucket is a fixed-depth 16-ary prefix tree keyed on the hex digits of the
+log hash, so the tree shape depends only on the set of hashes, not on insertion
+order. Two sides holding the same set always produce the same root.
+
+- A leaf bucket (prefix of length `depth`) hashes a binary Merkle tree over its
+  sorted hashes: leaf = H(0x00 || h), inner = H(0x01 || l || r). An odd node is
+  promoted unchanged.
+- An inner prefix node hashes its 16 children: H(0x02 || c0 || ... || cf).
+  Empty children use EMPTY = H(b"").
+
+Inserting a hash re-hashes one leaf bucket and the `depth` prefix nodes above
+it. Reconciliation compares roots first and only descends into prefixes whose
+hashes differ.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import threading
+from typing import Any, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import LogDetail, LogPartition, session_scope
+from .partitions import iter_archive_rows, period_bounds
+
+NIBBLES = "0123456789abcdef"
+EMPTY = hashlib.sha256(b"").digest()
+
+# Per-task buckets hold a handful of stage logs; per-day buckets can hold
+# hundreds of thousands, so they fan out into 256 leaf buckets.
+KIND_DEPTH = {"task": 0, "day": 2}
+
+
+def _h(*parts: bytes) -> bytes:
+    return hashlib.sha256(b"".join(parts)).digest()
+
+
+def _leaf_bytes(log_hash: str) -> bytes:
+    try:
+        return bytes.fromhex(log_hash)
+    except ValueError:
+        return log_hash.encode("utf-8")
+
+
+def _bucket_levels(leaves: list[str]) -> list[list[bytes]]:
+    level = [_h(b"\x00", _leaf_bytes(x)) for x in leaves]
+    levels = [level]
+    while len(level) > 1:
+        nxt = [_h(b"\x01", level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+        levels.append(level)
+    return levels
+
+
+class MerkleTree:
+    def __init__(self, depth: int) -> None:
+        self.depth = depth
+        self._buckets: dict[str, list[str]] = {}
+        self._cache: dict[str, bytes] = {}
+        self.size = 0
+
+    def add(self, log_hash: str) -> bool:
+        h = log_hash.lower()
+        p = h[: self.depth]
+        b = self._buckets.setdefault(p, [])
+        i = bisect.bisect_left(b, h)
+        if i < len(b) and b[i] == h:
+            return False
+        b.insert(i, h)
+        self.size += 1
+        for k in range(self.depth + 1):
+            self._cache.pop(p[:k], None)
+        return True
+
+    def __contains__(self, log_hash: str) -> bool:
+        h = log_hash.lower()
+        b = self._buckets.get(h[: self.depth], [])
+        i = bisect.bisect_left(b, h)
+        return i < len(b) and b[i] == h
+
+    def leaves(self, prefix: str = "") -> list[str]:
+        return [h for p in sorted(self._buckets) if p.startswith(prefix) for h in self._buckets[p]]
+
+    def node(self, prefix: str = "") -> bytes:
+        got = self._cache.get(prefix)
+        if got is not None:
+            return got
+        if len(prefix) >= self.depth:
+            b = self._buckets.get(prefix[: self.depth], [])
+            got = _bucket_levels(b)[-1][0] if b else EMPTY
+        elif not any(p.startswith(prefix) for p in self._buckets):
+            got = EMPTY
+        else:
+            got = _h(b"\x02", *[self.node(prefix + n) for n in NIBBLES])
+        self._cache[prefix] = got
+        return got
+
+    def root(self) -> str:
+        return self.node("").hex()
+
+    def children(self, prefix: str) -> dict[str, str]:
+        if len(prefix) >= self.depth:
+            return {}
+        return {prefix + n: self.node(prefix + n).hex() for n in NIBBLES}
+
+    def proof(self, log_hash: str) -> dict[str, Any] | None:
+        """Inclusion proof: bucket path (bottom-up) plus the 16 sibling hashes of each prefix level."""
+        h = log_hash.lower()
+        if h not in self:
+            return None
+        p = h[: self.depth]
+        b = self._buckets[p]
+        idx = b.index(h)
+        path: list[dict[str, str]] = []
+        for level in _bucket_levels(b)[:-1]:
+            sib = idx ^ 1
+            if sib < len(level):
+                path.append({"side": "left" if sib < idx else "right", "hash": level[sib].hex()})
+            idx //= 2
+        prefix_levels = [
+            {"prefix": p[:k], "children": [self.node(p[:k] + n).hex() for n in NIBBLES]}
+            for k in range(self.depth - 1, -1, -1)
+        ]
+        return {"logHash": h, "bucket": p, "bucketPath": path, "prefixLevels": prefix_levels, "root": self.root()}
+
+
+def verify_proof(proof: dict[str, Any], root: str) -> bool:
+    cur = _h(b"\x00", _leaf_bytes(proof["logHash"]))
+    for step in proof["bucketPath"]:
+        sib = bytes.fromhex(step["hash"])
+        cur = _h(b"\x01", sib, cur) if step["side"] == "left" else _h(b"\x01", cur, sib)
+    bucket = proof["bucket"]
+    for lvl in proof["prefixLevels"]:
+        k = len(lvl["prefix"])
+        children = [bytes.fromhex(c) for c in lvl["children"]]
+        if children[NIBBLES.index(bucket[k])] != cur:
+            return False
+        cur = _h(b"\x02", *children)
+    return cur.hex() == root
+
+
+def diff_trees(a: MerkleTree, b: MerkleTree, prefix: str = "") -> tuple[list[str], list[str], int]:
+    """Hashes only in a, only in b, and the number of nodes compared."""
+    if a.node(prefix) == b.node(prefix):
+        return [], [], 1
+    if len(prefix) >= a.depth:
+        sa, sb = set(a.leaves(prefix)), set(b.leaves(prefix))
+        return sorted(sa - sb), sorted(sb - sa), 1
+    only_a: list[str] = []
+    only_b: list[str] = []
+    visited = 1
+    for n in NIBBLES:
+        x, y, v = diff_trees(a, b, prefix + n)
+        only_a += x
+        only_b += y
+        visited += v
+    return only_a, only_b, visited
+
+
+def day_key(ts: int) -> str:
+    return period_bounds(int(ts), "day")[0]
+
+
+def build_tree(kind: str, log_hashes: Iterable[str]) -> MerkleTree:
+    t = MerkleTree(KIND_DEPTH[kind])
+    for h in log_hashes:
+        if h:
+            t.add(h)
+    return t
+
+
+class MerkleIndex:
+    """In-memory Merkle trees over log_details, one per task and per day."""
+
+    def __init__(self) -> None:
+        self._trees: dict[str, dict[str, MerkleTree]] = {k: {} for k in KIND_DEPTH}
+        self._lock = threading.Lock()
+
+    def add(self, task_id: str, ts: int, log_hash: str) -> None:
+        with self._lock:
+            for kind, key in (("task", task_id), ("day", day_key(ts))):
+                t = self._trees[kind].get(key)
+                if t is None:
+                    t = self._trees[kind][key] = MerkleTree(KIND_DEPTH[kind])
+                t.add(log_hash)
+
+    def describe(self, kind: str, key: str, prefix: str = "") -> dict[str, Any]:
+        with self._lock:
+            t = self._tree(kind, key)
+            out: dict[str, Any] = {"kind": kind, "key": key, "depth": t.depth, "leaves": t.size, "prefix": prefix, "hash": t.node(prefix).hex()}
+            if len(prefix) >= t.depth:
+                out["bucket"] = t.leaves(prefix)
+            else:
+                out["children"] = t.children(prefix)
+            return out
+
+    def proof(self, kind: str, key: str, log_hash: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._tree(kind, key).proof(log_hash)
+
+    def reconcile(self, kind: str, key: str, other_hashes: Iterable[str]) -> dict[str, Any]:
+        """Compare the stored tree with one built from `other_hashes` (e.g. the chain's)."""
+        other = build_tree(kind, other_hashes)
+        with self._lock:
+            mine = self._tree(kind, key)
+            only_db, only_other, visited = diff_trees(mine, other)
+            return {
+                "kind": kind,
+                "key": key,
+                "dbRoot": mine.root(),
+                "chainRoot": other.root(),
+                "agree": not only_db and not only_other,
+                "missingOnChain": only_db,
+                "missingInDb": only_other,
+                "nodesCompared": visited,
+            }
+
+    def _tree(self, kind: str, key: str) -> MerkleTree:
+        if kind not in KIND_DEPTH:
+            raise KeyError(kind)
+        return self._trees[kind].get(key) or MerkleTree(KIND_DEPTH[kind])
+
+    def rebuild(self, SessionLocal: sessionmaker[Session]) -> int:
+        fresh = MerkleIndex()
+        n = 0
+        with session_scope(SessionLocal) as db:
+            stmt = select(LogDetail.task_id, LogDetail.ts, LogDetail.log_hash).execution_options(yield_per=5000)
+            for task_id, ts, h in db.execute(stmt):
+                fresh.add(task_id, ts, h)
+                n += 1
+            paths = db.execute(select(LogPartition.path)).scalars().all()
+        for path in paths:
+            for task_id, ts, h in iter_archive_rows(path, "SELECT task_id, ts, log_hash FROM log_details"):
+                fresh.add(task_id, ts, h)
+                n += 1
+        with self._lock:
+            self._trees = fresh._trees
+        return n
+
+
+def chain_hashes_for(kind: str, key: str, chain_items: Iterable[dict[str, Any]]) -> list[str]:
+    out: list[str] = []
+    for it in chain_items:
+        h = it.get("logHash") or it.get("log_hash")
+        if not h:
+            continue
+        if kind == "task" and it.get("taskId") != key:
+            continue
+        if kind == "day":
+            try:
+                if day_key(int(it.get("ts", 0))) != key:
+                    continue
+            except Exception:
+                continue
+        out.append(h)
+    return out
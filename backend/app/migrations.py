@@ -0,0 +1,210 @@
+"""Versioned, in-place schema migrations.
+
+`Base.metadata.create_all` only creates missing tables; it never adds new
+indexes or columns to a table that already exists. Every schema change after
+the initial layout is therefore expressed here as a numbered migration that is
+applied once (and recorded in `schema_migrations`) when the app starts.
+
+Run `python -m app.migrations check` to print the query plans of the hot log
+queries; it exits non-zero when one of them falls back to a full table scan.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import Connection, Engine, inspect, text
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: list[str]) -> None:
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl_type: str) -> None:
+    """ALTER TABLE ... ADD COLUMN, skipped if the column already exists."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column in existing:
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _m001_log_details_composite_indexes(conn: Connection) -> None:
+    _create_index(conn, "ix_log_details_task_id_ts", "log_details", ["task_id", "ts"])
+    _create_index(conn, "ix_log_details_edge_addr_ts", "log_details", ["edge_addr", "ts"])
+    _create_index(conn, "ix_log_details_stage_ts", "log_details", ["stage", "ts"])
+
+
+def _m002_compressed_payload_columns(conn: Connection) -> None:
+    _add_column(conn, "log_details", "detail_blob", "BLOB")
+    _add_column(conn, "task_results", "result_blob", "BLOB")
+
+
+def _m003_prefix_search_indexes(conn: Connection) -> None:
+    # Plain B-tree indexes: prefix search uses range predicates (col >= p AND col < p_next).
+    _create_index(conn, "ix_log_details_tx_hash", "log_details", ["tx_hash"])
+    _create_index(conn, "ix_log_details_result_hash", "log_details", ["result_hash"])
+    _create_index(conn, "ix_task_results_tx_hash", "task_results", ["tx_hash"])
+    _create_index(conn, "ix_task_results_result_hash", "task_results", ["result_hash"])
+
+
+def _m004_log_details_ts_index(conn: Connection) -> None:
+    # Time-range scans without an edge/stage/task filter (bulk export, fleet audit).
+    _create_index(conn, "ix_log_details_ts", "log_details", ["ts"])
+
+
+# Append only. Never renumber or edit a migration that has shipped.
+MIGRATIONS: list[Migration] = [
+    Migration(1, "log_details_composite_indexes", _m001_log_details_composite_indexes),
+    Migration(2, "compressed_payload_columns", _m002_compressed_payload_columns),
+    Migration(3, "prefix_search_indexes", _m003_prefix_search_indexes),
+    Migration(4, "log_details_ts_index", _m004_log_details_ts_index),
+]
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version INTEGER PRIMARY KEY,
+              name VARCHAR(128) NOT NULL,
+              applied_at VARCHAR(32) NOT NULL
+            )
+            """
+        )
+    )
+
+
+def current_version(engine: Engine) -> int:
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        v = conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+    return int(v or 0)
+
+
+def run_migrations(engine: Engine) -> list[int]:
+    """Apply all pending migrations, each in its own transaction.
+
+    Returns the versions that were applied by this call.
+    """
+    applied: list[int] = []
+    done = current_version(engine)
+    for m in MIGRATIONS:
+        if m.version <= done:
+            continue
+        with engine.begin() as conn:
+            m.apply(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": m.version, "n": m.name, "t": datetime.utcnow().isoformat()},
+            )
+        applied.append(m.version)
+    return applied
+
+
+# ------------------------- query plan check -------------------------
+
+# The queries the API and audit paths issue most often. Parameters are dummies;
+# only the plan matters.
+HOT_QUERIES: dict[str, tuple[str, dict]] = {
+    "log_details by task_id order by ts": (
+        "SELECT * FROM log_details WHERE task_id = :task_id ORDER BY ts",
+        {"task_id": "t"},
+    ),
+    "log_details by edge_addr over ts range": (
+        "SELECT * FROM log_details WHERE edge_addr = :edge AND ts BETWEEN :a AND :b ORDER BY ts",
+        {"edge": "e", "a": 0, "b": 1},
+    ),
+    "log_details by stage over ts range": (
+        "SELECT * FROM log_details WHERE stage = :stage AND ts BETWEEN :a AND :b ORDER BY ts",
+        {"stage": "RECV", "a": 0, "b": 1},
+    ),
+    "log_details over ts range": (
+        "SELECT * FROM log_details WHERE ts BETWEEN :a AND :b ORDER BY ts",
+        {"a": 0, "b": 1},
+    ),
+    "log_details by log_hash": (
+        "SELECT * FROM log_details WHERE log_hash = :h",
+        {"h": "00"},
+    ),
+    "log_details by tx_hash prefix": (
+        "SELECT * FROM log_details WHERE tx_hash >= :p AND tx_hash < :q LIMIT 20",
+        {"p": "AB", "q": "AC"},
+    ),
+    "task_results by task_id prefix": (
+        "SELECT * FROM task_results WHERE task_id >= :p AND task_id < :q LIMIT 20",
+        {"p": "demo-", "q": "demo."},
+    ),
+}
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    name: str
+    sql: str
+    details: list[str]
+
+    @property
+    def full_scan(self) -> bool:
+        # SQLite reports "SCAN <table>" (or "SCAN TABLE <table>" on older
+        # versions) without "USING ... INDEX" when it walks the whole table.
+        return any(d.startswith("SCAN") and "USING" not in d for d in self.details)
+
+
+def explain_hot_queries(engine: Engine) -> list[QueryPlan]:
+    if engine.dialect.name != "sqlite":
+        return []
+    plans: list[QueryPlan] = []
+    with engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+            plans.append(QueryPlan(name=name, sql=sql, details=[str(r[-1]) for r in rows]))
+    return plans
+
+
+def check_query_plans(engine: Engine) -> list[QueryPlan]:
+    """Raise RuntimeError if any hot query does a full table scan."""
+    plans = explain_hot_queries(engine)
+    bad = [p for p in plans if p.full_scan]
+    if bad:
+        lines = [f"{p.name}: {' | '.join(p.details)}" for p in bad]
+        raise RuntimeError("Full table scan in hot query plan:\n" + "\n".join(lines))
+    return plans
+
+
+def _main(argv: list[str]) -> int:
+    from .config import get_settings
+    from .db import make_engine, Base
+
+    cmd = argv[0] if argv else "check"
+    engine = make_engine(get_settings().db_url)
+    Base.metadata.create_all(engine)
+    applied = run_migrations(engine)
+    if applied:
+        print(f"applied migrations: {applied}")
+    print(f"schema version: {current_version(engine)}")
+    if cmd != "check":
+        return 0
+
+    failed = False
+    for p in explain_hot_queries(engine):
+        status = "FULL SCAN" if p.full_scan else "ok"
+        failed = failed or p.full_scan
+        print(f"[{status}] {p.name}")
+        for d in p.details:
+            print(f"    {d}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,345 @@
+"""Time-partitioned cold storage for `log_details`.
+
+The main `log_details` table is the hot partition: it only keeps rows newer
+than the retention window. Older rows are moved, one day or ISO week at a time,
+into standalone SQLite files under `data/partitions/`. Each archive file is
+VACUUMed, made read-only on disk and opened with `immutable=1` plus a large
+`mmap_size`, so reads go straight through the page cache without locking.
+
+`log_partitions` (in the main DB) is the manifest. It records the ts range and
+task_id range of every archive file, which lets `LogStore.query` skip files that
+cannot contain matching rows. Hot-path latency then depends on recent volume,
+not on total history.
+
+Rows without a tx_hash (their broadcast failed and a retry may still record
+one) are never sealed: they stay in the hot table, past retention, until a
+retry confirms them, and are then sealed into the next file for that period.
+
+Run `python -m app.partitions archive` to seal expired periods by hand.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import LogDetail, LogPartition, session_scope
+
+# 256MB of address space per archive file; untouched pages cost nothing.
+ARCHIVE_MMAP_SIZE = 256 * 1024 * 1024
+
+_COLUMNS = [c.name for c in LogDetail.__table__.columns]
+
+
+def default_archive_dir() -> Path:
+    # backend/app -> backend
+    return Path(__file__).resolve().parents[1] / "data" / "partitions"
+
+
+def period_bounds(ts: int, granularity: str) -> tuple[str, int, int]:
+    """Return (key, start_ts, end_ts) of the UTC day/ISO week containing ts; end is exclusive."""
+    d = datetime.fromtimestamp(ts, tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        start = d
+        end = d + timedelta(days=1)
+        key = start.strftime("%Y%m%d")
+    elif granularity == "week":
+        start = d - timedelta(days=d.weekday())
+        end = start + timedelta(days=7)
+        year, week, _ = start.isocalendar()
+        key = f"{year}W{week:02d}"
+    else:
+        raise ValueError(f"unknown partition granularity: {granularity}")
+    return key, int(start.timestamp()), int(end.timestamp())
+
+
+@dataclass(frozen=True)
+class PartitionInfo:
+    name: str
+    path: str
+    min_ts: int
+    max_ts: int
+    min_task_id: str
+    max_task_id: str
+    rows: int
+
+    def may_contain(
+        self,
+        *,
+        from_ts: int | None = None,
+        to_ts: int | None = None,
+        task_id: str | None = None,
+    ) -> bool:
+        if from_ts is not None and self.max_ts < from_ts:
+            return False
+        if to_ts is not None and self.min_ts > to_ts:
+            return False
+        if task_id is not None and not (self.min_task_id <= task_id <= self.max_task_id):
+            return False
+        return True
+
+
+class LogStore:
+    """Query `log_details` across the hot table and the sealed archive files."""
+
+    def __init__(self, SessionLocal: sessionmaker[Session], archive_dir: Path | None = None) -> None:
+        self.SessionLocal = SessionLocal
+        self.archive_dir = archive_dir or default_archive_dir()
+
+    # ---- manifest ----
+
+    def partitions(self, db: Session) -> list[PartitionInfo]:
+        rows = db.execute(select(LogPartition).order_by(LogPartition.min_ts)).scalars().all()
+        return [_partition_info(r) for r in rows]
+
+    async def apartitions(self, db: AsyncSession) -> list[PartitionInfo]:
+        rows = (await db.execute(select(LogPartition).order_by(LogPartition.min_ts))).scalars().all()
+        return [_partition_info(r) for r in rows]
+
+    def prune(
+        self,
+        db: Session,
+        *,
+        from_ts: int | None = None,
+        to_ts: int | None = None,
+        task_id: str | None = None,
+    ) -> list[PartitionInfo]:
+        return [p for p in self.partitions(db) if p.may_contain(from_ts=from_ts, to_ts=to_ts, task_id=task_id)]
+
+    # ---- reads ----
+
+    def query(self, db: Session, **filters: Any) -> list[LogDetail]:
+        """Rows matching all given filters, ordered by ts.
+
+        Filters: task_id, edge_addr, stage, log_hash (equality), log_hashes
+        (membership) and from_ts / to_ts (inclusive). Hot rows are attached to `db`; archived
+        rows are transient LogDetail instances (read-only by convention).
+        """
+        q, sql, params = build_query(**filters)
+        out: list[LogDetail] = []
+        for p in self.prune(db, from_ts=filters.get("from_ts"), to_ts=filters.get("to_ts"), task_id=filters.get("task_id")):
+            out.extend(LogDetail(**row) for row in _read_archive(p.path, sql, params))
+        out.extend(db.execute(q).scalars().all())
+        out.sort(key=lambda r: r.ts)
+        return out
+
+    async def aquery(self, db: AsyncSession, **filters: Any) -> list[LogDetail]:
+        """Async variant of query(); archive files are read in a worker thread."""
+        q, sql, params = build_query(**filters)
+        parts = [
+            p
+            for p in await self.apartitions(db)
+            if p.may_contain(from_ts=filters.get("from_ts"), to_ts=filters.get("to_ts"), task_id=filters.get("task_id"))
+        ]
+        out: list[LogDetail] = []
+        for p in parts:
+            rows = await asyncio.to_thread(_read_archive, p.path, sql, params)
+            out.extend(LogDetail(**row) for row in rows)
+        out.extend((await db.execute(q)).scalars().all())
+        out.sort(key=lambda r: r.ts)
+        return out
+
+    # ---- retention ----
+
+    def archive_expired(self, *, retention_days: int, granularity: str = "week", now_ts: int | None = None) -> list[str]:
+        """Seal every whole period that ended before now - retention into an archive file.
+
+        Returns the names of the partitions written.
+        """
+        if retention_days <= 0:
+            return []
+        now_ts = now_ts if now_ts is not None else int(datetime.now(timezone.utc).timestamp())
+        cutoff = now_ts - retention_days * 86400
+        written: list[str] = []
+        while True:
+            with session_scope(self.SessionLocal) as db:
+                oldest = db.execute(select(LogDetail.ts).where(LogDetail.tx_hash.is_not(None)).order_by(LogDetail.ts).limit(1)).scalar()
+            if oldest is None:
+                break
+            key, start, end = period_bounds(int(oldest), granularity)
+            if end > cutoff:
+                break
+            written.append(self._seal(key, start, end))
+        return written
+
+    def _seal(self, key: str, start: int, end: int) -> str:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        with session_scope(self.SessionLocal) as db:
+            n_existing = db.query(LogPartition).filter(LogPartition.period == key).count()
+        name = f"log_details_{key}" + (f"_{n_existing}" if n_existing else "")
+        final = self.archive_dir / f"{name}.db"
+        tmp = final.with_suffix(".db.tmp")
+        if tmp.exists():
+            tmp.unlink()
+
+        archive = create_engine(f"sqlite:///{tmp}", future=True)
+        LogDetail.__table__.create(archive)
+        ids: list[int] = []
+        min_task: str | None = None
+        max_task: str | None = None
+        min_ts: int | None = None
+        max_ts: int | None = None
+        with session_scope(self.SessionLocal) as db:
+            stmt = (
+                select(*[LogDetail.__table__.c[c] for c in _COLUMNS])
+                .where(LogDetail.ts >= start, LogDetail.ts < end, LogDetail.tx_hash.is_not(None))
+                .order_by(LogDetail.task_id, LogDetail.ts)
+                .execution_options(yield_per=1000)
+            )
+            with archive.begin() as conn:
+                for chunk in db.execute(stmt).mappings().partitions():
+                    rows = [dict(r) for r in chunk]
+                    conn.execute(insert(LogDetail.__table__), rows)
+                    for r in rows:
+                        ids.append(r["id"])
+                        min_task = r["task_id"] if min_task is None else min(min_task, r["task_id"])
+                        max_task = r["task_id"] if max_task is None else max(max_task, r["task_id"])
+                        min_ts = r["ts"] if min_ts is None else min(min_ts, r["ts"])
+                        max_ts = r["ts"] if max_ts is None else max(max_ts, r["ts"])
+        with archive.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        archive.dispose()
+
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, final)
+
+        # Manifest insert and hot-table delete commit together: a crash before
+        # this point leaves an orphan file but no lost or duplicated rows.
+        with session_scope(self.SessionLocal) as db:
+            db.add(
+                LogPartition(
+                    name=name,
+                    period=key,
+                    path=str(final),
+                    period_start=start,
+                    period_end=end,
+                    min_ts=min_ts if min_ts is not None else start,
+                    max_ts=max_ts if max_ts is not None else start,
+                    min_task_id=min_task or "",
+                    max_task_id=max_task or "",
+                    rows=len(ids),
+                )
+            )
+            for i in range(0, len(ids), 500):
+                db.execute(delete(LogDetail).where(LogDetail.id.in_(ids[i : i + 500])))
+        return name
+
+
+def _partition_info(r: LogPartition) -> PartitionInfo:
+    return PartitionInfo(
+        name=r.name,
+        path=r.path,
+        min_ts=r.min_ts,
+        max_ts=r.max_ts,
+        min_task_id=r.min_task_id,
+        max_task_id=r.max_task_id,
+        rows=r.rows,
+    )
+
+
+def build_query(
+    *,
+    task_id: str | None = None,
+    edge_addr: str | None = None,
+    stage: str | None = None,
+    log_hash: str | None = None,
+    log_hashes: list[str] | None = None,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    columns: list[str] | None = None,
+) -> tuple[Any, str, dict[str, Any]]:
+    """Return (ORM select for the hot table, SQL for archive files, params).
+
+    With `columns`, both select those columns as plain tuples instead of rows.
+    """
+    q = select(*[getattr(LogDetail, c) for c in columns]) if columns else select(LogDetail)
+    where: list[str] = []
+    params: dict[str, Any] = {}
+    for col, val in (("task_id", task_id), ("edge_addr", edge_addr), ("stage", stage), ("log_hash", log_hash)):
+        if val is not None:
+            q = q.where(getattr(LogDetail, col) == val)
+            where.append(f"{col} = :{col}")
+            params[col] = val
+    if log_hashes is not None:
+        q = q.where(LogDetail.log_hash.in_(log_hashes))
+        names = [f"h{i}" for i in range(len(log_hashes))]
+        where.append(f"log_hash IN ({', '.join(':' + n for n in names)})" if names else "0")
+        params.update(zip(names, log_hashes))
+    if from_ts is not None:
+        q = q.where(LogDetail.ts >= from_ts)
+        where.append("ts >= :from_ts")
+        params["from_ts"] = from_ts
+    if to_ts is not None:
+        q = q.where(LogDetail.ts <= to_ts)
+        where.append("ts <= :to_ts")
+        params["to_ts"] = to_ts
+    sql = f"SELECT {', '.join(columns or _COLUMNS)} FROM log_details"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return q.order_by(LogDetail.ts), sql, params
+
+
+def iter_archive_rows(path: str, sql: str, params: dict[str, Any] | None = None, *, chunk_size: int = 5000):
+    """Stream raw tuples from a sealed archive file (read-only, immutable)."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    try:
+        cur = conn.execute(sql, params or {})
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield from chunk
+    finally:
+        conn.close()
+
+
+def _read_archive(path: str, sql: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size={ARCHIVE_MMAP_SIZE}")
+        rows = conn.execute(sql, params).fetchall()
+        out = []
+        for r in rows:
+            d = dict(r)
+            if isinstance(d.get("created_at"), str):
+                d["created_at"] = datetime.fromisoformat(d["created_at"])
+            out.append(d)
+        return out
+    finally:
+        conn.close()
+
+
+def _main(argv: list[str]) -> int:
+    from .config import get_settings
+    from .db import init_db
+
+    s = get_settings()
+    store = LogStore(init_db(s.db_url))
+    cmd = argv[0] if argv else "list"
+    if cmd == "archive":
+        written = store.archive_expired(retention_days=s.log_retention_days, granularity=s.log_partition)
+        print(f"sealed {len(written)} partition(s): {', '.join(written) or '-'}")
+        return 0
+    if cmd == "list":
+        with session_scope(store.SessionLocal) as db:
+            for p in store.partitions(db):
+                print(f"{p.name}\trows={p.rows}\tts=[{p.min_ts},{p.max_ts}]\ttask=[{p.min_task_id},{p.max_task_id}]")
+        return 0
+    print(f"unknown command: {cmd}", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
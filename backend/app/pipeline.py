@@ -0,0 +1,405 @@
+"""Task pipeline latency: CREATE -> RECV -> EXEC -> RESULT.
+
+`task_pipeline` keeps one row per task with the time it reached each stage:
+CREATE when this backend created it (or the chain's createdAt on rebuild),
+the other stages from the `ts` of the task's log details. Log stages outside
+the pipeline are ignored; the mock dataset's UPLOAD / VERIFY count as
+RECV / RESULT.
+
+Whenever a stage time is stored, every transition it completes adds its
+duration (seconds) to a log-binned sketch in `pipeline_latency_bins`, for
+the fleet, the task's edge and the task's region, in the same transaction
+as the log detail. Transitions are the consecutive stages plus CREATE>RESULT
+end to end. Bins are additive counters as in app.rollups, so p50/p95/p99
+reads never scan tasks. A duration whose end is stamped before its start
+(edge clocks, replayed demo data) goes to bin -1 and is reported as
+`outOfOrder` instead of skewing the percentiles.
+
+A task is stuck when its furthest stage is not RESULT and it has been there
+longer than that stage's SLA (PIPELINE_SLA_SEC, "CREATE=300,RECV=300,EXEC=900"
+by default). A repeated stage keeps its first stored time; `rebuild_pipeline`
+recomputes everything from stored details, taking the earliest.
+
+A task whose edge region is not known when a stage arrives is counted for
+the fleet and its edge only; when a later stage brings the region, or
+`fill_task_regions` finds it in the edge list, the durations stored so far
+are added to the region too.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import LogDetail, PipelineLatencyBin, TaskPipeline, session_scope
+from .partitions import LogStore, iter_archive_rows
+from .rollups import LatencySketch, sketch_bin, upsert_add
+
+STAGES = ("CREATE", "RECV", "EXEC", "RESULT")
+STAGE_ALIASES = {"UPLOAD": "RECV", "VERIFY": "RESULT"}
+TRANSITIONS = (("CREATE", "RECV"), ("RECV", "EXEC"), ("EXEC", "RESULT"), ("CREATE", "RESULT"))
+OUT_OF_ORDER_BIN = -1
+
+_COLUMNS = {"CREATE": "create_ts", "RECV": "recv_ts", "EXEC": "exec_ts", "RESULT": "result_ts"}
+
+# (task_id, stage, ts, edge_addr or None, region or None)
+StageEvent = tuple[str, str, int, Any, Any]
+
+
+def parse_sla(spec: str) -> dict[str, int]:
+    """{stage: seconds} from "CREATE=300,RECV=300"; stages left out are never flagged."""
+    out: dict[str, int] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        stage, _, sec = part.partition("=")
+        stage = stage.strip().upper()
+        if stage not in STAGES or stage == "RESULT":
+            raise ValueError(f"PIPELINE_SLA_SEC: no SLA for stage {stage!r}")
+        out[stage] = int(sec)
+    return out
+
+
+SLA_SEC = parse_sla(os.getenv("PIPELINE_SLA_SEC", "CREATE=300,RECV=300,EXEC=900"))
+
+
+def transition_name(a: str, b: str) -> str:
+    return f"{a}>{b}"
+
+
+def pipeline_stage(stage: str | None) -> str | None:
+    s = (stage or "").upper()
+    s = STAGE_ALIASES.get(s, s)
+    return s if s in STAGES else None
+
+
+@dataclass
+class TaskTimes:
+    task_id: str
+    edge_addr: str | None = None
+    region: str | None = None
+    times: dict[str, int] = field(default_factory=dict)
+
+    def add(self, stage: str, ts: int, *, earliest: bool = False) -> bool:
+        """Record ts for stage; False if it was already set (and kept)."""
+        old = self.times.get(stage)
+        if old is not None and not (earliest and ts < old):
+            return False
+        self.times[stage] = ts
+        return True
+
+    def durations(self) -> dict[str, int]:
+        return {transition_name(a, b): self.times[b] - self.times[a] for a, b in TRANSITIONS if a in self.times and b in self.times}
+
+    def current(self) -> tuple[str, int] | None:
+        """(furthest stage reached, its time)."""
+        for stage in reversed(STAGES):
+            if stage in self.times:
+                return stage, self.times[stage]
+        return None
+
+    def scopes(self) -> list[tuple[str, str]]:
+        out = [("all", "")]
+        if self.edge_addr:
+            out.append(("edge", self.edge_addr))
+        if self.region:
+            out.append(("region", self.region))
+        return out
+
+    @classmethod
+    def from_row(cls, row: TaskPipeline) -> TaskTimes:
+        t = cls(row.task_id, row.edge_addr, row.region)
+        for stage, col in _COLUMNS.items():
+            v = getattr(row, col)
+            if v is not None:
+                t.times[stage] = v
+        return t
+
+    def to_values(self) -> dict[str, Any]:
+        stage, ts = self.current()
+        return {
+            "task_id": self.task_id,
+            "edge_addr": self.edge_addr,
+            "region": self.region,
+            **{col: self.times.get(s) for s, col in _COLUMNS.items()},
+            "stage": stage,
+            "stage_ts": ts,
+        }
+
+
+def fold_events(events: Iterable[StageEvent]) -> dict[str, TaskTimes]:
+    """Task times from events, earliest time per stage; the first known edge / region win."""
+    tasks: dict[str, TaskTimes] = {}
+    for task_id, stage, ts, edge, region in events:
+        stage = pipeline_stage(stage)
+        if stage is None:
+            continue
+        t = tasks.get(task_id)
+        if t is None:
+            t = tasks[task_id] = TaskTimes(task_id)
+        t.edge_addr = t.edge_addr or edge
+        t.region = t.region or region
+        t.add(stage, int(ts), earliest=True)
+    return tasks
+
+
+def _add_durations(bins: dict[tuple, list[int]], t: TaskTimes, durations: dict[str, int], scopes: list[tuple[str, str]] | None = None) -> None:
+    for name, sec in durations.items():
+        b = OUT_OF_ORDER_BIN if sec < 0 else sketch_bin(sec)
+        for scope, key in t.scopes() if scopes is None else scopes:
+            acc = bins.get((scope, key, name, b))
+            if acc is None:
+                acc = bins[(scope, key, name, b)] = [0, 0]
+            acc[0] += 1
+            acc[1] += max(sec, 0)
+
+
+def _write_bins(db: Session, bins: dict[tuple, list[int]]) -> None:
+    if bins:
+        upsert_add(
+            db,
+            PipelineLatencyBin,
+            [{"scope": s, "key": k, "transition": n, "bin": b, "count": c, "sum_sec": t} for (s, k, n, b), (c, t) in bins.items()],
+            ("count", "sum_sec"),
+        )
+
+
+# ------------------------- ingest -------------------------
+
+def _insert_missing(db: Session, events: list[StageEvent]) -> None:
+    # INSERT ... DO NOTHING, so concurrent writers both end up updating the one row.
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    values = {}
+    for task_id, stage, ts, edge, region in events:
+        values.setdefault(task_id, {"task_id": task_id, "edge_addr": edge, "region": region, "stage": stage, "stage_ts": ts})
+    db.execute(dialect_insert(TaskPipeline).on_conflict_do_nothing(), list(values.values()))
+
+
+def record_stages(db: Session, events: Iterable[StageEvent]) -> int:
+    """Store stage times and add the durations they complete, inside the caller's transaction.
+
+    Returns the number of stage times stored (repeats and non-pipeline stages are skipped).
+    """
+    evs = [(task_id, s, int(ts), edge, region) for task_id, stage, ts, edge, region in events if (s := pipeline_stage(stage))]
+    if not evs:
+        return 0
+    _insert_missing(db, evs)
+    rows: dict[str, TaskPipeline] = {}
+    ids = list({e[0] for e in evs})
+    for i in range(0, len(ids), 500):
+        for row in db.execute(select(TaskPipeline).where(TaskPipeline.task_id.in_(ids[i : i + 500]))).scalars():
+            rows[row.task_id] = row
+    bins: dict[tuple, list[int]] = {}
+    stored = 0
+    for task_id, stage, ts, edge, region in evs:
+        row = rows[task_id]
+        t = TaskTimes.from_row(row)
+        known = t.scopes()
+        t.edge_addr = t.edge_addr or edge
+        t.region = t.region or region
+        before = t.durations()
+        # an edge / region learned only now also gets the durations stored before
+        _add_durations(bins, t, before, [sc for sc in t.scopes() if sc not in known])
+        if t.add(stage, ts):
+            stored += 1
+            _add_durations(bins, t, {n: d for n, d in t.durations().items() if n not in before})
+        for k, v in t.to_values().items():
+            setattr(row, k, v)
+    _write_bins(db, bins)
+    return stored
+
+
+def fill_task_regions(db: Session, regions: dict[str, str]) -> int:
+    """Set the region of tasks stored without one from {edge address: region}, adding their durations to it.
+
+    Runs inside the caller's transaction. Returns the number of tasks updated.
+    """
+    edges = [e for e, r in regions.items() if e and r]
+    bins: dict[tuple, list[int]] = {}
+    n = 0
+    for i in range(0, len(edges), 500):
+        q = select(TaskPipeline).where(TaskPipeline.region.is_(None), TaskPipeline.edge_addr.in_(edges[i : i + 500]))
+        for row in db.execute(q).scalars():
+            t = TaskTimes.from_row(row)
+            t.region = row.region = regions[row.edge_addr]
+            _add_durations(bins, t, t.durations(), [("region", t.region)])
+            n += 1
+    _write_bins(db, bins)
+    return n
+
+
+def log_stage_event(row: LogDetail, region: str | None) -> StageEvent:
+    return (row.task_id, row.stage, row.ts, row.edge_addr, region)
+
+
+def _iter_stage_times(db: Session, log_store: LogStore) -> Iterator[tuple]:
+    """(task_id, stage, min ts, edge_addr) per task and stage, hot table then archives."""
+    q = select(LogDetail.task_id, LogDetail.stage, func.min(LogDetail.ts), func.min(LogDetail.edge_addr)).group_by(
+        LogDetail.task_id, LogDetail.stage
+    )
+    for r in db.execute(q):
+        yield tuple(r)
+    sql = "SELECT task_id, stage, MIN(ts), MIN(edge_addr) FROM log_details GROUP BY task_id, stage"
+    for p in log_store.prune(db):
+        yield from iter_archive_rows(p.path, sql)
+
+
+def rebuild_pipeline(
+    SessionLocal: sessionmaker[Session],
+    log_store: LogStore,
+    created: Iterable[StageEvent],
+    regions: dict[str, str],
+    *,
+    job: Any = None,
+) -> int:
+    """Recompute task_pipeline and the duration sketches in one transaction.
+
+    `created` holds the CREATE events known from the chain (task createdAt
+    plus its chosen edge and region); `regions` maps edge address -> region
+    for tasks the chain did not list. Returns the number of tasks.
+    """
+    with session_scope(SessionLocal) as db:
+        events = list(created)
+        events += [(task_id, stage, ts, edge, regions.get(edge) or None) for task_id, stage, ts, edge in _iter_stage_times(db, log_store)]
+        tasks = fold_events(events)
+        if job is not None:
+            job.set("tasks", len(tasks))
+            job.check_cancelled()
+        db.execute(delete(PipelineLatencyBin))
+        db.execute(delete(TaskPipeline))
+        bins: dict[tuple, list[int]] = {}
+        values = []
+        for t in tasks.values():
+            _add_durations(bins, t, t.durations())
+            values.append(t.to_values())
+        for i in range(0, len(values), 1000):
+            db.execute(insert(TaskPipeline), values[i : i + 1000])
+        _write_bins(db, bins)
+    return len(tasks)
+
+
+def pipeline_empty(db: Session) -> bool:
+    return db.execute(select(TaskPipeline.task_id).limit(1)).first() is None
+
+
+# ------------------------- reads -------------------------
+
+def task_view(t: TaskTimes, now: int, sla: dict[str, int] | None = None) -> dict[str, Any]:
+    sla = SLA_SEC if sla is None else sla
+    stage, ts = t.current()
+    limit = sla.get(stage)
+    age = now - ts
+    return {
+        "taskId": t.task_id,
+        "edgeAddr": t.edge_addr,
+        "region": t.region,
+        "stage": stage,
+        "stageTs": ts,
+        "inStageSec": age if stage != "RESULT" else None,
+        "slaSec": limit,
+        "stuck": limit is not None and age > limit,
+        "timestamps": {s: t.times.get(s) for s in STAGES},
+        "durationsSec": t.durations(),
+    }
+
+
+def get_task(db: Session, task_id: str) -> TaskTimes | None:
+    row = db.get(TaskPipeline, task_id)
+    return TaskTimes.from_row(row) if row is not None else None
+
+
+def stuck_tasks(
+    db: Session,
+    now: int,
+    *,
+    sla: dict[str, int] | None = None,
+    stage: str | None = None,
+    edge: str | None = None,
+    region: str | None = None,
+    limit: int = 100,
+) -> dict[str, Any]:
+    """Tasks past their stage's SLA, longest waiting first, plus the count per stage."""
+    sla = SLA_SEC if sla is None else sla
+    stages = [s for s in sla if stage is None or s == stage]
+    if not stages:
+        return {"items": [], "counts": {}, "truncated": False}
+    cond = [or_(*[(TaskPipeline.stage == s) & (TaskPipeline.stage_ts < now - sla[s]) for s in stages])]
+    if edge is not None:
+        cond.append(TaskPipeline.edge_addr == edge)
+    if region is not None:
+        cond.append(TaskPipeline.region == region)
+    counts = dict(db.execute(select(TaskPipeline.stage, func.count()).where(*cond).group_by(TaskPipeline.stage)).all())
+    rows = db.execute(select(TaskPipeline).where(*cond).order_by(TaskPipeline.stage_ts).limit(limit + 1)).scalars().all()
+    return {
+        "items": [task_view(TaskTimes.from_row(r), now, sla) for r in rows[:limit]],
+        "counts": counts,
+        "truncated": len(rows) > limit,
+    }
+
+
+def stuck_from_tasks(
+    tasks: Iterable[TaskTimes],
+    now: int,
+    *,
+    sla: dict[str, int] | None = None,
+    stage: str | None = None,
+    edge: str | None = None,
+    region: str | None = None,
+    limit: int = 100,
+) -> dict[str, Any]:
+    """`stuck_tasks` over tasks folded in memory (MOCK_DATA mode)."""
+    views = [task_view(t, now, sla) for t in tasks]
+    hits = sorted(
+        (
+            v
+            for v in views
+            if v["stuck"] and (stage is None or v["stage"] == stage) and (edge is None or v["edgeAddr"] == edge) and (region is None or v["region"] == region)
+        ),
+        key=lambda v: v["stageTs"],
+    )
+    counts: dict[str, int] = {}
+    for v in hits:
+        counts[v["stage"]] = counts.get(v["stage"], 0) + 1
+    return {"items": hits[:limit], "counts": counts, "truncated": len(hits) > limit}
+
+
+def _latency(rows: Iterable[tuple]) -> dict[str, Any]:
+    """Per transition summary from (transition, bin, count, sum_sec) rows."""
+    acc: dict[str, tuple[LatencySketch, list[int]]] = {}
+    for name, b, count, total in rows:
+        sk, sums = acc.setdefault(name, (LatencySketch(), [0, 0]))
+        if b == OUT_OF_ORDER_BIN:
+            sums[1] += count
+            continue
+        sk.bins[b] = sk.bins.get(b, 0) + count
+        sums[0] += total
+    out = {}
+    for a, b in TRANSITIONS:
+        name = transition_name(a, b)
+        sk, (total, out_of_order) = acc.get(name, (LatencySketch(), [0, 0]))
+        n = sk.count
+        out[name] = {"count": n, "outOfOrder": out_of_order, "avgSec": round(total / n, 1) if n else None, **sk.quantiles()}
+    return out
+
+
+def query_latency(db: Session, scope: str, key: str = "") -> dict[str, Any]:
+    q = select(PipelineLatencyBin.transition, PipelineLatencyBin.bin, PipelineLatencyBin.count, PipelineLatencyBin.sum_sec).where(
+        PipelineLatencyBin.scope == scope, PipelineLatencyBin.key == key
+    )
+    return _latency(tuple(r) for r in db.execute(q))
+
+
+def latency_from_tasks(tasks: Iterable[TaskTimes], scope: str, key: str = "") -> dict[str, Any]:
+    """`query_latency` over tasks folded in memory (MOCK_DATA mode)."""
+    bins: dict[tuple, list[int]] = {}
+    for t in tasks:
+        _add_durations(bins, t, t.durations())
+    return _latency((k[2], k[3], c, s) for k, (c, s) in bins.items() if k[:2] == (scope, key))
+
@@ -0,0 +1,164 @@
+"""Off-chain check of reputation propagation snapshot hashes.
+
+`PropagateReputation` stores `RepSnapshotHash = sha256(payload)` where the
+payload is the keeper's `reputationSnapshotHash` format over the edge record
+at the propagation's block. `snapshot_payload` reproduces that format byte for
+byte; `SnapshotVerifier` re-reads each edge at `Height` and compares.
+
+Edge state at a height never changes, so recomputed hashes are cached by
+(edge, height) and each distinct pair is queried once per batch. Querying at
+`Height` returns end-of-block state, so an edge updated again later in the same
+block reports as mismatched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable
+
+from .chain_cli import ChainCLI
+
+# Go field -> accepted JSON spellings (proto names, camelCase, mock-data aliases).
+# The keeper stores b/d/u/score in bd_score/du_score/bu_score/dud_score.
+_EDGE_FIELDS: dict[str, tuple[str, ...]] = {
+    "b": ("bdScore", "bd_score", "b"),
+    "d": ("duScore", "du_score", "d"),
+    "u": ("buScore", "bu_score", "u"),
+    "score": ("dudScore", "dud_score", "score"),
+    "pT": ("hmmProbT", "hmm_prob_t"),
+    "pS": ("hmmProbS", "hmm_prob_s"),
+    "pM": ("hmmProbM", "hmm_prob_m"),
+    "ePos": ("evidencePos", "evidence_pos"),
+    "eNeg": ("evidenceNeg", "evidence_neg"),
+    "t": ("updatedAt", "updated_at"),
+}
+
+
+def _int_field(edge: dict[str, Any], names: tuple[str, ...]) -> int:
+    # Omitted proto fields are zero values; uint64/int64 are JSON strings.
+    for n in names:
+        v = edge.get(n)
+        if v is not None and v != "":
+            return int(v)
+    return 0
+
+
+def edge_fields(edge: dict[str, Any]) -> dict[str, int]:
+    """Keeper-side integer fields of an edge record (b, d, u, score, pT, pS, pM, ePos, eNeg, t)."""
+    return {k: _int_field(edge, names) for k, names in _EDGE_FIELDS.items()}
+
+
+def snapshot_payload(edge: dict[str, Any]) -> str:
+    """Port of keeper.reputationSnapshotHash's Sprintf payload."""
+    addr = edge.get("edgeAddr") or edge.get("edge_addr") or ""
+    parts = [f"edge={addr}"] + [f"{k}={_int_field(edge, names)}" for k, names in _EDGE_FIELDS.items()]
+    return "|".join(parts)
+
+
+def reputation_snapshot_hash(edge: dict[str, Any]) -> str:
+    return hashlib.sha256(snapshot_payload(edge).encode("utf-8")).hexdigest()
+
+
+def _prop_height(p: dict[str, Any]) -> int | None:
+    try:
+        h = int(p.get("height") or 0)
+    except Exception:
+        return None
+    return h or None
+
+
+class SnapshotVerifier:
+    """Recompute propagation snapshot hashes against historical edge state."""
+
+    def __init__(self, *, cache_size: int | None = None, workers: int | None = None) -> None:
+        self.cache_size = cache_size or int(os.getenv("REPUTATION_SNAPSHOT_CACHE", "4096"))
+        self.workers = workers or int(os.getenv("REPUTATION_VERIFY_WORKERS", "8"))
+        self._cache: OrderedDict[tuple[str, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: tuple[str, int]) -> str | None:
+        with self._lock:
+            h = self._cache.get(key)
+            if h is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            return h
+
+    def _store(self, key: tuple[str, int], h: str) -> None:
+        with self._lock:
+            self._cache[key] = h
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _fetch(self, chain: ChainCLI, key: tuple[str, int]) -> tuple[tuple[str, int], str | None, str | None]:
+        addr, height = key
+        try:
+            raw = chain.query(chain.module, "show-edge", [addr], height=height)
+        except Exception as e:
+            return key, None, str(e).splitlines()[0] if str(e) else "query failed"
+        edge = raw.get("edge") or raw
+        return key, reputation_snapshot_hash(edge), None
+
+    def recompute(self, chain: ChainCLI, keys: Iterable[tuple[str, int]]) -> tuple[dict[tuple[str, int], str], dict[tuple[str, int], str]]:
+        """Hashes for each (edge, height); second dict holds per-key query errors."""
+        out: dict[tuple[str, int], str] = {}
+        todo: list[tuple[str, int]] = []
+        for key in dict.fromkeys(keys):
+            h = self._cached(key)
+            if h is not None:
+                out[key] = h
+            else:
+                todo.append(key)
+        errors: dict[tuple[str, int], str] = {}
+        if not todo:
+            return out, errors
+        with self._lock:
+            self.misses += len(todo)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(todo)))) as ex:
+            for key, h, err in ex.map(lambda k: self._fetch(chain, k), todo):
+                if h is None:
+                    errors[key] = err or "query failed"
+                    continue
+                self._store(key, h)
+                out[key] = h
+        return out, errors
+
+    def verify(self, chain: ChainCLI, propagations: list[dict[str, Any]]) -> dict[str, Any]:
+        keyed: list[tuple[dict[str, Any], tuple[str, int] | None]] = []
+        for p in propagations:
+            addr = p.get("edgeAddr") or p.get("edge_addr")
+            height = _prop_height(p)
+            keyed.append((p, (addr, height) if addr and height else None))
+        hashes, errors = self.recompute(chain, [k for _, k in keyed if k is not None])
+
+        summary = {"matched": 0, "mismatched": 0, "unavailable": 0}
+        items: list[dict[str, Any]] = []
+        for p, key in keyed:
+            stored = p.get("repSnapshotHash") or p.get("rep_snapshot_hash") or ""
+            rec: dict[str, Any] = {
+                "propagationId": p.get("propagationId") or p.get("propagation_id"),
+                "edgeAddr": key[0] if key else (p.get("edgeAddr") or p.get("edge_addr")),
+                "height": key[1] if key else None,
+                "repSnapshotHash": stored,
+            }
+            recomputed = hashes.get(key) if key else None
+            if recomputed is None:
+                rec["status"] = "unavailable"
+                rec["error"] = errors.get(key, "missing edgeAddr or height") if key else "missing edgeAddr or height"
+            else:
+                rec["recomputed"] = recomputed
+                rec["status"] = "matched" if recomputed == stored.lower() else "mismatched"
+            summary[rec["status"]] += 1
+            items.append(rec)
+        return {
+            "items": items,
+            "summary": {**summary, "total": len(items)},
+            "cache": {"size": len(self._cache), "hits": self.hits, "misses": self.misses},
+        }
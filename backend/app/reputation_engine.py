@@ -0,0 +1,374 @@
+"""Off-chain port of the keeper's reputation math (keeper/reputation.go).
+
+Same fixed-point integer semantics as UpdateReputation:
+  - subjective logic from (r, s) evidence with a Dirichlet prior of 2,
+    scaled by FP_SCALE; score = b + u/2
+  - a 3-state HMM belief (trusted / suspicious / malicious) scaled by
+    HMM_SCALE, predicted through HMM_A and corrected with HMM_B
+  - a governance proposal once score < PROPOSAL_THRESHOLD (0.30)
+
+Every intermediate value is non-negative, so floor division (`//`) matches
+Go's truncating `/` exactly.
+
+`replay` advances many edges in lockstep, one vectorized step per
+observation index. `simulate` uses the same step for a Monte Carlo forecast
+of each edge's score and of when it crosses the threshold. NumPy is
+optional: without it both run the scalar functions edge by edge.
+
+    python -m app.reputation_engine check [fixture.json]
+
+compares the port against the Go-generated fixture (scripts/reputation_fixtures).
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+from .reputation import edge_fields
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+FP_SCALE = 1_000_000
+HMM_SCALE = 1_000_000  # rows of HMM_A / HMM_B sum to this
+PRIOR = 2
+PROPOSAL_THRESHOLD = FP_SCALE * 3 // 10
+OBS_GOOD, OBS_ANOMALY, OBS_TIMEOUT = 0, 1, 2
+
+HMM_A = ((900000, 80000, 20000), (100000, 800000, 100000), (20000, 80000, 900000))
+HMM_B = ((850000, 120000, 30000), (200000, 600000, 200000), (30000, 120000, 850000))
+_HMM_UNIFORM = (HMM_SCALE // 3, HMM_SCALE // 3, HMM_SCALE - 2 * (HMM_SCALE // 3))
+
+
+def default_fixture_path() -> Path:
+    return Path(__file__).resolve().parent / "fixtures" / "reputation_go.json"
+
+
+# ------------------------- scalar (reference) -------------------------
+
+def subjective_from_evidence(r: int, s: int) -> tuple[int, int, int]:
+    r, s = max(r, 0), max(s, 0)
+    total = r + s + PRIOR
+    return r * FP_SCALE // total, s * FP_SCALE // total, PRIOR * FP_SCALE // total
+
+
+def score_from_opinion(b: int, u: int) -> int:
+    return max(b + u // 2, 0)
+
+
+def hmm_update(pT: int, pS: int, pM: int, obs: int) -> tuple[int, int, int]:
+    p2 = [(pT * HMM_A[0][j] + pS * HMM_A[1][j] + pM * HMM_A[2][j]) // HMM_SCALE for j in range(3)]
+    n = [p2[i] * HMM_B[i][obs] // HMM_SCALE for i in range(3)]
+    total = sum(n)
+    if total <= 0:
+        return _HMM_UNIFORM
+    nT = n[0] * HMM_SCALE // total
+    nS = n[1] * HMM_SCALE // total
+    return nT, nS, HMM_SCALE - nT - nS
+
+
+@dataclass
+class EdgeState:
+    pos: int = 0
+    neg: int = 0
+    pT: int = _HMM_UNIFORM[0]
+    pS: int = _HMM_UNIFORM[1]
+    pM: int = _HMM_UNIFORM[2]
+
+    @property
+    def score(self) -> int:
+        b, _, u = subjective_from_evidence(self.pos, self.neg)
+        return score_from_opinion(b, u)
+
+    def observe(self, obs: int) -> None:
+        """One UpdateReputation call."""
+        if obs == OBS_GOOD:
+            self.pos += 1
+        else:
+            self.neg += 1
+        self.pT, self.pS, self.pM = hmm_update(self.pT, self.pS, self.pM, obs)
+
+    @classmethod
+    def from_edge(cls, edge: dict[str, Any]) -> EdgeState:
+        """State of a chain (or mock) edge record.
+
+        Records without evidence counters (mock data) get the smallest
+        evidence that reproduces their opinion: u = 2/total, b = r/total.
+        """
+        f = edge_fields(edge)
+        pos, neg = f["ePos"], f["eNeg"]
+        if pos == 0 and neg == 0 and 0 < f["u"] < FP_SCALE:
+            total = max(round(PRIOR * FP_SCALE / f["u"]), PRIOR)
+            pos = min(round(f["b"] * total / FP_SCALE), total - PRIOR)
+            neg = total - PRIOR - pos
+        p = (f["pT"], f["pS"], f["pM"])
+        return cls(pos, neg, *(p if sum(p) > 0 else _HMM_UNIFORM))
+
+
+def observation_mix(edge: dict[str, Any], state: EdgeState) -> tuple[float, float, float]:
+    """(good, anomaly, timeout) probabilities for an edge's next observations.
+
+    P(bad) is the Beta posterior mean of the evidence. Bad observations split
+    between anomaly and timeout by the edge's counters (even split without any).
+    """
+    p_bad = (state.neg + 1) / (state.pos + state.neg + 2)
+    anomalies = int(edge.get("anomalies") or edge.get("resourceAnomaly") or 0)
+    severe = sum(int(edge.get(k) or 0) for k in ("timeout", "complaints", "doubleSigns"))
+    share = anomalies / (anomalies + severe) if anomalies + severe else 0.5
+    return 1.0 - p_bad, p_bad * share, p_bad * (1.0 - share)
+
+
+def steps_to_threshold(state: EdgeState, threshold: int = PROPOSAL_THRESHOLD, *, limit: int = 1 << 20) -> int | None:
+    """Fewest consecutive bad observations that take the score below threshold (0 if already below)."""
+    def below(k: int) -> bool:
+        b, _, u = subjective_from_evidence(state.pos, state.neg + k)
+        return score_from_opinion(b, u) < threshold
+
+    if below(0):
+        return 0
+    if not below(limit):
+        return None
+    lo, hi = 0, limit  # score is non-increasing in k
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        lo, hi = (lo, mid) if below(mid) else (mid, hi)
+    return hi
+
+
+# ------------------------- vectorized -------------------------
+
+if np is not None:
+    _B_COLS = tuple(np.array(row, dtype=np.int64) for row in HMM_B)  # state -> emission by obs
+
+
+def _np_step(pos: Any, neg: Any, p: tuple[Any, Any, Any], obs: Any, active: Any | None) -> tuple[Any, Any, tuple[Any, Any, Any], Any]:
+    """One observation for every row (where active); returns (pos, neg, (pT, pS, pM), score)."""
+    bad = obs != OBS_GOOD
+    if active is not None:
+        pos = pos + (active & ~bad)
+        neg = neg + (active & bad)
+    else:
+        pos = pos + ~bad
+        neg = neg + bad
+    total = pos + neg + PRIOR
+    score = pos * FP_SCALE // total + (PRIOR * FP_SCALE // total) // 2
+
+    pT, pS, pM = p
+    o = np.clip(obs, 0, 2)
+    n = [
+        (pT * HMM_A[0][j] + pS * HMM_A[1][j] + pM * HMM_A[2][j]) // HMM_SCALE * _B_COLS[j][o] // HMM_SCALE
+        for j in range(3)
+    ]
+    s = n[0] + n[1] + n[2]
+    empty = s <= 0
+    safe = np.where(empty, 1, s)
+    nT = np.where(empty, _HMM_UNIFORM[0], n[0] * HMM_SCALE // safe)
+    nS = np.where(empty, _HMM_UNIFORM[1], n[1] * HMM_SCALE // safe)
+    nM = HMM_SCALE - nT - nS
+    if active is not None:
+        nT, nS, nM = np.where(active, nT, pT), np.where(active, nS, pS), np.where(active, nM, pM)
+    return pos, neg, (nT, nS, nM), score
+
+
+def _np_state(states: Sequence[EdgeState], repeat: int = 1) -> tuple[Any, Any, tuple[Any, Any, Any]]:
+    def col(attr: str) -> Any:
+        return np.repeat(np.array([getattr(st, attr) for st in states], dtype=np.int64), repeat)
+
+    return col("pos"), col("neg"), (col("pT"), col("pS"), col("pM"))
+
+
+def replay(
+    histories: Sequence[Sequence[int]],
+    *,
+    start: Sequence[EdgeState] | None = None,
+    threshold: int = PROPOSAL_THRESHOLD,
+) -> list[dict[str, Any]]:
+    """Apply each edge's observation history (from `start`, default a freshly registered edge).
+
+    Returns per edge the final state and score, the lowest score seen and the
+    1-based step at which the score first went below threshold (None if never).
+    """
+    start = list(start) if start is not None else [EdgeState() for _ in histories]
+    if np is None:
+        return [_replay_py(st, h, threshold) for st, h in zip(start, histories)]
+
+    n_steps = max((len(h) for h in histories), default=0)
+    obs = np.full((len(histories), n_steps), -1, dtype=np.int64)
+    for i, h in enumerate(histories):
+        obs[i, : len(h)] = h
+    pos, neg, p = _np_state(start)
+    score = np.array([st.score for st in start], dtype=np.int64)
+    lowest = score.copy()
+    crossed = np.zeros(len(start), dtype=np.int64)  # 0 = never
+    for t in range(n_steps):
+        active = obs[:, t] >= 0
+        pos, neg, p, new_score = _np_step(pos, neg, p, obs[:, t], active)
+        score = np.where(active, new_score, score)
+        lowest = np.minimum(lowest, score)
+        crossed = np.where((crossed == 0) & active & (score < threshold), t + 1, crossed)
+    return [
+        {
+            "state": EdgeState(int(pos[i]), int(neg[i]), int(p[0][i]), int(p[1][i]), int(p[2][i])),
+            "score": int(score[i]),
+            "lowest": int(lowest[i]),
+            "crossedAt": int(crossed[i]) or None,
+        }
+        for i in range(len(start))
+    ]
+
+
+def _replay_py(st: EdgeState, history: Sequence[int], threshold: int) -> dict[str, Any]:
+    st = EdgeState(st.pos, st.neg, st.pT, st.pS, st.pM)
+    score = lowest = st.score
+    crossed = None
+    for t, o in enumerate(history):
+        st.observe(o)
+        score = st.score
+        lowest = min(lowest, score)
+        if crossed is None and score < threshold:
+            crossed = t + 1
+    return {"state": st, "score": score, "lowest": lowest, "crossedAt": crossed}
+
+
+def simulate(
+    start: Sequence[EdgeState],
+    mixes: Sequence[tuple[float, float, float]],
+    *,
+    steps: int,
+    runs: int,
+    seed: int = 0,
+    threshold: int = PROPOSAL_THRESHOLD,
+) -> list[dict[str, Any]]:
+    """Monte Carlo forecast: `runs` random futures of `steps` observations per edge.
+
+    Per edge: the score distribution after `steps`, the probability of going
+    below threshold within the horizon, and the median step at which that
+    happens among the runs that do.
+    """
+    if np is None:
+        return _simulate_py(start, mixes, steps=steps, runs=runs, seed=seed, threshold=threshold)
+
+    rng = np.random.default_rng(seed)
+    n = len(start)
+    pos, neg, p = _np_state(start, runs)
+    cum = np.repeat(np.cumsum(np.array(mixes, dtype=np.float64).reshape(-1, 3), axis=1), runs, axis=0)
+    score = np.repeat(np.array([st.score for st in start], dtype=np.int64), runs)
+    crossed = np.where(score < threshold, 0, -1)  # -1 = not (yet) below
+    for t in range(steps):
+        u = rng.random(n * runs)
+        obs = (u >= cum[:, 0]).astype(np.int64) + (u >= cum[:, 1])
+        pos, neg, p, score = _np_step(pos, neg, p, obs, None)
+        crossed = np.where((crossed < 0) & (score < threshold), t + 1, crossed)
+
+    final = score.reshape(n, runs)
+    crossed = crossed.reshape(n, runs)
+    q = np.percentile(final, [10, 50, 90], axis=1)
+    out = []
+    for i in range(n):
+        hit = crossed[i][crossed[i] >= 0]
+        out.append(
+            {
+                "mean": int(final[i].mean()),
+                "p10": int(q[0, i]),
+                "p50": int(q[1, i]),
+                "p90": int(q[2, i]),
+                "crossProb": round(float(hit.size) / runs, 4),
+                "crossStepMedian": int(np.median(hit)) if hit.size else None,
+            }
+        )
+    return out
+
+
+def _simulate_py(
+    start: Sequence[EdgeState],
+    mixes: Sequence[tuple[float, float, float]],
+    *,
+    steps: int,
+    runs: int,
+    seed: int,
+    threshold: int,
+) -> list[dict[str, Any]]:
+    rnd = random.Random(seed)
+    out = []
+    for st0, (g, a, _) in zip(start, mixes):
+        finals, hits = [], []
+        for _ in range(runs):
+            st = EdgeState(st0.pos, st0.neg, st0.pT, st0.pS, st0.pM)
+            hit = 0 if st.score < threshold else None
+            for t in range(steps):
+                u = rnd.random()
+                st.observe(OBS_GOOD if u < g else OBS_ANOMALY if u < g + a else OBS_TIMEOUT)
+                if hit is None and st.score < threshold:
+                    hit = t + 1
+            finals.append(st.score)
+            if hit is not None:
+                hits.append(hit)
+        finals.sort()
+        hits.sort()
+
+        def pct(q: float) -> int:
+            return finals[min(int(q * len(finals)), len(finals) - 1)]
+
+        out.append(
+            {
+                "mean": sum(finals) // len(finals),
+                "p10": pct(0.1),
+                "p50": pct(0.5),
+                "p90": pct(0.9),
+                "crossProb": round(len(hits) / runs, 4),
+                "crossStepMedian": hits[len(hits) // 2] if hits else None,
+            }
+        )
+    return out
+
+
+# ------------------------- fixture check -------------------------
+
+def check_fixture(path: Path) -> list[str]:
+    """Compare against the Go fixture; returns human-readable mismatches."""
+    fx = json.loads(path.read_text(encoding="utf-8"))
+    errors: list[str] = []
+    if (fx["FPScale"], fx["HMMScale"], fx["Threshold"]) != (FP_SCALE, HMM_SCALE, PROPOSAL_THRESHOLD):
+        errors.append(f"constants: go={fx['FPScale'], fx['HMMScale'], fx['Threshold']}")
+    for c in fx["Opinion"]:
+        b, d, u = subjective_from_evidence(c["R"], c["S"])
+        if (b, d, u, score_from_opinion(b, u)) != (c["B"], c["D"], c["U"], c["Score"]):
+            errors.append(f"opinion r={c['R']} s={c['S']}: got {(b, d, u)}")
+    for c in fx["HMM"]:
+        got = hmm_update(*c["P"], c["Obs"])
+        if list(got) != c["N"]:
+            errors.append(f"hmm p={c['P']} obs={c['Obs']}: got {got}, go {c['N']}")
+    cases = fx["Replay"]
+    results = replay([c["Obs"] for c in cases])
+    for i, (c, r) in enumerate(zip(cases, results)):
+        st = r["state"]
+        want = (c["Pos"], c["Neg"], c["Score"][-1], *c["P"][-1])
+        if (st.pos, st.neg, r["score"], st.pT, st.pS, st.pM) != tuple(want):
+            errors.append(f"replay #{i}: got {(st.pos, st.neg, r['score'], st.pT, st.pS, st.pM)}, go {want}")
+        first = next((t + 1 for t, sc in enumerate(c["Score"]) if sc < fx["Threshold"]), None)
+        if r["crossedAt"] != first:
+            errors.append(f"replay #{i}: crossed at {r['crossedAt']}, go {first}")
+    return errors
+
+
+def main(argv: list[str]) -> int:
+    if not argv or argv[0] != "check":
+        print("usage: python -m app.reputation_engine check [fixture.json]")
+        return 2
+    path = Path(argv[1]) if len(argv) > 1 else default_fixture_path()
+    errors = check_fixture(path)
+    for e in errors[:50]:
+        print(f"  MISMATCH {e}")
+    print(f"{'FAIL' if errors else 'OK'}: {path} ({'numpy' if np is not None else 'pure python'}; {len(errors)} mismatches)")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
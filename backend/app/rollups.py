@@ -0,0 +1,335 @@
+"""Time-bucketed log metric rollups per edge and per region.
+
+Every stored log detail adds into one row per (scope, key, bucket) of
+`metric_rollups` (count and sums of cpu_ms / mem_mb_peak / net_kb /
+latency_ms) for the 1m, 1h and 1d buckets it falls in, in the same
+transaction as the detail itself. Rollups are never recomputed from
+log_details, so they survive archiving.
+
+Latency percentiles come from a log-binned sketch (DDSketch-style): a
+latency v > 0 lands in bin 1 + ceil(log_gamma(v)), gamma = (1+a)/(1-a),
+and every quantile read back is within a relative error a
+(ROLLUP_SKETCH_ALPHA, default 1%) of an observed value. Bins are plain
+counters in `metric_latency_bins`, so both ingest and merge are additions:
+ingest is an `INSERT ... ON CONFLICT DO UPDATE count = count + n`, and a
+range or region is the sum of its buckets' bins.
+
+A detail whose edge has no known region yet is written to the edge rollups
+at once and queued in `pending_region_rollups`. `backfill_region_rollups`
+adds it to the region rollups once the edge list has its region, so no
+row's region scope is skipped for good.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from typing import Any, Iterable, Iterator, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import LogDetail, MetricLatencyBin, MetricRollup, PendingRegionRollup, session_scope
+from .partitions import LogStore, iter_archive_rows
+
+BUCKETS = {"1m": 60, "1h": 3600, "1d": 86400}
+SKETCH_ALPHA = float(os.getenv("ROLLUP_SKETCH_ALPHA", "0.01"))
+QUANTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+_GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+_LOG_GAMMA = math.log(_GAMMA)
+_SUMS = ("cpu_ms", "mem_mb_peak", "net_kb", "latency_ms")
+
+# (edge_addr, region or None, ts, cpu_ms, mem_mb_peak, net_kb, latency_ms)
+RollupRow = tuple[str, Any, int, int, int, int, int]
+
+
+def sketch_bin(v: int) -> int:
+    return 0 if v <= 0 else 1 + math.ceil(math.log(v) / _LOG_GAMMA - 1e-9)
+
+
+def bin_value(b: int) -> float:
+    # Midpoint of (gamma^(b-2), gamma^(b-1)] in relative terms.
+    return 0.0 if b <= 0 else 2 * _GAMMA ** (b - 1) / (_GAMMA + 1)
+
+
+class LatencySketch:
+    def __init__(self, bins: dict[int, int] | None = None) -> None:
+        self.bins: dict[int, int] = dict(bins or {})
+
+    @property
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def add(self, v: int, n: int = 1) -> None:
+        b = sketch_bin(v)
+        self.bins[b] = self.bins.get(b, 0) + n
+
+    def merge(self, other: LatencySketch) -> None:
+        for b, n in other.bins.items():
+            self.bins[b] = self.bins.get(b, 0) + n
+
+    def quantile(self, q: float) -> int | None:
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for b in sorted(self.bins):
+            seen += self.bins[b]
+            if seen > rank:
+                return round(bin_value(b))
+        return round(bin_value(max(self.bins)))
+
+    def quantiles(self) -> dict[str, int | None]:
+        return {name: self.quantile(q) for name, q in QUANTILES}
+
+
+# ------------------------- ingest -------------------------
+
+def rollup_row(row: LogDetail, region: str | None) -> RollupRow:
+    return (row.edge_addr, region, row.ts, row.cpu_ms, row.mem_mb_peak, row.net_kb, row.latency_ms)
+
+
+def aggregate(rows: Iterable[RollupRow]) -> tuple[dict[tuple, list[int]], dict[tuple, int]]:
+    """Fold rows into ({(scope, key, bucket, bucket_ts): [count, *sums]}, {(..., bin): count})."""
+    totals: dict[tuple, list[int]] = {}
+    bins: dict[tuple, int] = {}
+    for edge, region, ts, cpu, mem, net, lat in rows:
+        b = sketch_bin(lat)
+        for scope, key in (("edge", edge), ("region", region)):
+            if not key:
+                continue
+            for name, width in BUCKETS.items():
+                k = (scope, key, name, ts - ts % width)
+                t = totals.get(k)
+                if t is None:
+                    t = totals[k] = [0, 0, 0, 0, 0]
+                t[0] += 1
+                t[1] += cpu
+                t[2] += mem
+                t[3] += net
+                t[4] += lat
+                kb = (*k, b)
+                bins[kb] = bins.get(kb, 0) + 1
+    return totals, bins
+
+
+def upsert_add(db: Session, model: Any, values: list[dict[str, Any]], add: Sequence[str]) -> None:
+    """Insert values; on a primary key conflict add the `add` columns onto the stored row."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.name for c in model.__table__.primary_key.columns],
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in add},
+    )
+    for i in range(0, len(values), 1000):
+        db.execute(stmt, values[i : i + 1000])
+
+
+def add_rollups(db: Session, rows: Iterable[RollupRow]) -> int:
+    """Add rows to the rollups inside the caller's transaction. Returns the number of rows."""
+    rows = list(rows)
+    totals, bins = aggregate(rows)
+    if not totals:
+        return 0
+    upsert_add(
+        db,
+        MetricRollup,
+        [
+            {"scope": s, "key": k, "bucket": b, "bucket_ts": t, "count": v[0], **dict(zip(_SUMS, v[1:]))}
+            for (s, k, b, t), v in totals.items()
+        ],
+        ("count", *_SUMS),
+    )
+    upsert_add(
+        db,
+        MetricLatencyBin,
+        [{"scope": s, "key": k, "bucket": b, "bucket_ts": t, "bin": n, "count": c} for (s, k, b, t, n), c in bins.items()],
+        ("count",),
+    )
+    return len(rows)
+
+
+def defer_regions(db: Session, rows: Iterable[tuple[str, str, RollupRow]]) -> None:
+    """Queue (log_hash, task_id, row) stored without a region; backfill_region_rollups adds their region rollups."""
+    values = [
+        {"log_hash": h, "task_id": t, "edge_addr": r[0], "ts": r[2], "cpu_ms": r[3], "mem_mb_peak": r[4], "net_kb": r[5], "latency_ms": r[6]}
+        for h, t, r in rows
+    ]
+    for i in range(0, len(values), 1000):
+        db.execute(insert(PendingRegionRollup), values[i : i + 1000])
+
+
+def pending_regions(db: Session) -> bool:
+    return db.execute(select(PendingRegionRollup.log_hash).limit(1)).first() is not None
+
+
+def backfill_region_rollups(db: Session, regions: dict[str, str]) -> int:
+    """Add queued rows whose edge now has a region to the region rollups, inside the caller's transaction.
+
+    Rows of edges still missing from `regions` stay queued. Returns the number of rows added.
+    """
+    edges = [e for e, r in regions.items() if e and r]
+    n = 0
+    for i in range(0, len(edges), 500):
+        done = db.execute(select(PendingRegionRollup).where(PendingRegionRollup.edge_addr.in_(edges[i : i + 500]))).scalars().all()
+        # edge None: the edge rollups already hold these rows
+        n += add_rollups(db, [(None, regions[p.edge_addr], p.ts, p.cpu_ms, p.mem_mb_peak, p.net_kb, p.latency_ms) for p in done])
+        db.execute(delete(PendingRegionRollup).where(PendingRegionRollup.log_hash.in_([p.log_hash for p in done])))
+    return n
+
+
+def _iter_log_rows(db: Session, log_store: LogStore) -> Iterator[tuple]:
+    fields = ("log_hash", "task_id", "edge_addr", "ts", "cpu_ms", "mem_mb_peak", "net_kb", "latency_ms")
+    q = select(*[getattr(LogDetail, f) for f in fields]).where(LogDetail.edge_addr.is_not(None))
+    for r in db.execute(q.execution_options(yield_per=5000)):
+        yield tuple(r)
+    sql = f"SELECT {', '.join(fields)} FROM log_details WHERE edge_addr IS NOT NULL"
+    for p in log_store.prune(db):
+        yield from iter_archive_rows(p.path, sql)
+
+
+def rebuild_rollups(SessionLocal: sessionmaker[Session], log_store: LogStore, regions: dict[str, str], *, job: Any = None) -> int:
+    """Recompute all rollups from stored details (hot and archived) in one transaction.
+
+    `regions` maps edge address -> region; rows of edges missing from it
+    get edge rollups and are queued for backfill_region_rollups. Returns the
+    number of log rows folded in.
+    """
+    n = 0
+    with session_scope(SessionLocal) as db:
+        db.execute(delete(MetricLatencyBin))
+        db.execute(delete(MetricRollup))
+        db.execute(delete(PendingRegionRollup))
+        chunk: list[RollupRow] = []
+        deferred: list[tuple[str, str, RollupRow]] = []
+        for log_hash, task_id, edge, ts, cpu, mem, net, lat in _iter_log_rows(db, log_store):
+            row = (edge, regions.get(edge) or None, int(ts), int(cpu), int(mem), int(net), int(lat))
+            chunk.append(row)
+            if row[1] is None:
+                deferred.append((log_hash, task_id, row))
+            if len(chunk) >= 5000:
+                n += add_rollups(db, chunk)
+                defer_regions(db, deferred)
+                chunk.clear()
+                deferred.clear()
+                if job is not None:
+                    job.bump("rows", 5000)
+                    job.check_cancelled()
+        n += add_rollups(db, chunk)
+        defer_regions(db, deferred)
+    return n
+
+
+def rollups_empty(db: Session) -> bool:
+    return db.execute(select(MetricRollup.key).limit(1)).first() is None
+
+
+# ------------------------- reads -------------------------
+
+def _series(totals: Iterable[tuple], bins: Iterable[tuple]) -> dict[str, Any]:
+    """Response body from (bucket_ts, count, *sums) and (bucket_ts, bin, count) rows."""
+    per_bucket: dict[int, LatencySketch] = {}
+    for ts, b, c in bins:
+        sk = per_bucket.get(ts)
+        if sk is None:
+            sk = per_bucket[ts] = LatencySketch()
+        sk.bins[b] = sk.bins.get(b, 0) + c
+    overall = LatencySketch()
+    sums = [0, 0, 0, 0, 0]
+    out = []
+    for ts, count, cpu, mem, net, lat in totals:
+        sk = per_bucket.get(ts) or LatencySketch()
+        overall.merge(sk)
+        for i, v in enumerate((count, cpu, mem, net, lat)):
+            sums[i] += v
+        out.append(
+            {
+                "ts": ts,
+                "count": count,
+                "cpuMsSum": cpu,
+                "memMbPeakSum": mem,
+                "netKbSum": net,
+                "latencyMsSum": lat,
+                "latencyMs": {"avg": round(lat / count, 1) if count else None, **sk.quantiles()},
+            }
+        )
+    count = sums[0]
+    return {
+        "buckets": out,
+        "total": {
+            "count": count,
+            "cpuMsSum": sums[1],
+            "memMbPeakSum": sums[2],
+            "netKbSum": sums[3],
+            "latencyMsSum": sums[4],
+            "latencyMs": {"avg": round(sums[4] / count, 1) if count else None, **overall.quantiles()},
+        },
+    }
+
+
+def query_metrics(
+    db: Session,
+    scope: str,
+    key: str,
+    bucket: str,
+    *,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    limit: int = 1440,
+) -> dict[str, Any]:
+    """The newest `limit` buckets of one edge / region in [from_ts, to_ts], oldest first."""
+    cond = [MetricRollup.scope == scope, MetricRollup.key == key, MetricRollup.bucket == bucket]
+    if from_ts is not None:
+        cond.append(MetricRollup.bucket_ts >= from_ts - from_ts % BUCKETS[bucket])
+    if to_ts is not None:
+        cond.append(MetricRollup.bucket_ts <= to_ts)
+    q = (
+        select(MetricRollup.bucket_ts, MetricRollup.count, *[getattr(MetricRollup, c) for c in _SUMS])
+        .where(*cond)
+        .order_by(MetricRollup.bucket_ts.desc())
+        .limit(limit + 1)
+    )
+    totals = [tuple(r) for r in db.execute(q)]
+    truncated = len(totals) > limit
+    totals = totals[:limit][::-1]
+    bins: list[tuple] = []
+    if totals:
+        bq = select(MetricLatencyBin.bucket_ts, MetricLatencyBin.bin, MetricLatencyBin.count).where(
+            MetricLatencyBin.scope == scope,
+            MetricLatencyBin.key == key,
+            MetricLatencyBin.bucket == bucket,
+            MetricLatencyBin.bucket_ts >= totals[0][0],
+            MetricLatencyBin.bucket_ts <= totals[-1][0],
+        )
+        bins = [tuple(r) for r in db.execute(bq)]
+    return {"truncated": truncated, **_series(totals, bins)}
+
+
+def metrics_from_rows(
+    rows: Iterable[RollupRow],
+    scope: str,
+    key: str,
+    bucket: str,
+    *,
+    from_ts: int | None = None,
+    to_ts: int | None = None,
+    limit: int = 1440,
+) -> dict[str, Any]:
+    """`query_metrics` over rows aggregated in memory (MOCK_DATA mode)."""
+    totals, bins = aggregate(rows)
+    lo = None if from_ts is None else from_ts - from_ts % BUCKETS[bucket]
+    keep = sorted(
+        (k[3], *v)
+        for k, v in totals.items()
+        if k[:3] == (scope, key, bucket) and (lo is None or k[3] >= lo) and (to_ts is None or k[3] <= to_ts)
+    )
+    truncated = len(keep) > limit
+    keep = keep[len(keep) - limit :] if truncated else keep
+    stamps = {t[0] for t in keep}
+    sel = [(k[3], k[4], c) for k, c in bins.items() if k[:3] == (scope, key, bucket) and k[3] in stamps]
+    return {"truncated": truncated, **_series(keep, sel)}
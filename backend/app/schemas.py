@@ -8,12 +8,39 @@ class DemoSeedRequest(BaseModel):
     tasks_per_region: int = 15
     days_span: int = 7
     bad_edge_mode: bool = True
+    # Continue an interrupted run with the same parameters; False replans from scratch.
+    resume: bool = True
 
 
 class CreateTaskRequest(BaseModel):
     region: str = Field(..., pattern=r"^[AB]$")
     task_type: str = "default"
     payload: dict = {}
+    # Edge selection policy (app.edge_select); None uses EDGE_SELECT_POLICY.
+    policy: str | None = Field(None, pattern=r"^(p2c|best)$")
+
+
+class CreateTaskBatchRequest(BaseModel):
+    tasks: list[CreateTaskRequest] = Field(..., min_length=1, max_length=1000)
+    # Applies to the whole batch; per-task policy fields are ignored.
+    policy: str | None = Field(None, pattern=r"^(p2c|best)$")
+
+
+class ThresholdSetModel(BaseModel):
+    # SubmitLogSummary anomaly thresholds; defaults are the keeper's constants.
+    cpu_ms: int = Field(5000, ge=0)
+    mem_mb: int = Field(800, ge=0)
+    net_kb: int = Field(5000, ge=0)
+    latency_ms: int = Field(2000, ge=0)
+    timeout_ms: int = Field(4000, ge=0)
+
+
+class ThresholdBacktestRequest(BaseModel):
+    sets: list[ThresholdSetModel] = Field(..., min_length=1, max_length=2000)
+    from_ts: int | None = None
+    to_ts: int | None = None
+    # Prepend the keeper's current thresholds as a baseline.
+    include_keeper: bool = True
 
 
 class SubmitLogRequest(BaseModel):
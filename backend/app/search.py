@@ -0,0 +1,119 @@
+"""Prefix search over hashes and task ids for the audit UI.
+
+Operators usually hold a truncated logHash / resultHash / txHash copied from a
+block explorer or an alert. Every searched column has a plain B-tree index;
+a prefix p becomes the range `col >= p AND col < p_next`, which SQLite answers
+with an index seek and a bounded scan. A LIKE pattern would not use the index
+under the default case-sensitive collation rules.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .db import LogDetail, TaskResultDetail
+from .partitions import LogStore, iter_archive_rows
+
+MIN_PREFIX = 3
+_HEX = set("0123456789abcdefABCDEF")
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _variants(q: str) -> list[str]:
+    # log/result hashes are lowercase hex, Cosmos tx hashes uppercase hex.
+    if set(q) <= _HEX:
+        return sorted({q, q.lower(), q.upper()})
+    return [q]
+
+
+def _range(col, p: str):
+    return (col >= p) & (col < prefix_upper_bound(p))
+
+
+_ARCHIVE_COLUMNS = (("logHash", "log_hash"), ("txHash", "tx_hash"), ("resultHash", "result_hash"))
+
+
+def _archive_sql(prefixes: list[str]) -> str:
+    """One statement per archive file: every (column, prefix variant) range, each bounded by :n."""
+    parts = []
+    for i, p in enumerate(prefixes):
+        for kind, col in _ARCHIVE_COLUMNS:
+            parts.append(
+                f"SELECT * FROM (SELECT '{kind}', {col}, task_id, edge_addr, stage, ts FROM log_details "
+                f"WHERE {col} >= :p{i} AND {col} < :q{i} ORDER BY {col} LIMIT :n)"
+            )
+    return " UNION ALL ".join(parts)
+
+
+def search_prefix(db: Session, log_store: LogStore, q: str, *, limit: int = 20) -> list[dict[str, Any]]:
+    """Typed matches for prefix q, at most `limit` in total.
+
+    The hot tables are searched first, then the archive partitions newest
+    first; no further source is read once `limit` matches are found.
+    """
+    q = q.strip()
+    items: list[dict[str, Any]] = []
+    seen: set[tuple[str, str]] = set()
+
+    def emit(kind: str, value: str | None, **extra: Any) -> None:
+        if not value or (kind, value) in seen or len(items) >= limit:
+            return
+        seen.add((kind, value))
+        items.append({"type": kind, "value": value, **extra})
+
+    def left() -> int:
+        return limit - len(items)
+
+    prefixes = _variants(q)
+    for p in prefixes:
+        for kind, col in (("logHash", LogDetail.log_hash), ("txHash", LogDetail.tx_hash), ("resultHash", LogDetail.result_hash)):
+            if left() <= 0:
+                return items
+            rows = db.execute(
+                select(col, LogDetail.task_id, LogDetail.edge_addr, LogDetail.stage, LogDetail.ts)
+                .where(_range(col, p))
+                .order_by(col)
+                .limit(left())
+            )
+            for value, task_id, edge, stage, ts in rows:
+                emit(kind, value, taskId=task_id, edgeAddr=edge, stage=stage, ts=ts, source="log_details")
+
+        for kind, col in (("taskId", TaskResultDetail.task_id), ("txHash", TaskResultDetail.tx_hash), ("resultHash", TaskResultDetail.result_hash)):
+            if left() <= 0:
+                return items
+            rows = db.execute(
+                select(col, TaskResultDetail.task_id, TaskResultDetail.chosen_edge_addr)
+                .where(_range(col, p))
+                .order_by(col)
+                .limit(left())
+            )
+            for value, task_id, edge in rows:
+                emit(kind, value, taskId=task_id, edgeAddr=edge, source="task_results")
+
+        if left() <= 0:
+            return items
+        # tasks that have logs but no recorded result yet
+        for (task_id,) in db.execute(
+            select(LogDetail.task_id).where(_range(LogDetail.task_id, p)).group_by(LogDetail.task_id).order_by(LogDetail.task_id).limit(left())
+        ):
+            emit("taskId", task_id, source="log_details")
+
+    # Sealed archive partitions carry the same indexes; one query per file.
+    sql = _archive_sql(prefixes)
+    params: dict[str, Any] = {}
+    for i, p in enumerate(prefixes):
+        params[f"p{i}"] = p
+        params[f"q{i}"] = prefix_upper_bound(p)
+    for part in reversed(log_store.partitions(db)):
+        if left() <= 0:
+            break
+        for kind, value, task_id, edge, stage, ts in iter_archive_rows(part.path, sql, {**params, "n": left()}):
+            emit(kind, value, taskId=task_id, edgeAddr=edge, stage=stage, ts=ts, source=part.name)
+    return items
@@ -3,9 +3,13 @@ import client from './client';
 export const api = {
   health: () => client.get('/health'),
   accounts: () => client.get('/accounts'),
+  actors: (kind) => client.get('/actors', { params: { kind } }),
 
   edges: () => client.get('/edges'),
   edge: (addr) => client.get(`/edges/${addr}`),
+  edgeLogs: (addr, limit = 20) => client.get(`/edges/${addr}/logs`, { params: { limit } }),
+  edgeMetrics: (addr, params) => client.get(`/edges/${addr}/metrics`, { params }),
+  regionMetrics: (region, params) => client.get(`/regions/${region}/metrics`, { params }),
 
   tasks: () => client.get('/tasks'),
   task: (taskId) => client.get(`/tasks/${taskId}`),
@@ -13,13 +17,23 @@ export const api = {
   logsByTask: (taskId) => client.get(`/tasks/${taskId}/logs`),
   logsAll: () => client.get('/logs'),
   auditLogs: (taskId) => client.get(`/audit/tasks/${taskId}/logs`),
+  search: (q, limit = 20) => client.get('/search', { params: { q, limit } }),
+  exportLogsUrl: (params) => client.getUri({ url: '/export/logs', params }),
 
   proposals: () => client.get('/governance/proposals'),
   approveProposal: (id) => client.post(`/governance/proposals/${id}/approve`),
   rejectProposal: (id, reason) => client.post(`/governance/proposals/${id}/reject`, null, { params: { reason } }),
 
   propagations: () => client.get('/reputation/propagations'),
+  verifyPropagations: () => client.get('/reputation/propagations/verify'),
 
   demoStatus: () => client.get('/demo/status'),
   demoSeed: (payload) => client.post('/demo/seed', payload),
+
+  jobs: (kind) => client.get('/jobs', { params: { kind } }),
+  job: (id) => client.get(`/jobs/${id}`),
+  cancelJob: (id) => client.post(`/jobs/${id}/cancel`),
+  jobArtifactUrl: (id) => client.getUri({ url: `/jobs/${id}/artifact` }),
+  startExportJob: (params) => client.post('/export/logs/jobs', null, { params }),
+  startFleetAuditJob: (params) => client.post('/audit/logs/jobs', null, { params }),
 };
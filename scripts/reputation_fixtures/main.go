@@ -0,0 +1,206 @@
+// Command reputation_fixtures writes the fixture that backend/app/reputation_engine.py
+// is checked against:
+//
+//	cd scripts/reputation_fixtures && go run main.go > ../../backend/app/fixtures/reputation_go.json
+//	cd backend && python -m app.reputation_engine check
+//
+// The keeper package needs the full Cosmos SDK, so the pure math below is kept
+// verbatim from chain/overrides/x/tbthree/keeper/reputation.go. Update both
+// together.
+package main
+
+import (
+	"encoding/json"
+	"math/rand"
+	"os"
+)
+
+const FPScale int64 = 1_000_000
+const HMMScale int64 = 1_000_000
+
+// ---- verbatim from keeper/reputation.go ----
+
+const fpScale int64 = FPScale
+
+func fpMul(a, b int64) int64 { return (a * b) / fpScale }
+func fpDiv(a, b int64) int64 {
+	if b == 0 {
+		return 0
+	}
+	return (a * fpScale) / b
+}
+
+func clampNonNeg(a int64) int64 {
+	if a < 0 {
+		return 0
+	}
+	return a
+}
+
+func subjectiveFromEvidence(r, s int64) (b, d, u int64) {
+	if r < 0 {
+		r = 0
+	}
+	if s < 0 {
+		s = 0
+	}
+	const prior = int64(2) // Dirichlet prior strength
+	total := r + s + prior
+	if total <= 0 {
+		return 0, 0, fpScale
+	}
+	b = fpDiv(r, total)
+	d = fpDiv(s, total)
+	u = fpDiv(prior, total)
+	// safety: enforce non-negative
+	return clampNonNeg(b), clampNonNeg(d), clampNonNeg(u)
+}
+
+func scoreFromOpinion(b, u int64) int64 {
+	return clampNonNeg(b + u/2)
+}
+
+func hmmUpdate(pT, pS, pM int64, obs int) (nT, nS, nM int64) {
+	// transition matrix A (rows sum to HMMScale)
+	A := [3][3]int64{
+		{900000, 80000, 20000},
+		{100000, 800000, 100000},
+		{20000, 80000, 900000},
+	}
+	// emission matrix B (rows sum to HMMScale)
+	B := [3][3]int64{
+		{850000, 120000, 30000},
+		{200000, 600000, 200000},
+		{30000, 120000, 850000},
+	}
+
+	const hmmScale int64 = HMMScale
+
+	// predict: p' = p * A
+	pT2 := (pT*A[0][0] + pS*A[1][0] + pM*A[2][0]) / hmmScale
+	pS2 := (pT*A[0][1] + pS*A[1][1] + pM*A[2][1]) / hmmScale
+	pM2 := (pT*A[0][2] + pS*A[1][2] + pM*A[2][2]) / hmmScale
+
+	// update with emission
+	eT := B[0][obs]
+	eS := B[1][obs]
+	eM := B[2][obs]
+
+	nT = (pT2 * eT) / hmmScale
+	nS = (pS2 * eS) / hmmScale
+	nM = (pM2 * eM) / hmmScale
+
+	// normalize
+	sum := nT + nS + nM
+	if sum <= 0 {
+		return hmmScale / 3, hmmScale / 3, hmmScale - 2*(hmmScale/3)
+	}
+	nT = (nT * hmmScale) / sum
+	nS = (nS * hmmScale) / sum
+	nM = hmmScale - nT - nS
+	return
+}
+
+// ---- fixture ----
+
+type opinionCase struct {
+	R, S    int64
+	B, D, U int64
+	Score   int64
+}
+
+type hmmCase struct {
+	P   [3]int64
+	Obs int
+	N   [3]int64
+}
+
+// replayCase is one edge from registration: per-step state after each observation.
+type replayCase struct {
+	Obs   []int
+	Score []int64
+	B     []int64
+	D     []int64
+	U     []int64
+	P     [][3]int64
+	Pos   int64
+	Neg   int64
+}
+
+type fixture struct {
+	FPScale   int64
+	HMMScale  int64
+	Threshold int64
+	Opinion   []opinionCase
+	HMM       []hmmCase
+	Replay    []replayCase
+}
+
+func main() {
+	rnd := rand.New(rand.NewSource(20240601))
+	fx := fixture{FPScale: FPScale, HMMScale: HMMScale, Threshold: fpScale * 3 / 10}
+
+	for r := int64(0); r <= 24; r++ {
+		for s := int64(0); s <= 24; s++ {
+			b, d, u := subjectiveFromEvidence(r, s)
+			fx.Opinion = append(fx.Opinion, opinionCase{r, s, b, d, u, scoreFromOpinion(b, u)})
+		}
+	}
+	for _, rs := range [][2]int64{{1000, 3}, {3, 1000}, {123456, 654321}, {-5, 7}} {
+		b, d, u := subjectiveFromEvidence(rs[0], rs[1])
+		fx.Opinion = append(fx.Opinion, opinionCase{rs[0], rs[1], b, d, u, scoreFromOpinion(b, u)})
+	}
+
+	beliefs := [][3]int64{
+		{HMMScale / 3, HMMScale / 3, HMMScale - 2*(HMMScale/3)},
+		{HMMScale, 0, 0},
+		{0, HMMScale, 0},
+		{0, 0, HMMScale},
+		{0, 0, 0},
+	}
+	for i := 0; i < 150; i++ {
+		t := rnd.Int63n(HMMScale + 1)
+		s := rnd.Int63n(HMMScale - t + 1)
+		beliefs = append(beliefs, [3]int64{t, s, HMMScale - t - s})
+	}
+	for _, p := range beliefs {
+		for obs := 0; obs < 3; obs++ {
+			nT, nS, nM := hmmUpdate(p[0], p[1], p[2], obs)
+			fx.HMM = append(fx.HMM, hmmCase{p, obs, [3]int64{nT, nS, nM}})
+		}
+	}
+
+	for i := 0; i < 32; i++ {
+		// mix of good, flaky and bad edges
+		pBad := []float64{0.02, 0.15, 0.4, 0.8}[i%4]
+		steps := 20 + rnd.Intn(40)
+		c := replayCase{}
+		pT, pS, pM := HMMScale/3, HMMScale/3, HMMScale-2*(HMMScale/3)
+		for k := 0; k < steps; k++ {
+			obs := 0
+			if rnd.Float64() < pBad {
+				obs = 1 + rnd.Intn(2)
+			}
+			// UpdateReputation: evidence, opinion, score, HMM
+			if obs == 0 {
+				c.Pos++
+			} else {
+				c.Neg++
+			}
+			b, d, u := subjectiveFromEvidence(c.Pos, c.Neg)
+			pT, pS, pM = hmmUpdate(pT, pS, pM, obs)
+			c.Obs = append(c.Obs, obs)
+			c.Score = append(c.Score, scoreFromOpinion(b, u))
+			c.B = append(c.B, b)
+			c.D = append(c.D, d)
+			c.U = append(c.U, u)
+			c.P = append(c.P, [3]int64{pT, pS, pM})
+		}
+		fx.Replay = append(fx.Replay, c)
+	}
+
+	enc := json.NewEncoder(os.Stdout)
+	if err := enc.Encode(fx); err != nil {
+		panic(err)
+	}
+}